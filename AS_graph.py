@@ -5,27 +5,22 @@ import sys
 import re
 import time
 import inspect
-import csv
 import matplotlib.pyplot as plt
 import matplotlib.mlab as mlab
 import numpy
 from networkx import path_graph, random_layout
 import argparse
 import json
+import multiprocessing
 from pathlib import Path
+from asrel_graph import loadAsRelGraph, REL_P2P
+from as_cones import customerCones
+from valley_free import SearchCache, PHASE_UP, PHASE_DOWN
+from path_records import PathRecordWriter, pathRecords
 
 
 def readASRelData(ASRelDataFile):
-    with open(ASRelDataFile, 'r') as f:
-        try:
-            ASRelData = csv.reader(f, delimiter='\t')
-            graph = createGraph(ASRelData)
-        except IndexError:
-            ASRelData = csv.reader(f, delimiter='|')
-            graph = createGraph(ASRelData)
-        
-    return graph
-        #printASRelData(ASRelData)
+    return loadAsRelGraph(ASRelDataFile)
 
 
 def generateASGraph():
@@ -34,35 +29,13 @@ def generateASGraph():
     return internetGraph
 
 
-def createGraph(ASRelData):
-    internetGraph = nx.DiGraph()
-    for asRelLink in ASRelData:
-        if asRelLink[2] != 'unknown':
-            if (asRelLink[2] == 'p2c') or (asRelLink[2] == '-1'):
-                internetGraph.add_edge(asRelLink[0], asRelLink[1],
-                                       relationship='p2c')
-
-            if (asRelLink[2] == 'c2p'):
-                internetGraph.add_edge(asRelLink[1], asRelLink[0],
-                                       relationship='p2c')
-
-            if (asRelLink[2] == 'p2p') or (asRelLink[2] == '0'):
-                internetGraph.add_edge(asRelLink[0], asRelLink[1],
-                                       relationship='p2p')
-                internetGraph.add_edge(asRelLink[1], asRelLink[0],
-                                       relationship='p2p')
-
-    #return internetGraph
-    return internetGraph.reverse()
-
-
 def drawTopoGraph(graph):
     plt.subplot(111)
     pos = nx.spring_layout(graph)
     #nodes = nx.draw_networkx_nodes(graph, pos, with_labels=True)
     nodes = nx.draw_networkx_nodes(graph, pos)
-    p2c_edges,  p2p_edges = seperateEdges(graph)
-    edge_colors = ['r' if edge in p2c_edges else 'g' for edge in graph.edges]
+    edge_colors = ['r' if graph.edges[edge]['relationship'] == 'p2c' else 'g'
+                   for edge in graph.edges]
     #print("edge_colors: %s\n" % edge_colors)
     nodes.set_edgecolor('r')
     nx.draw_networkx_edges(graph, pos)
@@ -84,26 +57,23 @@ def drawDegHistogram(degHistList, graph):
     plt.show()
 
 
-def getMaxNeighbour(adjGraph):
-    max_length = 0
-    for node, adj_list in adjGraph:
-        if len(adj_list) >= max_length:
-            maxNode = node
-            max_length = len(adj_list)
-            neighbours = adj_list
-    return neighbours, maxNode
+def getMaxNeighbour(graph):
+    # AS with the most outgoing edges, the last one in the graph's order on
+    # a tie, from the offsets of the compact graph.
+    out_degree = numpy.diff(graph.out_ptr)
+    maxId = len(out_degree) - 1 - int(numpy.argmax(out_degree[::-1]))
+    maxNode = str(graph.asns[maxId])
+    return getNeighbour(graph, maxNode), maxNode
 
-def getNeighbour(adjGraph, tnode):
-    for node, adj_list in adjGraph:
-        if tnode == node:
-            return adj_list
+def getNeighbour(graph, tnode):
+    return [str(asn) for asn in graph.successors(tnode)]
 
 def analyseGraph(graph):
     #print("Total number of edges in topology graph is: %s\n" % graph.number_of_edges())
     #print("Total number of nodes in topology graph is: %s\n" % graph.number_of_nodes())
     #print("Density of topology graph is: %s\n" % nx.density(graph))
     #print("Topology graph informantion: %s\n" % nx.info(graph))
-    getMaxNeigh, getMaxNode = getMaxNeighbour(graph.adjacency())
+    getMaxNeigh, getMaxNode = getMaxNeighbour(graph)
     print("Node with the highest number of neighbours: %s\n" % getMaxNode)
     return(getMaxNeigh, getMaxNode)
 
@@ -122,36 +92,180 @@ def printASRelData(ASRelData):
     for line in ASRelData:
         print("Line: %s\n" % line)
 
-def seperateEdges(graph):
-    p2c_edges = []
-    p2p_edges = []
-    for edge in list(graph.edges):
-        rel = graph.get_edge_data(edge[0],edge[1])
-        #print("Attribute rel is %s\n" %rel) 
-        if rel['relationship'] == 'p2c':
-            p2c_edges.append(edge)
-
-        if rel['relationship'] == 'p2p':
-            p2p_edges.append(edge)
-    return p2c_edges, p2p_edges
-
-
-def get_shortest_paths(G, prov_or_peer_asn, probe_asn, src_asn):
-    if nx.has_path(G, prov_or_peer_asn, probe_asn):
-        shortest_paths = nx.all_shortest_paths(G, prov_or_peer_asn, probe_asn)
-        intermediates = set()
-        short_paths = []
-        for sh_path in shortest_paths:
-            sh_path.insert(0, src_asn)
-            intermediates.add(sh_path[2])
-            short_paths.append(sh_path)
-        if len(intermediates) > 1:
-            return (intermediates, short_paths)
-        else:
-            return (None, None)
+def get_shortest_paths(searches, prov_or_peer_asn, probe_asn, src_asn):
+    # Shortest valley-free paths from an upstream of src_asn to the probe
+    # ASN. Traffic handed to a peer of src_asn may only go down from there.
+    # searches keeps one search per upstream for all probe ASNs.
+    G = searches.graph
+    if prov_or_peer_asn not in G:
+        return (None, None)
+    if G.rel(src_asn, prov_or_peer_asn) == REL_P2P:
+        phase = PHASE_DOWN
+    else:
+        phase = PHASE_UP
+    search = searches.search(prov_or_peer_asn, phase)
+    intermediates = set(str(asn) for asn in search.firstHops(probe_asn))
+    if len(intermediates) > 1:
+        short_paths = [[src_asn] + [str(asn) for asn in sh_path]
+                       for sh_path in search.paths(probe_asn)]
+        return (intermediates, short_paths)
     else:
         return (None, None)
 
+def analyseProbeAsn(searches, src_asn, providers, peers, asn, paths):
+    # Works out how the probe ASN asn can be reached through the providers
+    # and peers of src_asn. Returns asn, the lines to print, whether
+    # multiple paths improve its reach, whether it benefits from PAR on the
+    # providers, whether peers reach it and how often they were counted,
+    # and a record of every path found.
+    out = ["ASN  %s" % asn]
+    records = []
+    recorded = set()
+
+    def shortestPaths(upstream):
+        intermediates, short_paths = get_shortest_paths(searches, upstream,
+                                                        asn, src_asn)
+        if intermediates and upstream not in recorded:
+            recorded.add(upstream)
+            relation = 'provider' if upstream in providers else 'peer'
+            records.extend(pathRecords(asn, upstream, relation,
+                                       intermediates, short_paths))
+        return intermediates, short_paths
+
+    par_beneficial = False
+    peer_reachable = False
+    peer_count = 0
+    valid = False
+    for path in paths:
+        path.reverse()
+        path = [str(asno) for asno in path]
+        if path[1] != src_asn:
+            if path[1] in providers:
+                intermediates, short_paths = shortestPaths(path[1])
+                if intermediates:
+                    out.append("Using the shortest path algorithm:")
+                    out.append("     AS%s which is a provider to AS%s can reach AS%s via %s upstream ASes"  % (path[1], src_asn, asn, len(intermediates)))
+                    out.append("\n")
+                    
+                    if len(intermediates) > 1:
+                        par_beneficial = True
+                        if valid is False:
+                            valid = True
+                else:
+                    out.append("AS%s does not have a path to AS%s, checking other providers" % (path[1], asn))
+                    out.append("    Path reported in traceroute: %s" % path)
+                    for provider in providers:
+                        intermediates, short_paths = shortestPaths(provider)
+
+                        if intermediates:
+                            out.append("Using shortest path algorithm, AS%s can still be used to reach AS%s via %s upstream ASes" % (provider, asn, len(intermediates)))
+                            if len(intermediates) > 1:
+                                par_beneficial = True
+                                if valid is False:
+                                    valid = True
+                            continue
+                    continue
+                    out.append("No path via providers of AS%s to AS%s, checking peers!!!" % (src_asn, asn))
+
+                    for peer in peers:
+                        intermediates, short_paths = shortestPaths(peer)
+
+                        if intermediates:
+                            if len(intermediates) > 1:
+                                out.append("AS%s, a peer to AS%s can be used to reach AS%s via %s upstream ASes" % (peer, src_asn, asn, len(intermediates)))
+                                peer_count += 1
+                                peer_reachable = True
+                                break
+            
+            if path[1] in peers:
+                intermediates, short_paths = shortestPaths(path[1])
+                if intermediates:
+                    out.append("Using the shortest path algorithm:")
+                    out.append("     AS%s which is a peer to AS%s can reach AS%s via %s upstream ASes"  % (path[1], src_asn, asn, len(intermediates)))
+                    out.append("\n")
+                    
+                    if len(intermediates) > 1:
+                        peer_count += 1
+                        peer_reachable = True
+            else:
+                for peer in peers:
+                    intermediates, short_paths = shortestPaths(peer)
+
+                    if intermediates:
+                        if len(intermediates) > 1:
+                            out.append("AS%s, a peer to AS%s can be used to reach AS%s via %s upstream ASes" % (peer, src_asn, asn, len(intermediates)))
+                            peer_count += 1
+                            peer_reachable = True
+                            break
+
+        else:
+            out.append("Order of AS path seems to be wrong checking the first ASN in path")
+            out.append("First AS in path: %s" % path[0])
+            if path[0] in providers:
+                intermediates, short_paths = shortestPaths(path[0])
+                if intermediates:
+                    out.append("Using the shortest path algorithm:")
+                    out.append("     AS%s which is a provider to AS%s can reach AS%s via %s upstream ASes"  % (path[0], src_asn, asn, len(intermediates)))
+                    out.append("\n")
+                    
+                    if len(intermediates) > 1:
+                        par_beneficial = True
+                        if valid is False:
+                            valid = True
+
+                else:
+                    out.append("AS%s does not have a path to AS%s, checking other providers" % (path[0], asn))
+                    out.append("    Path reported in traceroute: %s" % path)
+                    for provider in providers:
+                        intermediates, short_paths = shortestPaths(provider)
+
+                        if intermediates:
+                            out.append("Using shortest path algorithm, AS%s can still be used to reach AS%s via %s upstream ASes" % (provider, asn, len(intermediates)))
+                            continue
+                    out.append("No path via providers of AS%s to AS%s, checking peers!!!" % (src_asn, asn))
+
+                    for peer in peers:
+                        intermediates, short_paths = shortestPaths(peer)
+
+                        if intermediates:
+                            if len(intermediates) > 1:
+                                out.append("AS%s, a peer to AS%s can be to reach AS%s via %s upstream ASes" % (peer, src_asn, asn, len(intermediates)))
+                                peer_count += 1
+                                peer_reachable = True
+                                continue
+    return (asn, out, valid, par_beneficial, peer_reachable, peer_count,
+            records)
+
+
+# What forked workers inherit from the process that created the pool.
+_analysis_state = None
+
+
+def analyseTask(task):
+    asn, paths = task
+    return analyseProbeAsn(*_analysis_state, asn, paths)
+
+
+def analyseProbeAsns(searches, src_asn, providers, peers, asnpaths,
+                     workers=1):
+    # Yields the analysis of every probe ASN in the order of asnpaths. Each
+    # analysis only reads the graph, so with more than one worker the ASNs
+    # are spread over processes forked after the graph is loaded, which
+    # share it copy-on-write.
+    global _analysis_state
+    tasks = list(asnpaths.items())
+    if workers <= 1:
+        for asn, paths in tasks:
+            yield analyseProbeAsn(searches, src_asn, providers, peers,
+                                  asn, paths)
+        return
+
+    _analysis_state = (searches, src_asn, providers, peers)
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        for analysis in pool.imap(analyseTask, tasks, chunksize):
+            yield analysis
+
 
 if __name__ == "__main__":
     #if len(sys.argv) < 2:
@@ -168,6 +282,10 @@ if __name__ == "__main__":
                            default='filtered-as-rel.txt')
     argParser.add_argument('-L', dest='asns_and_paths', help='JSON file of ASNs and paths of Probes to Server',
                            default=None)
+    argParser.add_argument('-n', dest='workers', help='Number of worker processes analysing probe ASNs',
+                           type=int, default=1)
+    argParser.add_argument('-R', dest='records', help='File to write path records to instead of printing them (.jsonl or .parquet)',
+                           default=None)
     args = argParser.parse_args()
 
     if (args.as_rel_data is None) or (args.ASN is None):
@@ -184,40 +302,27 @@ if __name__ == "__main__":
         print("%s does not exist!!!" % args.asns_and_paths)
         sys.exit(-1)
 
-    graphData = readASRelData(args.as_rel_data)
-    mNodeNeighbors, mNode = analyseGraph(graphData)
-    maxNeigh, maxNode = getMaxNeighbour(graphData.adjacency())
-    neighbours = getNeighbour(graphData.adjacency(), args.ASN)
-    neigh = graphData[args.ASN]
+    asRelGraph = readASRelData(args.as_rel_data)
+    mNodeNeighbors, mNode = analyseGraph(asRelGraph)
+    maxNeigh, maxNode = mNodeNeighbors, mNode
+    neighbours = getNeighbour(asRelGraph, args.ASN)
+    neigh = [str(asn) for asn in asRelGraph.providers(args.ASN)
+             + asRelGraph.peers(args.ASN)]
     mDegNeigh = []
     oneDegNeigh = []
-    asn_successor = graphData.successors(args.ASN)
-    asn_out_degree = graphData.out_degree(args.ASN)
-    asn_in_degree = graphData.in_degree(args.ASN)
-    all_successors = nx.dfs_successors(graphData, args.ASN)
+    asn_successor = asRelGraph.successors(args.ASN)
+    asn_out_degree = asRelGraph.outDegree(args.ASN)
+    asn_in_degree = asRelGraph.inDegree(args.ASN)
     print("In-Degree of AS %s is %s\n" %(args.ASN,asn_in_degree))
     print("Out-Degree of AS %s is %s\n" %(args.ASN,asn_out_degree))
+    print("Customer cone of AS %s has %s ASes\n" %(args.ASN, customerCones(asRelGraph).size(args.ASN)))
     #print("In-edges of AS %s are %s\n" %(args.ASN, graphData.in_edges(args.ASN)))
     #print("Out-edges of AS %s are %s\n" %(args.ASN, graphData.out_edges(args.ASN)))
 
-    ASN_out_edges = set(graphData.out_edges(args.ASN))
-    p2c_edges,  p2p_edge = seperateEdges(graphData)
-    set_p2c_edges = set(p2c_edges)
-    set_p2p_edges = set(p2p_edge)
-    intersection = set_p2c_edges.intersection(ASN_out_edges)
-    p2p_intersect = set_p2p_edges.intersection(ASN_out_edges)
-    #print("Peers to %s: %s" % (args.ASN, p2p_intersect))
-    #print("Providers to %s: %s" % (args.ASN, intersection))
-    peers = set()
-    for edge in p2p_intersect:
-        as1, as2 = edge
-        peers.add(as2)
+    peers = set(str(asn) for asn in asRelGraph.peers(args.ASN))
     print("Number of Peers: %s" % len(peers))
     
-    providers = set() 
-    for edge in intersection:
-        as1, as2 = edge
-        providers.add(as2)
+    providers = set(str(asn) for asn in asRelGraph.providers(args.ASN))
     print("Providers: %s" % providers)
     print("Intersection of Peers: %s" % len(peers.intersection(providers)))
 
@@ -232,7 +337,7 @@ if __name__ == "__main__":
     #    else:
     #        mDegNeigh.append(asn)
     
-    if neighbours == neigh:
+    if sorted(neighbours) == sorted(neigh):
         #print("Neigbours of AS %s are: %s\n" %(args.ASN, neighbours))
         print("ASN %s has %s neighbours\n" %(args.ASN, len(neighbours)))
     else:
@@ -241,119 +346,48 @@ if __name__ == "__main__":
 
     with open(args.asns_and_paths, 'r') as asnpathsjson:
         asnpaths = json.load(asnpathsjson)
+    searches = SearchCache(asRelGraph)
     print("Number of ASNs with probes to server: %s" % len(asnpaths))
     asns_count = 0
     peer_asns_count = 0
     par_beneficial_asns = set()
     peer_reachable_asns = set()
-    for asn, paths in asnpaths.items():
-        print("ASN  %s" % asn)
-        valid = False
-        for path in paths:
-            path.reverse()
-            path = [str(asno) for asno in path]
-            if path[1] != args.ASN:
-                if path[1] in providers:
-                    intermediates, short_paths = get_shortest_paths(graphData, path[1], asn, args.ASN)
-                    if intermediates:
-                        print("Using the shortest path algorithm:")
-                        print("     AS%s which is a provider to AS%s can reach AS%s via %s upstream ASes"  % (path[1], args.ASN, asn, len(intermediates)))
-                        print("\n")
-                        
-                        if len(intermediates) > 1:
-                            par_beneficial_asns.add(asn)
-                            if valid is False:
-                                valid = True
-                    else:
-                        print("AS%s does not have a path to AS%s, checking other providers" % (path[1], asn))
-                        print("    Path reported in traceroute: %s" % path)
-                        for provider in providers:
-                            intermediates, short_paths = get_shortest_paths(graphData, provider, asn, args.ASN)
-
-                            if intermediates:
-                                print("Using shortest path algorithm, AS%s can still be used to reach AS%s via %s upstream ASes" % (provider, asn, len(intermediates)))
-                                if len(intermediates) > 1:
-                                    par_beneficial_asns.add(asn)
-                                    if valid is False:
-                                        valid = True
-                                continue
-                        continue
-                        print("No path via providers of AS%s to AS%s, checking peers!!!" % (args.ASN, asn))
-
-                        for peer in peers:
-                            intermediates, short_paths = get_shortest_paths(graphData, peer, asn, args.ASN)
-
-                            if intermediates:
-                                if len(intermediates) > 1:
-                                    print("AS%s, a peer to AS%s can be used to reach AS%s via %s upstream ASes" % (peer, args.ASN, asn, len(intermediates)))
-                                    peer_asns_count += 1
-                                    peer_reachable_asns.add(asn)
-                                    break
-                
-                if path[1] in peers:
-                    intermediates, short_paths = get_shortest_paths(graphData, path[1], asn, args.ASN)
-                    if intermediates:
-                        print("Using the shortest path algorithm:")
-                        print("     AS%s which is a peer to AS%s can reach AS%s via %s upstream ASes"  % (path[1], args.ASN, asn, len(intermediates)))
-                        print("\n")
-                        
-                        if len(intermediates) > 1:
-                            peer_asns_count += 1
-                            peer_reachable_asns.add(asn)
-                else:
-                    for peer in peers:
-                        intermediates, short_paths = get_shortest_paths(graphData, peer, asn, args.ASN)
-
-                        if intermediates:
-                            if len(intermediates) > 1:
-                                print("AS%s, a peer to AS%s can be used to reach AS%s via %s upstream ASes" % (peer, args.ASN, asn, len(intermediates)))
-                                peer_asns_count += 1
-                                peer_reachable_asns.add(asn)
-                                break
-
-            else:
-                print("Order of AS path seems to be wrong checking the first ASN in path")
-                print("First AS in path: %s" % path[0])
-                if path[0] in providers:
-                    intermediates, short_paths = get_shortest_paths(graphData, path[0], asn, args.ASN)
-                    if intermediates:
-                        print("Using the shortest path algorithm:")
-                        print("     AS%s which is a provider to AS%s can reach AS%s via %s upstream ASes"  % (path[0], args.ASN, asn, len(intermediates)))
-                        print("\n")
-                        
-                        if len(intermediates) > 1:
-                            par_beneficial_asns.add(asn)
-                            if valid is False:
-                                valid = True
-
-                    else:
-                        print("AS%s does not have a path to AS%s, checking other providers" % (path[0], asn))
-                        print("    Path reported in traceroute: %s" % path)
-                        for provider in providers:
-                            intermediates, short_paths = get_shortest_paths(graphData, provider, asn, args.ASN)
-
-                            if intermediates:
-                                print("Using shortest path algorithm, AS%s can still be used to reach AS%s via %s upstream ASes" % (provider, args.ASN, asn, len(intermediates)))
-                                continue
-                        print("No path via providers of AS%s to AS%s, checking peers!!!" % (args.ASN, asn))
-
-                        for peer in peers:
-                            intermediates, short_paths = get_shortest_paths(graphData, peer, asn, args.ASN)
-
-                            if intermediates:
-                                if len(intermediates) > 1:
-                                    print("AS%s, a peer to AS%s can be to reach AS%s via %s upstream ASes" % (peer, args.ASN, asn, len(intermediates)))
-                                    peer_asns_count += 1
-                                    peer_reachable_asns.add(asn)
-                                    continue
+    records = None
+    if args.records is not None:
+        records = PathRecordWriter(args.records)
+    for (asn, out, valid, par_beneficial, peer_reachable, peer_count,
+         asn_records) in analyseProbeAsns(searches, args.ASN, providers,
+                                          peers, asnpaths, args.workers):
+        if records is None:
+            for line in out:
+                print(line)
+        else:
+            records.write(asn_records)
         if valid:
             asns_count += 1
-        #print("\n")
+        if par_beneficial:
+            par_beneficial_asns.add(asn)
+        if peer_reachable:
+            peer_reachable_asns.add(asn)
+        peer_asns_count += peer_count
 
     print("Number of probe ASNs that can be improved using multiple paths: %s" % asns_count)
     print("Number of probes ASNs that can benefit from PAR implemented on the providers of AS%s: %s" % (args.ASN, len(par_beneficial_asns)))
     print("Number of probe ASNs that can be reached via peers of ASN%s : %s" % (args.ASN ,peer_asns_count))
     print("Number of probe ASNS that can be reached via peers of ASN%s: %s" % (args.ASN, len(peer_reachable_asns)))
+
+    if records is not None:
+        records.close()
+        records.writeSummary({'asn': args.ASN,
+                              'probe_asns': len(asnpaths),
+                              'providers': sorted(providers),
+                              'peers': len(peers),
+                              'improved_asns': asns_count,
+                              'par_beneficial_asns': sorted(par_beneficial_asns),
+                              'peer_reachable_count': peer_asns_count,
+                              'peer_reachable_asns': sorted(peer_reachable_asns),
+                              'records': records.rows})
+        print("Wrote %s path records to %s" % (records.rows, args.records))
     
     #print("There are %s paths between %s and %s" % (len(list(all_paths)), args.ASN, '3352'))
     #for path in all_paths:
@@ -26,14 +26,15 @@
 import os
 import sys
 import argparse
-import networkx as nx
 import time
-import csv
 import pybgpstream
+import multiprocessing
+from functools import partial
 from collections import defaultdict
 import re
 import json
 import requests
+from asrel_graph import loadAsRelGraph
 
 URL = "https://api.asrank.caida.org/v2/graphql"
 dataproviders = ["route-views.sydney",
@@ -68,96 +69,69 @@ dataproviders = ["route-views.sydney",
 output_dir = "_PathDiversityOutput"
 
 def readASRelData(ASRelDataFile):
-    with open(ASRelDataFile, 'r') as f:
-        try:
-            ASRelData = csv.reader(f, delimiter='\t')
-            graph = createGraph(ASRelData)
-        except IndexError:
-            ASRelData = csv.reader(f, delimiter='|')
-            graph = createGraph(ASRelData)
-
-    return graph
-
-
-def createGraph(ASRelData):
-    internetGraph = nx.DiGraph()
-    for asRelLink in ASRelData:
-        if asRelLink[2] != 'unknown':
-            if (asRelLink[2] == 'p2c') or (asRelLink[2] == '-1'):
-                internetGraph.add_edge(asRelLink[0], asRelLink[1],
-                                       relationship='p2c')
-
-            if (asRelLink[2] == 'c2p'):
-                internetGraph.add_edge(asRelLink[1], asRelLink[0],
-                                       relationship='p2c')
-
-            if (asRelLink[2] == 'p2p') or (asRelLink[2] == '0'):
-                internetGraph.add_edge(asRelLink[0], asRelLink[1],
-                                       relationship='p2p')
-                internetGraph.add_edge(asRelLink[1], asRelLink[0],
-                                       relationship='p2p')
-
-    return internetGraph.reverse()
-
-
-def seperateEdges(graph):
-    p2c_edges = []
-    p2p_edges = []
-    for edge in list(graph.edges):
-        rel = graph.get_edge_data(edge[0], edge[1])
-        #print("Attribute rel is %s\n" %rel)
-        if rel['relationship'] == 'p2c':
-            p2c_edges.append(edge)
-
-        if rel['relationship'] == 'p2p':
-            p2p_edges.append(edge)
-    return p2c_edges, p2p_edges
+    return loadAsRelGraph(ASRelDataFile)
 
 
 def sortPeeringRel(graph, asn):
-    customers = set()
-    transit_peers = set()
-    customer_edges = graph.in_edges(asn)
-    transitpeer_edges = graph.out_edges(asn)
-
-    for edge in customer_edges:
-        customers.add(edge[0])
-
-    for edge in transitpeer_edges:
-        transit_peers.add(edge[1])
-
-    for peerAS in transit_peers:
-        if peerAS in customers:
-            customers.discard(peerAS)
+    # ASNs as strings, the way they appear in BGP paths.
+    transit_peers = set(str(peer) for peer in graph.successors(asn))
+    customers = set(str(cust) for cust in graph.predecessors(asn))
+    customers -= transit_peers
 
     return customers, transit_peers
 
 
-def QueryProviders(transitAS, stubAS, customers, transitandpeers, numberOfProviders):
+def collectorPaths(collector, transitAS, stubAS, customers, numberOfProviders):
+    # Paths to prefixes of stubAS and their next hops in the RIBs of one
+    # collector, as seen from the peer transitAS.
     filters = 'peer '+transitAS+' and path "_'+stubAS+'_"'
     prefixes = defaultdict(set)
     nextHops = defaultdict(set)
 
-    for provider in dataproviders:
-        stream = pybgpstream.BGPStream(from_time="2020-03-01 07:50:00",
-                                       until_time="2020-03-02 07:50:00",
-                                       collectors=[provider],
-                                       record_type="ribs",
-                                       filter=filters)
-        for rec in stream.records():
-            for elem in rec:
-                pfx = elem.fields["prefix"]
-                ases = elem.fields["as-path"].split(" ")
-                next_hop = elem.fields['next-hop']
-                if len(ases) > 0:
-                    if numberOfProviders != 0:
-                        if ases[-1] == stubAS and (ases[1] not in customers):
-                            prefixes[pfx].add(tuple(ases))
-                    else:
-                        if ases[-1] == stubAS:
-                            prefixes[pfx].add(tuple(ases))
-                    nextHops[pfx].add(next_hop)
-                    #print(elem)
+    stream = pybgpstream.BGPStream(from_time="2020-03-01 07:50:00",
+                                   until_time="2020-03-02 07:50:00",
+                                   collectors=[collector],
+                                   record_type="ribs",
+                                   filter=filters)
+    for rec in stream.records():
+        for elem in rec:
+            pfx = elem.fields["prefix"]
+            ases = elem.fields["as-path"].split(" ")
+            next_hop = elem.fields['next-hop']
+            if len(ases) > 0:
+                if numberOfProviders != 0:
+                    if ases[-1] == stubAS and (ases[1] not in customers):
+                        prefixes[pfx].add(tuple(ases))
+                else:
+                    if ases[-1] == stubAS:
+                        prefixes[pfx].add(tuple(ases))
+                nextHops[pfx].add(next_hop)
+                #print(elem)
+    return dict(prefixes), dict(nextHops)
+
+
+def QueryProviders(transitAS, stubAS, customers, transitandpeers, numberOfProviders, workers=1):
+    # With more than one worker every collector is read in a forked process
+    # of its own, at most workers at a time, and the paths and next hops
+    # found are merged here in the order of dataproviders.
+    prefixes = defaultdict(set)
+    nextHops = defaultdict(set)
+
+    query = partial(collectorPaths, transitAS=transitAS, stubAS=stubAS,
+                    customers=customers, numberOfProviders=numberOfProviders)
+
+    def merge(found):
+        for collector_prefixes, collector_nextHops in found:
+            for pfx, paths in collector_prefixes.items():
+                prefixes[pfx].update(paths)
+            for pfx, next_hops in collector_nextHops.items():
+                nextHops[pfx].update(next_hops)
+
+    if workers <= 1:
+        merge(map(query, dataproviders))
+    else:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            merge(pool.imap(query, dataproviders))
     return prefixes, nextHops
 
 
@@ -226,6 +200,8 @@ if __name__ == "__main__":
     argParser.add_argument('-s', dest='stubAS', help='Stub AS', default=None)
     argParser.add_argument('-O', dest='pathDivFile', help='Filename to write path diversity search',
                            default='PathDiversityOutput.txt')
+    argParser.add_argument('-n', dest='workers', help='Number of collectors to read in parallel',
+                           type=int, default=1)
     args = argParser.parse_args()
 
     if (args.as_rel_data is None):
@@ -251,7 +227,7 @@ if __name__ == "__main__":
 
     graphData = readASRelData(args.as_rel_data)
     customers, transitAndPeers = sortPeeringRel(graphData, args.transitASN)
-    prefix_origin, nextHops = QueryProviders(args.transitASN, args.stubAS, customers, transitAndPeers, asnProviderNo)
+    prefix_origin, nextHops = QueryProviders(args.transitASN, args.stubAS, customers, transitAndPeers, asnProviderNo, args.workers)
 
     with open(os.path.join(output_dir, args.pathDivFile), "w") as pathDivRes:
         if asnProviderNo == 0:
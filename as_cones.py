@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Customer and provider cones of every AS of an AsRelGraph. The customer
+# cone of an AS is the AS itself and every AS it reaches by following
+# provider to customer links, the provider cone the same upwards. Cones are
+# computed bottom up in one pass: the strongly connected components of the
+# customer links (normally single ASes, p2c cycles are possible in inferred
+# data) are visited in reverse topological order, and the cone of each is
+# the union of its members and the already computed cones below it. ASes
+# with nothing below them keep no array, so stubs cost nothing.
+
+import sys
+import json
+import argparse
+import numpy as np
+from asrel_graph import loadAsRelGraph
+
+
+def sccOrder(ptr, idx):
+    # Strongly connected components with Tarjan's algorithm, iteratively.
+    # A component is emitted once everything reachable from it has been,
+    # so the list is in reverse topological order.
+    n = len(ptr) - 1
+    ptr = ptr.tolist()
+    idx = idx.tolist()
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack = []
+    comps = []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, ptr[root])]
+        while work:
+            v, pos = work[-1]
+            if pos < ptr[v + 1]:
+                work[-1] = (v, pos + 1)
+                w = idx[pos]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, ptr[w]))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+
+            work.pop()
+            if work:
+                u = work[-1][0]
+                if low[v] < low[u]:
+                    low[u] = low[v]
+            if low[v] == index[v]:
+                comp = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp.append(w)
+                    if w == v:
+                        break
+                comps.append(comp)
+    return comps
+
+
+class ConeIndex:
+
+    def __init__(self, graph, ptr, idx):
+        # ptr and idx are the CSR of the links to follow down the cone.
+        self.graph = graph
+        comps = sccOrder(ptr, idx)
+        self.comp_of = np.empty(len(graph), dtype=np.int32)
+        for c, members in enumerate(comps):
+            self.comp_of[members] = c
+        self.comp_root = np.array([members[0] for members in comps],
+                                  dtype=np.int32)
+
+        ptr = ptr.tolist()
+        self.cones = [None] * len(comps)
+        comp_size = np.ones(len(comps), dtype=np.int64)
+        for c, members in enumerate(comps):
+            below = set()
+            for v in members:
+                if ptr[v] != ptr[v + 1]:
+                    below.update(
+                            self.comp_of[idx[ptr[v]:ptr[v + 1]]].tolist())
+            below.discard(c)
+            if not below and len(members) == 1:
+                continue
+            parts = [np.array(members, dtype=np.int32)]
+            parts.extend(self.coneIds(b) for b in below)
+            self.cones[c] = np.unique(np.concatenate(parts))
+            comp_size[c] = len(self.cones[c])
+        self.sizes = comp_size[self.comp_of]
+
+    def coneIds(self, comp):
+        # Sorted ids in the cone of a component.
+        cone = self.cones[comp]
+        if cone is None:
+            return self.comp_root[comp:comp + 1]
+        return cone
+
+    def size(self, asn):
+        return int(self.sizes[self.graph.idOf(asn)])
+
+    def members(self, asn):
+        comp = self.comp_of[self.graph.idOf(asn)]
+        return self.graph.asns[self.coneIds(comp)].tolist()
+
+    def contains(self, asn, member):
+        # Whether member is in the cone of asn.
+        if member not in self.graph:
+            return False
+        cone = self.coneIds(self.comp_of[self.graph.idOf(asn)])
+        i = self.graph.idOf(member)
+        k = int(np.searchsorted(cone, i))
+        return k < len(cone) and cone[k] == i
+
+    def allSizes(self):
+        # {asn: cone size} of every AS.
+        return dict(zip(self.graph.asns.tolist(), self.sizes.tolist()))
+
+
+def customerCones(graph):
+    return ConeIndex(graph, *graph.customerAdjacency())
+
+
+def providerCones(graph):
+    return ConeIndex(graph, *graph.providerAdjacency())
+
+
+def compareAsRank(cones, asrank_file):
+    # (asn, size here, size in ASRank) of every AS whose customer cone
+    # differs from ASRank's cone.numberAsns.
+    mismatched = []
+    with open(asrank_file, 'r') as f:
+        for line in f:
+            node = json.loads(line)
+            cone = node.get('cone') or {}
+            if 'numberAsns' not in cone or node['asn'] not in cones.graph:
+                continue
+            size = cones.size(node['asn'])
+            if size != cone['numberAsns']:
+                mismatched.append((node['asn'], size, cone['numberAsns']))
+    return mismatched
+
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser(
+            description='Compute customer and provider cones of every AS',
+            usage='%(prog)s [-i as_rel_file -o cone_file -r asrank_file]')
+
+    argParser.add_argument('-i', dest='as_rel_file',
+                           help='AS relationship file',
+                           type=str, default=None)
+
+    argParser.add_argument('-o', dest='cone_file',
+                           help='''File to write "asn customer-cone
+                                provider-cone" lines to''',
+                           type=str, default=None)
+
+    argParser.add_argument('-r', dest='asrank_file',
+                           help='''ASRank JSON lines file to cross-check
+                                customer cone sizes against''',
+                           type=str, default=None)
+
+    args = argParser.parse_args()
+
+    if args.as_rel_file is None:
+        print("AS relationship data file not passed!!!")
+        sys.exit(-1)
+
+    graph = loadAsRelGraph(args.as_rel_file)
+    customer = customerCones(graph)
+    provider = providerCones(graph)
+
+    if args.cone_file is not None:
+        with open(args.cone_file, 'w') as f:
+            for asn, csize, psize in zip(graph.asns.tolist(),
+                                         customer.sizes.tolist(),
+                                         provider.sizes.tolist()):
+                f.write("%s\t%s\t%s\n" % (asn, csize, psize))
+
+    if args.asrank_file is not None:
+        mismatched = compareAsRank(customer, args.asrank_file)
+        print("%s ASes have a customer cone size different from ASRank"
+              % len(mismatched))
+        for asn, size, asrank_size in mismatched:
+            print("    AS%s: %s vs %s" % (asn, size, asrank_size))
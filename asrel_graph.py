@@ -0,0 +1,374 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Compact AS relationship graph. ASNs are numbered 0..n-1 in the order
+# they first appear in the as-rel data, and the adjacency is held in CSR
+# form: for AS id i, ptr[i]:ptr[i+1] is the slice of idx (neighbour ids)
+# and rel (uint8 relationship codes) of its edges. Both the outgoing and
+# the incoming edges are kept, so successors and predecessors are array
+# slices and the graph of a full CAIDA dataset takes a few MB.
+#
+# Edges point the way createGraph() built them after its reverse(): an AS
+# has a p2c edge to each of its providers, its customers have p2c edges to
+# it, and peers have p2p edges both ways. The providers, customers and
+# peers of an AS are picked from its slices by relationship code, and the
+# relationship between two ASes is a binary search in one slice.
+# toNetworkx() rebuilds that same DiGraph, node and edge order included,
+# for code still written against networkx.
+#
+# loadAsRelGraph() parses an as-rel file once and keeps the arrays in a
+# .npz snapshot named after the SHA-1 of the file, so later runs on the
+# same dataset load the graph without parsing it again.
+
+import os
+import sys
+import hashlib
+import argparse
+import numpy as np
+import networkx as nx
+
+ASREL_CACHE_DIR = os.environ.get('ASREL_CACHE_DIR',
+                                 '/scratch/measurements/cache/as-rel')
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ARRAYS = ('asns', 'out_ptr', 'out_idx', 'out_rel',
+                   'in_ptr', 'in_idx', 'in_rel')
+
+REL_NONE = 0
+REL_P2C = 1
+REL_P2P = 2
+
+REL_NAMES = {REL_P2C: 'p2c', REL_P2P: 'p2p'}
+
+
+def asRelEdges(rel_type, as1, as2, unknown=None):
+    # Edges (from, to, rel) createGraph() added for one as-rel line, before
+    # reversing. Lines of unknown relationship are dropped unless unknown
+    # names the relationship to give them.
+    if rel_type == 'unknown':
+        rel_type = unknown
+    if rel_type in ('p2c', '-1'):
+        return ((as1, as2, REL_P2C),)
+    if rel_type == 'c2p':
+        return ((as2, as1, REL_P2C),)
+    if rel_type in ('p2p', '0'):
+        return ((as1, as2, REL_P2P), (as2, as1, REL_P2P))
+    return ()
+
+
+def relAdjacency(ptr, idx, rel, code):
+    # CSR of only the edges of one relationship.
+    keep = rel == code
+    rows = np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))[keep]
+    sub_ptr = np.zeros(len(ptr), dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(ptr) - 1), out=sub_ptr[1:])
+    return sub_ptr, idx[keep]
+
+
+def csrArrays(group, other, order, n):
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(group, minlength=n), out=ptr[1:])
+    return ptr, other[order].astype(np.int32)
+
+
+class AsRelGraph:
+
+    def __init__(self, asns, out_ptr, out_idx, out_rel,
+                 in_ptr, in_idx, in_rel):
+        self.asns = asns
+        self.out_ptr = out_ptr
+        self.out_idx = out_idx
+        self.out_rel = out_rel
+        self.in_ptr = in_ptr
+        self.in_idx = in_idx
+        self.in_rel = in_rel
+        self.ids = {asn: i for i, asn in enumerate(asns.tolist())}
+        self.adjacency = {}
+
+    def __len__(self):
+        return len(self.asns)
+
+    def __contains__(self, asn):
+        try:
+            return int(asn) in self.ids
+        except (TypeError, ValueError):
+            return False
+
+    def numberOfEdges(self):
+        return len(self.out_idx)
+
+    def idOf(self, asn):
+        # ASNs may be given as int or str, as the scripts keep them either
+        # way. Raises KeyError for an AS that is not in the graph.
+        return self.ids[int(asn)]
+
+    def outEdges(self, asn):
+        # (neighbour ids, relationship codes) of the edges leaving asn.
+        i = self.idOf(asn)
+        lo, hi = self.out_ptr[i], self.out_ptr[i + 1]
+        return self.out_idx[lo:hi], self.out_rel[lo:hi]
+
+    def inEdges(self, asn):
+        i = self.idOf(asn)
+        lo, hi = self.in_ptr[i], self.in_ptr[i + 1]
+        return self.in_idx[lo:hi], self.in_rel[lo:hi]
+
+    def successors(self, asn):
+        return self.asns[self.outEdges(asn)[0]].tolist()
+
+    def predecessors(self, asn):
+        return self.asns[self.inEdges(asn)[0]].tolist()
+
+    def outDegree(self, asn):
+        i = self.idOf(asn)
+        return int(self.out_ptr[i + 1] - self.out_ptr[i])
+
+    def inDegree(self, asn):
+        i = self.idOf(asn)
+        return int(self.in_ptr[i + 1] - self.in_ptr[i])
+
+    def rel(self, as1, as2):
+        # Relationship code of the edge from as1 to as2, REL_NONE if there
+        # is none. Outgoing edges are sorted by neighbour id, so this is a
+        # binary search within the edges of as1.
+        try:
+            i, j = self.idOf(as1), self.idOf(as2)
+        except (KeyError, TypeError, ValueError):
+            return REL_NONE
+        lo, hi = self.out_ptr[i], self.out_ptr[i + 1]
+        k = lo + int(np.searchsorted(self.out_idx[lo:hi], j))
+        if k < hi and self.out_idx[k] == j:
+            return int(self.out_rel[k])
+        return REL_NONE
+
+    def hasEdge(self, as1, as2):
+        return self.rel(as1, as2) != REL_NONE
+
+    def providers(self, asn):
+        idx, rel = self.outEdges(asn)
+        return self.asns[idx[rel == REL_P2C]].tolist()
+
+    def customers(self, asn):
+        idx, rel = self.inEdges(asn)
+        return self.asns[idx[rel == REL_P2C]].tolist()
+
+    def peers(self, asn):
+        idx, rel = self.outEdges(asn)
+        return self.asns[idx[rel == REL_P2P]].tolist()
+
+    def providerAdjacency(self):
+        # (ptr, idx) CSR of the providers of every AS, built on first use.
+        if 'provider' not in self.adjacency:
+            self.adjacency['provider'] = relAdjacency(
+                    self.out_ptr, self.out_idx, self.out_rel, REL_P2C)
+        return self.adjacency['provider']
+
+    def customerAdjacency(self):
+        if 'customer' not in self.adjacency:
+            self.adjacency['customer'] = relAdjacency(
+                    self.in_ptr, self.in_idx, self.in_rel, REL_P2C)
+        return self.adjacency['customer']
+
+    def peerAdjacency(self):
+        if 'peer' not in self.adjacency:
+            self.adjacency['peer'] = relAdjacency(
+                    self.out_ptr, self.out_idx, self.out_rel, REL_P2P)
+        return self.adjacency['peer']
+
+    def toNetworkx(self, key=str, asns=None):
+        # DiGraph with the ASNs as nodes, converted with key, and the
+        # relationship of every edge as its 'relationship' attribute. With
+        # asns given, only the subgraph induced by those ASes.
+        # reverse() added the edges into each AS in turn, so they are
+        # replayed from the incoming adjacency to keep networkx's order.
+        if asns is None:
+            keep = None
+            ids = range(len(self.asns))
+        else:
+            keep = set(self.idOf(asn) for asn in asns if asn in self)
+            ids = sorted(keep)
+        names = [key(asn) for asn in self.asns.tolist()]
+        in_ptr = self.in_ptr.tolist()
+        in_idx = self.in_idx.tolist()
+        in_rel = self.in_rel.tolist()
+        graph = nx.DiGraph()
+        graph.add_nodes_from(names[i] for i in ids)
+        for i in ids:
+            for j in range(in_ptr[i], in_ptr[i + 1]):
+                if keep is not None and in_idx[j] not in keep:
+                    continue
+                graph.add_edge(names[in_idx[j]], names[i],
+                               relationship=REL_NAMES[in_rel[j]])
+        return graph
+
+
+def buildAsRelGraph(rows, unknown=None):
+    # rows are split as-rel lines: as1, as2, relationship[, ...]. A row
+    # with fewer fields raises IndexError, as createGraph() did.
+    ids = {}
+    asns = []
+    src = []
+    dst = []
+    rels = []
+
+    def asId(asn):
+        asn = int(asn)
+        if asn not in ids:
+            ids[asn] = len(asns)
+            asns.append(asn)
+        return ids[asn]
+
+    for row in rows:
+        for as1, as2, rel in asRelEdges(row[2], row[0], row[1], unknown):
+            src.append(asId(as1))
+            dst.append(asId(as2))
+            rels.append(rel)
+
+    n = len(asns)
+    src = np.array(src, dtype=np.int64)
+    dst = np.array(dst, dtype=np.int64)
+    rels = np.array(rels, dtype=np.uint8)
+
+    # A pair listed more than once keeps the position of its first line and
+    # the relationship of its last, as repeated add_edge() calls do.
+    pairs = src * n + dst
+    keys, first = np.unique(pairs, return_index=True)
+    last = len(pairs) - 1 - np.unique(pairs[::-1], return_index=True)[1]
+    src, dst = keys // max(n, 1), keys % max(n, 1)
+    rels = rels[last]
+
+    # After reversing, every edge runs from dst to src. Outgoing edges are
+    # ordered by neighbour id and incoming ones by line, which is the order
+    # reverse() leaves them in.
+    out_order = np.lexsort((src, dst))
+    out_ptr, out_idx = csrArrays(dst, src, out_order, n)
+    in_order = np.lexsort((first, src))
+    in_ptr, in_idx = csrArrays(src, dst, in_order, n)
+
+    return AsRelGraph(np.array(asns, dtype=np.uint32),
+                      out_ptr, out_idx, rels[out_order],
+                      in_ptr, in_idx, rels[in_order])
+
+
+def fileDigest(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detectDelimiter(line):
+    # CAIDA serial-1/serial-2 files are '|' separated, the filtered copies
+    # tab separated. Anything else is split on whitespace.
+    for delimiter in ('|', '\t'):
+        if delimiter in line:
+            return delimiter
+    return None
+
+
+def readAsRelRows(f):
+    # Split rows of an as-rel file, skipping blank and '#' comment lines.
+    # The delimiter is taken from the first data line.
+    delimiter = False
+    for line in f:
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('#'):
+            continue
+        if delimiter is False:
+            delimiter = detectDelimiter(line)
+        yield line.split(delimiter)
+
+
+def snapshotPath(as_rel_file, unknown=None, cache_dir=ASREL_CACHE_DIR,
+                 digest=None):
+    if digest is None:
+        digest = fileDigest(as_rel_file)
+    return os.path.join(cache_dir, '%s-%s.npz' % (digest, unknown or 'skip'))
+
+
+def saveSnapshot(graph, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path+'.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, version=np.array(SNAPSHOT_VERSION),
+                 **{name: getattr(graph, name) for name in SNAPSHOT_ARRAYS})
+    os.replace(tmp, path)
+
+
+def loadSnapshot(path):
+    # The graph stored in a snapshot, None for a snapshot written by
+    # another version of this module.
+    with np.load(path) as data:
+        if int(data['version']) != SNAPSHOT_VERSION:
+            return None
+        return AsRelGraph(*[data[name] for name in SNAPSHOT_ARRAYS])
+
+
+def loadAsRelGraph(as_rel_file, unknown=None, cache_dir=ASREL_CACHE_DIR):
+    path = snapshotPath(as_rel_file, unknown, cache_dir)
+    if os.path.isfile(path):
+        graph = loadSnapshot(path)
+        if graph is not None:
+            return graph
+
+    with open(as_rel_file, 'r') as f:
+        graph = buildAsRelGraph(readAsRelRows(f), unknown)
+    try:
+        saveSnapshot(graph, path)
+    except OSError as err:
+        print("Could not write as-rel snapshot %s: %s" % (path, err))
+    return graph
+
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser(
+            description='Compile an as-rel file into a graph snapshot',
+            usage='%(prog)s [-i as_rel_file -c cache_dir -u unknown]')
+
+    argParser.add_argument('-i', dest='as_rel_file',
+                           help='AS relationship file to compile',
+                           type=str, default=None)
+
+    argParser.add_argument('-c', dest='cache_dir',
+                           help='Directory to keep snapshots in',
+                           type=str, default=ASREL_CACHE_DIR)
+
+    argParser.add_argument('-u', dest='unknown',
+                           help='''Relationship to give links of unknown
+                                relationship, they are dropped by default''',
+                           type=str, default=None)
+
+    args = argParser.parse_args()
+
+    if args.as_rel_file is None or not os.path.isfile(args.as_rel_file):
+        print("%s does not exist!!!" % args.as_rel_file)
+        sys.exit(-1)
+
+    graph = loadAsRelGraph(args.as_rel_file, args.unknown, args.cache_dir)
+    print("Loaded %s ASes and %s edges from %s"
+          % (len(graph), graph.numberOfEdges(),
+             snapshotPath(args.as_rel_file, args.unknown, args.cache_dir)))
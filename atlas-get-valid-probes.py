@@ -33,17 +33,8 @@ import ipaddress
 from pprint import pprint
 from pathlib import Path
 import numpy as np
-
-
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    return results
+from atlas_results import getResults
+from game_targets import defaultTargets
 
 
 if __name__ == "__main__":
@@ -76,7 +67,13 @@ if __name__ == "__main__":
                            help='Maximum RTT to filter probes to conider',
                            type=float, default=100)
 
+    argParser.add_argument('-g', dest='targets',
+                           help='''JSON file of measurement targets, the game
+                                servers by default''',
+                           type=str, default=None)
+
     args = argParser.parse_args()
+    targets = defaultTargets(args.targets)
     path = Path(args.pingmsmfile)
     invalidpath = Path(args.invalidmsms)
 
@@ -136,24 +133,10 @@ if __name__ == "__main__":
     for msm, probes in msm_probes.items():
         results = getResults(msm)
         result = results[0]
-        if result["dst_addr"] == "162.254.197.36":
-            if 'Valve' not in prov_msm_probe:
-                prov_msm_probe['Valve'] = [{msm : probes}]
-            else:
-                prov_msm_probe['Valve'].append({msm : probes})
-
-        if result["dst_addr"] == "185.60.112.157":
-            if 'Blizzard' not in prov_msm_probe:
-                prov_msm_probe['Blizzard'] = [{msm : probes}]
-            else:
-                prov_msm_probe['Blizzard'].append({msm : probes})
-
-        if result["dst_addr"] == "5.200.20.245":
-            if 'Ubisoft' not in prov_msm_probe:
-                prov_msm_probe['Ubisoft'] = [{msm : probes}]
-            else:
-                prov_msm_probe['Ubisoft'].append({msm : probes})
-
+        target = targets.targetOf(result["dst_addr"])
+        if target is None:
+            continue
+        prov_msm_probe.setdefault(target.name, []).append({msm : probes})
 
     # msm_and_probes = { k:v for k,v in msm_probes.items() if v }
 
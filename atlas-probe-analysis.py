@@ -38,6 +38,8 @@ import json
 import csv
 from pprint import pprint
 from ipwhois import IPWhois
+from atlas_results import getResults
+from atlas_probes import getProbeInfo, getProbeAsn
 #from datetime import datetime
 #from dateutil import parser
 
@@ -104,21 +106,6 @@ def seperateEdges(graph):
     return p2c_edges, p2p_edges
 
 
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    return results
-    #for res in results:
-    #    print(res)
-    #    print("\n")
-    
-    #print(results)
-
 def getProbes(isocode):
     url = BASE_PROBE_URL+str(isocode)+PROBE_PARAMS
     resp = requests.get(url)
@@ -143,16 +130,6 @@ def getProbes(isocode):
         print("There are no probes in: %s" % isocode)
         return None
 
-def getProbeInfo(probe_id):
-    url = "https://atlas.ripe.net/api/v2/probes/"+str(probe_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    #addrv4 = data["address_v4"], addrv6 = data["address_v6"]
-    #asnv4 = data["asn_v4"], id=data["id"],public=data["is_public"]
-    #anchor= data["is_anchor"]
-    return data
-
-
 def pingHops(probes, path, start, end):
     base_url = "https://atlas.ripe.net/api/v2/measurements/"
     res_url = "/results/?probe_ids="
@@ -329,8 +306,11 @@ if __name__ == "__main__":
                 srcAddr = msms['from']
                 dstAddr = msms['dst_addr']
                 hops = msms['result']
-                prb_info = getProbeInfo(msms['prb_id'])
-                prb_asn = prb_info["asn_v4"]
+                prb_asn = getProbeAsn(msms['prb_id'])
+                if prb_asn is None:
+                    print("Probe %s is not known to Atlas, skipping its trace"
+                          % msms['prb_id'])
+                    continue
                 aspath = []
                 aspath.append(prb_asn)
                 #whois_query_res = WhoisQuery(srcAddr)
@@ -353,9 +333,7 @@ if __name__ == "__main__":
                     if hop['hop'] == 1:
                         
                         if hopAddr.is_private:
-                            prb_info = getProbeInfo(msms['prb_id'])
-                            asn = prb_info["asn_v4"] 
-                            aspath.append(asn)
+                            aspath.append(prb_asn)
                         else:
                             whois_query_res = WhoisQuery(hop_addr)
 
@@ -30,27 +30,33 @@ import argparse
 import ipaddress
 import csv
 from pprint import pprint
+from atlas_fetch import iterCountryProbes, MAX_CONCURRENCY
 
-BASE_PROBE_URL = "https://atlas.ripe.net/api/v2/probes/?country_code="
-PROBE_PARAMS = "&status=1"
+PROBE_PARAMS = {'status': 1}
 
 
-def getProbes(isocode):
-    url = BASE_PROBE_URL+str(isocode)+PROBE_PARAMS
-    resp = requests.get(url)
-    data = resp.json()
+def getProbes(isocode, concurrency=MAX_CONCURRENCY):
+    for code, probes in iterCountryProbes([isocode], params=PROBE_PARAMS,
+                                          concurrency=concurrency):
+        return probes
 
-    if 'count' in data:
-        probes = data['results']
-        while data['next'] is not None:
-            url = data['next']
-            resp = requests.get(url)
-            data = resp.json()
-            probes.extend(data['results'])
 
-        return probes
+def writeProbeList(probes, filename):
+    probe_id = []
+    for probe in probes:
+        probe_id.append(str(probe['id']))
+
+    if len(probe_id) > 300:
+        n = 300
+        for i in range(0, len(probe_id)+1, n):
+            probe_list_out = ",".join(probe_id[i:i+n])
+            with open(filename+'-'+str(i+1), "w") as text:
+                text.write(probe_list_out)
     else:
-        return None
+        probe_list_out = ",".join(probe_id)
+        with open(filename, "w") as text:
+            text.write(probe_list_out)
+    return probe_id
 
 
 if __name__ == "__main__":
@@ -71,59 +77,38 @@ if __name__ == "__main__":
                            help='Filename of probe list to write',
                            type=str, default=None)
 
+    argParser.add_argument('-j', dest='concurrency',
+                           help='Number of pages to fetch concurrently',
+                           type=int, default=MAX_CONCURRENCY)
+
     args = argParser.parse_args()
 
     if args.country_code is not None:
 
         assert args.probelistname is not None
 
-        probes = getProbes(args.country_code)
+        probes = getProbes(args.country_code, args.concurrency)
 
         if probes is None:
             print("No probes found for %s" % args.country_code)
             sys.exit(0)
 
-        probe_id = []
-        for probe in probes:
-            probe_id.append(str(probe['id']))
-
-        print("Number of probes in country: %s" % len(probe_id))\
-
-        if len(probe_id) > 300:
-            n = 300
-            for i in range(0, len(probe_id)+1, n):
-                probe_list_out = ",".join(probe_id[i:i+n])
-                filename = args.probelistname+'-'+str(i+1)
-                with open(filename, "w") as text:
-                    text.write(probe_list_out)
-        else:
-            probe_list_out = ",".join(probe_id)
-            filename = args.probelistname
-            with open(args.probelistname, "w") as text:
-                text.write(probe_list_out)
+        probe_id = writeProbeList(probes, args.probelistname)
+        print("Number of probes in country: %s" % len(probe_id))
     else:
         with open(args.eu_countries_csv, 'r') as iso_eu_csv:
-            eu_countries = csv.reader(iso_eu_csv)
-            for country in eu_countries:
-                country_probes = getProbes(country[3])
-
-                if country_probes is None:
-                    print("No probes found for %s" % country[1])
-                    continue
-
-                probe_id = []
-                for probe in country_probes:
-                    probe_id.append(str(probe['id']))
-
-                if len(probe_id) > 300:
-                    n = 300
-                    for i in range(0, len(probe_id)+1, n):
-                        probe_list_out = ",".join(probe_id[i:i+n])
-                        filename = '/scratch/probe-list/'+country[1]+'-probes-'+str(i+1)
-                        with open(filename, "w") as text:
-                            text.write(probe_list_out)
-                else:
-                    probe_list_out = ",".join(probe_id)
-                    filename = '/scratch/probe-list/'+country[1]+'-probes'
-                    with open(filename, "w") as text:
-                        text.write(probe_list_out)
+            eu_countries = {country[3]: country
+                            for country in csv.reader(iso_eu_csv)}
+
+        # Countries are requested together and each list is written as
+        # soon as all of its pages have arrived.
+        for code, country_probes in iterCountryProbes(
+                eu_countries.keys(), params=PROBE_PARAMS,
+                concurrency=args.concurrency):
+            country = eu_countries[code]
+            if country_probes is None:
+                print("No probes found for %s" % country[1])
+                continue
+
+            writeProbeList(country_probes,
+                           '/scratch/probe-list/'+country[1]+'-probes')
@@ -35,26 +35,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from tabulate import tabulate
 import argparse
-
-
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    return results
-
-
-def getMsmTarget(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    target = data["target_ip"]
-    return target
+from atlas_fetch import iterMeasurements, MAX_CONCURRENCY
+from game_targets import defaultTargets, groupByProbe
 
 
 if __name__ == "__main__":
@@ -82,6 +64,15 @@ if __name__ == "__main__":
                            help='Maximum RTT to filter probes to conider',
                            type=float, default=100)
 
+    argParser.add_argument('-j', dest='concurrency',
+                           help='Number of measurements to fetch concurrently',
+                           type=int, default=MAX_CONCURRENCY)
+
+    argParser.add_argument('-g', dest='targets',
+                           help='''JSON file of measurement targets, the game
+                                servers by default''',
+                           type=str, default=None)
+
     args = argParser.parse_args()
     path = Path(args.pingmsmfile)
     directory = Path(args.plot_dir)
@@ -97,60 +88,25 @@ if __name__ == "__main__":
     with open(args.pingmsmfile, 'r') as msmfile:
         msms = json.load(msmfile)
 
+    targets = defaultTargets(args.targets)
+
     # A Dictionary of measurements and probes with game server as key
     prov_msm_probes = {}
 
-    for msm in msms:
+    for msm, metadata, results in iterMeasurements(
+            msms, concurrency=args.concurrency, ordered=True):
 
-        results = getResults(msm)
-        target = getMsmTarget(msm)
+        target = targets.targetOf(metadata["target_ip"])
 
         # print("Processing measurement: %s" % msm)
-        if target == "162.254.197.36":
-            
-            if 'Valve' not in prov_msm_probes:
-                prov_msm_probes['Valve'] = []
-            prbs_by_msm = {}
-
-            for result in results:
-                if result["prb_id"] in prbs_by_msm:
-                    prbs_by_msm[result["prb_id"]].append(result)
-                else:
-                    prbs_by_msm[result["prb_id"]] = [result]
-
-
-            for prb, prb_msms in prbs_by_msm.items():
-                prov_msm_probes['Valve'].append({prb: prb_msms})
-
-        if target == "185.60.112.157":
-
-            if 'Blizzard' not in prov_msm_probes:
-                prov_msm_probes['Blizzard'] = []
-            prbs_by_msm = {}
-
-            for result in results:
-                if result["prb_id"] in prbs_by_msm:
-                    prbs_by_msm[result["prb_id"]].append(result)
-                else:
-                    prbs_by_msm[result["prb_id"]] = [result]
-
-            for prb, prb_msms in prbs_by_msm.items():
-                prov_msm_probes['Blizzard'].append({prb: prb_msms})
-
-        if target == "5.200.20.245":
-
-            if 'Ubisoft' not in prov_msm_probes:
-                prov_msm_probes['Ubisoft'] = []
-            prbs_by_msm = {}
+        if target is None:
+            continue
 
-            for result in results:
-                if result["prb_id"] in prbs_by_msm:
-                    prbs_by_msm[result["prb_id"]].append(result)
-                else:
-                    prbs_by_msm[result["prb_id"]] = [result]
+        if target.name not in prov_msm_probes:
+            prov_msm_probes[target.name] = []
 
-            for prb, prb_msms in prbs_by_msm.items():
-                prov_msm_probes['Ubisoft'].append({prb: prb_msms})
+        for prb, prb_msms in groupByProbe(results).items():
+            prov_msm_probes[target.name].append({prb: prb_msms})
 
     prov_msm_probes_u = {}
     for server, prbs in prov_msm_probes.items():
@@ -36,37 +36,12 @@ from ipwhois.experimental import bulk_lookup_rdap
 from ipwhois import IPWhois
 from collections import OrderedDict
 from itertools import repeat
+from atlas_results import getResults, getMsmTarget
+from atlas_probes import getProbeAsn
 
 caida_prefix2as = "https://publicdata.caida.org/datasets/routing/routeviews-prefix2as/2022/09/routeviews-rv2-20220917-1200.pfx2as.gz"
                        
 
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    return results
-
-
-def getProbeInfo(probe_id):
-    url = "https://atlas.ripe.net/api/v2/probes/"+str(probe_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    return data
-
-
-def getMsmTarget(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    target = data["target_ip"]
-    return target
-
-
 if __name__ == "__main__":
 
     argParser = argparse.ArgumentParser(
@@ -207,8 +182,11 @@ if __name__ == "__main__":
     print("Number of valid traces: %s" % len(validtraceresults))
     for trace in validtraceresults:
         hops = trace['result']
-        prb_info = getProbeInfo(trace['prb_id'])
-        prb_asn = prb_info["asn_v4"]
+        prb_asn = getProbeAsn(trace['prb_id'])
+        if prb_asn is None:
+            print("Probe %s is not known to Atlas, skipping its trace"
+                  % trace['prb_id'])
+            continue
         aspath = []
         aspath.append(prb_asn)
         for hop in hops:
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+# Concurrent fetching of batches of Atlas measurements. Metadata and
+# result payloads are pulled over one shared aiohttp connection pool with
+# a bound on the number of requests in flight, a request rate limit and
+# retries with exponential backoff. Measurements already in the local
+# results store are read from disk instead. Result payloads are written
+# through to the store as they come in and handed over as iterators over
+# the stored file, so no measurement is ever held in memory whole. A
+# measurement that still fails once its retries are used up stops the
+# batch with a FetchError naming it.
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import aiohttp
+from atlas_results import (ATLAS_MSM_URL, MSM_METADATA_PARAMS, defaultStore,
+                           windowParams, deltaWindowStart, newerResults,
+                           iterResultsFile, STREAM_CHUNK_SIZE)
+from atlas_probes import ATLAS_PROBE_URL, PROBE_PAGE_SIZE
+
+MAX_CONCURRENCY = 16
+MAX_RATE = 20
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+
+    def __init__(self, msm_id, err):
+        super().__init__("Failed to fetch msm %s: %s" % (msm_id, err))
+        self.msm_id = msm_id
+        self.err = err
+
+
+class RateLimiter:
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = 0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AtlasClient:
+
+    def __init__(self, concurrency=MAX_CONCURRENCY, rate=MAX_RATE,
+                 retries=MAX_RETRIES):
+        self.concurrency = concurrency
+        self.retries = retries
+        self.limiter = RateLimiter(rate)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self.session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def getJson(self, url, params=None):
+        return await self.request(url, params,
+                                  lambda resp: resp.json(content_type=None))
+
+    async def download(self, url, path, params=None):
+        # Write the response body to path as it comes in. A retry starts
+        # the file over.
+        async def save(resp):
+            with open(path, 'wb') as f:
+                async for chunk in resp.content.iter_chunked(
+                        STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+
+        await self.request(url, params, save)
+
+    async def request(self, url, params, handle):
+        # Result of handle(resp) for a successful response, requests that
+        # fail with a transient error are retried with backoff.
+        attempt = 0
+        while True:
+            await self.limiter.wait()
+            try:
+                async with self.semaphore:
+                    async with self.session.get(url, params=params) as resp:
+                        if resp.status in RETRY_STATUS:
+                            raise aiohttp.ClientResponseError(
+                                    resp.request_info, resp.history,
+                                    status=resp.status)
+                        resp.raise_for_status()
+                        return await handle(resp)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                status = getattr(err, 'status', None)
+                if status is not None and status not in RETRY_STATUS:
+                    raise
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                delay = BACKOFF_BASE * (2 ** (attempt - 1))
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+
+async def downloadResults(client, url, params, msm_id, store, save):
+    # The payload goes to a scratch file next to the stored results and
+    # save(msm_id, results) then streams it into the store.
+    loop = asyncio.get_running_loop()
+    os.makedirs(store.msmDir(msm_id), exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.download', dir=store.msmDir(msm_id))
+    os.close(fd)
+    try:
+        await client.download(url, path, params)
+        await loop.run_in_executor(None, save, msm_id, iterResultsFile(path))
+    finally:
+        os.remove(path)
+
+
+async def fetchMeasurement(client, msm_id, store, start=None, stop=None):
+    loop = asyncio.get_running_loop()
+    if store.isFresh(msm_id, start, stop):
+        metadata = store.loadMetadata(msm_id)
+        if metadata is None:
+            # Results stored without their metadata.
+            metadata = await client.getJson(ATLAS_MSM_URL+str(msm_id)+"/",
+                                            MSM_METADATA_PARAMS)
+            await loop.run_in_executor(None, store.saveMetadata, msm_id,
+                                       metadata)
+        return msm_id, metadata, store.iterRead(msm_id, start, stop)
+
+    metadata = await client.getJson(ATLAS_MSM_URL+str(msm_id)+"/",
+                                    MSM_METADATA_PARAMS)
+
+    state = None
+    if start is None and stop is None:
+        state = store.loadState(msm_id)
+    if state is not None:
+        await loop.run_in_executor(None, store.saveMetadata, msm_id, metadata)
+        # Only results newer than the stored history are fetched and
+        # appended to it.
+        await downloadResults(
+                client, metadata['result'],
+                windowParams(deltaWindowStart(state)), msm_id, store,
+                lambda msm_id, new: store.append(msm_id,
+                                                 newerResults(new, state)))
+        return msm_id, metadata, store.iterRead(msm_id)
+
+    await loop.run_in_executor(None, store.saveMetadata, msm_id, metadata)
+    await downloadResults(
+            client, metadata['result'], windowParams(start, stop), msm_id,
+            store, lambda msm_id, results: store.write(msm_id, results,
+                                                       start, stop))
+    return msm_id, metadata, store.iterRead(msm_id, start, stop)
+
+
+async def fetchMeasurements(msm_ids, store=None, concurrency=MAX_CONCURRENCY,
+                            rate=MAX_RATE, retries=MAX_RETRIES,
+                            start=None, stop=None, ordered=False):
+    if store is None:
+        store = defaultStore()
+
+    async with AtlasClient(concurrency, rate, retries) as client:
+
+        async def fetch(msm_id):
+            try:
+                return await fetchMeasurement(client, msm_id, store,
+                                              start, stop)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError,
+                    ValueError) as err:
+                raise FetchError(msm_id, err) from err
+
+        # With ordered set, measurements are still fetched concurrently but
+        # handed over in the order of msm_ids.
+        tasks = [asyncio.ensure_future(fetch(msm_id)) for msm_id in msm_ids]
+        try:
+            pending = tasks if ordered else asyncio.as_completed(tasks)
+            for done in pending:
+                yield await done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def iterAsync(agen):
+    # Synchronous front end for scripts: an async generator of the fetch
+    # engine runs on its own event loop in a background thread and each
+    # item it produces is handed over as soon as it is available.
+    done = object()
+    fetched = queue.Queue(maxsize=MAX_CONCURRENCY)
+    stop = threading.Event()
+
+    async def produce():
+        async for item in agen:
+            if stop.is_set():
+                break
+            await asyncio.get_running_loop().run_in_executor(
+                    None, fetched.put, item)
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except BaseException as err:
+            fetched.put(err)
+        fetched.put(done)
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = fetched.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while worker.is_alive():
+            try:
+                fetched.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def iterMeasurements(msm_ids, **kwargs):
+    # Yields (msm_id, metadata, results) for each measurement, results
+    # being an iterator over its stored results. Raises FetchError for the
+    # first one that cannot be fetched.
+    return iterAsync(fetchMeasurements(msm_ids, **kwargs))
+
+
+async def fetchPages(client, url, params, page_size=PROBE_PAGE_SIZE):
+    # The first page gives the number of objects, every other page is then
+    # requested at once rather than by following the next links.
+    params = dict(params, page_size=page_size)
+    first = await client.getJson(url, params)
+    if 'count' not in first:
+        return None
+
+    pages = -(-first['count'] // page_size)
+    rest = await asyncio.gather(*[
+            client.getJson(url, dict(params, page=page))
+            for page in range(2, pages + 1)])
+    objects = list(first['results'])
+    for data in rest:
+        objects.extend(data['results'])
+    return objects
+
+
+async def fetchCountryProbes(isocodes, params=None,
+                             concurrency=MAX_CONCURRENCY, rate=MAX_RATE,
+                             retries=MAX_RETRIES):
+    params = params or {}
+    async with AtlasClient(concurrency, rate, retries) as client:
+
+        async def fetch(isocode):
+            probes = await fetchPages(client, ATLAS_PROBE_URL,
+                                      dict(params, country_code=isocode))
+            return isocode, probes
+
+        tasks = [asyncio.ensure_future(fetch(code)) for code in isocodes]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield await done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def iterCountryProbes(isocodes, **kwargs):
+    # Yields (isocode, probes) for each country as soon as all of its pages
+    # are in, probes is None when Atlas returns no listing for the country.
+    return iterAsync(fetchCountryProbes(isocodes, **kwargs))
+
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser(
+            description='Fetch a batch of Atlas measurements concurrently',
+            usage='%(prog)s [-m msmfile -j concurrency -r rate]')
+
+    argParser.add_argument('-m', dest='msmfile',
+                           help='JSON file of measurement ids to fetch',
+                           type=str, default=None)
+
+    argParser.add_argument('-j', dest='concurrency',
+                           help='Maximum number of requests in flight',
+                           type=int, default=MAX_CONCURRENCY)
+
+    argParser.add_argument('-r', dest='rate',
+                           help='Maximum number of requests per second',
+                           type=float, default=MAX_RATE)
+
+    args = argParser.parse_args()
+
+    if args.msmfile is None:
+        print("File of measurement ids not passed!!!")
+        sys.exit(-1)
+
+    with open(args.msmfile, 'r') as msmfile:
+        msms = json.load(msmfile)
+
+    try:
+        for msm, metadata, results in iterMeasurements(
+                msms, concurrency=args.concurrency, rate=args.rate):
+            print("Fetched %s results for msm: %s"
+                  % (sum(1 for result in results), msm))
+    except FetchError as err:
+        print(err)
+        sys.exit(-1)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+# Local registry of RIPE Atlas probe metadata. All probes are loaded in
+# bulk, either through the paginated probes endpoint or from an archive dump,
+# and kept in a compressed table indexed by probe id, so looking up the ASN
+# or country of a probe does not cost an HTTP request. Archive dumps are
+# normalised to the layout of the API's probe objects, so the same keys
+# work whichever way the table was built.
+
+import os
+import io
+import bz2
+import json
+import gzip
+import time
+import argparse
+import requests
+from atlas_results import RESULTS_CACHE_DIR
+
+ATLAS_PROBE_URL = "https://atlas.ripe.net/api/v2/probes/"
+PROBE_ARCHIVE_URL = "https://ftp.ripe.net/ripe/atlas/probes/archive/meta-latest"
+PROBE_TABLE = os.path.join(RESULTS_CACHE_DIR, 'probes.json.gz')
+PROBE_PAGE_SIZE = 500
+
+# Probe metadata changes slowly, the table is reloaded once a day.
+PROBE_TTL = 24 * 60 * 60
+
+# Probes fetched one at a time are appended here rather than rewriting the
+# table, and folded into it when it is next rebuilt.
+ADDED_SUFFIX = '.added.jsonl'
+
+session = requests.Session()
+
+
+def normaliseProbe(probe):
+    # Archive dumps carry the status as an id with separate name and since
+    # fields, the location as latitude and longitude and tags as plain
+    # slugs. The API has a status object, a GeoJSON point and tag objects.
+    if not isinstance(probe.get('status'), dict):
+        probe['status'] = {'id': probe.get('status'),
+                           'name': probe.pop('status_name', None),
+                           'since': probe.pop('status_since', None)}
+    if 'geometry' not in probe:
+        longitude = probe.pop('longitude', None)
+        latitude = probe.pop('latitude', None)
+        probe['geometry'] = None
+        if longitude is not None and latitude is not None:
+            probe['geometry'] = {'type': 'Point',
+                                 'coordinates': [longitude, latitude]}
+    probe['tags'] = [tag if isinstance(tag, dict)
+                     else {'name': tag, 'slug': tag}
+                     for tag in probe.get('tags') or []]
+    return probe
+
+
+def fetchAllProbes(page_size=PROBE_PAGE_SIZE):
+    url = ATLAS_PROBE_URL
+    params = {'page_size': page_size}
+    probes = []
+    while url is not None:
+        resp = session.get(url, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+        probes.extend(data['results'])
+        url = data['next']
+        params = None
+    return probes
+
+
+def readProbeArchive(source=PROBE_ARCHIVE_URL):
+    if source.startswith('http://') or source.startswith('https://'):
+        resp = session.get(source)
+        resp.raise_for_status()
+        raw = resp.content
+    else:
+        with open(source, 'rb') as f:
+            raw = f.read()
+
+    if raw[:3] == b'BZh':
+        raw = bz2.decompress(raw)
+    elif raw[:2] == b'\x1f\x8b':
+        raw = gzip.decompress(raw)
+    data = json.load(io.BytesIO(raw))
+    if isinstance(data, dict):
+        data = data['objects']
+    return data
+
+
+def fetchProbe(probe_id):
+    # None for a probe Atlas does not know.
+    url = ATLAS_PROBE_URL+str(probe_id)+"/"
+    resp = session.get(url)
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    return normaliseProbe(resp.json())
+
+
+class ProbeRegistry:
+
+    def __init__(self, path=PROBE_TABLE, ttl=PROBE_TTL, archive=None):
+        self.path = path
+        self.ttl = ttl
+        self.archive = archive
+        self.probes = None
+        self.unknown = set()
+
+    def addedPath(self):
+        return self.path+ADDED_SUFFIX
+
+    def isFresh(self):
+        if not os.path.isfile(self.path):
+            return False
+        return (time.time() - os.path.getmtime(self.path)) < self.ttl
+
+    def load(self):
+        if self.isFresh():
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                table = json.load(f)
+            self.probes = {int(prb_id): normaliseProbe(probe)
+                           for prb_id, probe in table.items()}
+            self.loadAdded()
+        else:
+            self.refresh()
+        return self
+
+    def loadAdded(self):
+        # A line cut short by an interrupted run is skipped.
+        if not os.path.isfile(self.addedPath()):
+            return
+        with open(self.addedPath(), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    probe = json.loads(line)
+                except ValueError:
+                    continue
+                self.probes[int(probe['id'])] = normaliseProbe(probe)
+
+    def refresh(self):
+        if self.archive is not None:
+            probes = readProbeArchive(self.archive)
+        else:
+            probes = fetchAllProbes()
+        self.probes = {int(probe['id']): normaliseProbe(probe)
+                       for probe in probes}
+        self.save()
+        # The new table has the probes fetched one at a time since the last
+        # one.
+        if os.path.isfile(self.addedPath()):
+            os.remove(self.addedPath())
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path+'.tmp'
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(self.probes, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def get(self, probe_id):
+        # Raises KeyError for a probe Atlas does not know.
+        if self.probes is None:
+            self.load()
+        probe_id = int(probe_id)
+        if probe_id not in self.probes and probe_id not in self.unknown:
+            self.learn(probe_id)
+        if probe_id not in self.probes:
+            raise KeyError(probe_id)
+        return self.probes[probe_id]
+
+    def learn(self, probe_id):
+        # A probe registered after the table was built is fetched on its own
+        # and appended to the side file, so later runs have it too. Probes
+        # Atlas does not know are only remembered for this run. The table
+        # itself is only rebuilt by load() once it is older than ttl, which
+        # scripts forking workers do in the parent.
+        probe = fetchProbe(probe_id)
+        if probe is None:
+            self.unknown.add(probe_id)
+            return
+        self.probes[probe_id] = probe
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.addedPath(), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(probe, ensure_ascii=False)+'\n')
+
+    def asn(self, probe_id):
+        # None for a probe Atlas does not know.
+        try:
+            return self.get(probe_id).get('asn_v4')
+        except KeyError:
+            return None
+
+    def __contains__(self, probe_id):
+        if self.probes is None:
+            self.load()
+        return int(probe_id) in self.probes
+
+    def __len__(self):
+        if self.probes is None:
+            self.load()
+        return len(self.probes)
+
+
+_default_registry = None
+
+
+def defaultRegistry():
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ProbeRegistry()
+    return _default_registry
+
+
+def getProbeInfo(probe_id):
+    return defaultRegistry().get(probe_id)
+
+
+def getProbeAsn(probe_id):
+    return defaultRegistry().asn(probe_id)
+
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser(
+            description='Build the local table of Atlas probe metadata',
+            usage='%(prog)s [-a archive -o probe_table]')
+
+    argParser.add_argument('-a', dest='archive',
+                           help='''Probe archive dump (file or URL) to load
+                                instead of paging through the API''',
+                           type=str, default=None)
+
+    argParser.add_argument('-o', dest='probe_table',
+                           help='File to write the probe table to',
+                           type=str, default=PROBE_TABLE)
+
+    args = argParser.parse_args()
+
+    registry = ProbeRegistry(args.probe_table, archive=args.archive)
+    registry.refresh()
+    print("Stored metadata of %s probes in %s"
+          % (len(registry), args.probe_table))
@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+# Shared access to RIPE Atlas measurement results. Results are kept in a
+# local store of gzip compressed JSON lines files, one file per measurement
+# and start/stop window, so that re-running an analysis over the same
+# measurement IDs reads from disk instead of going back to the Atlas API.
+
+import os
+import sys
+import json
+import gzip
+import time
+import shutil
+import argparse
+import requests
+from itertools import chain
+
+ATLAS_MSM_URL = "https://atlas.ripe.net/api/v2/measurements/"
+RESULTS_CACHE_DIR = os.environ.get('ATLAS_CACHE_DIR',
+                                   '/scratch/measurements/cache')
+
+# Results of ongoing measurements are refetched once they are older than
+# this many seconds. Results of finished measurements, or of windows that
+# had already closed when they were stored, never go stale.
+ONGOING_MAX_AGE = 6 * 60 * 60
+
+# Atlas status ids of measurements that will not produce new results:
+# stopped, forced to stop, no suitable probes, failed and archived.
+FINISHED_STATUS = {4, 5, 6, 7, 8}
+
+# Ask for the probe list along with the measurement document.
+MSM_METADATA_PARAMS = {'optional_fields': 'probes'}
+
+# When only newer results of a measurement are fetched, the window starts
+# this many seconds before the last result already stored, to pick up
+# results that probes uploaded late. Results stored before the previous
+# fetch are dropped from the overlap.
+LATE_RESULT_SLACK = 60 * 60
+
+# Size in characters of the pieces result payloads are parsed in.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+session = requests.Session()
+
+
+def iterJsonArray(chunks):
+    # Parse a JSON array handed over in pieces of text and yield its
+    # elements one at a time, so only one result is held in memory however
+    # large the array is.
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buf = buf[pos:]+chunk
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buf):
+                break
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError("Expected a JSON array of results")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break
+            pos = end
+            yield obj
+    if started or buf[pos:].strip():
+        raise ValueError("Truncated JSON array of results")
+
+
+def readChunks(f, size=STREAM_CHUNK_SIZE):
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iterResultsFile(path):
+    # Results on disk are either a JSON array, as saved from the Atlas API,
+    # or JSON lines, as kept in the results store, optionally gzipped.
+    if path.endswith('.gz'):
+        f = gzip.open(path, 'rt', encoding='utf-8')
+    else:
+        f = open(path, 'r', encoding='utf-8')
+    with f:
+        head = f.read(1)
+        while head.isspace():
+            head = f.read(1)
+        if not head:
+            return
+        if head == '[':
+            yield from iterJsonArray(chain([head], readChunks(f)))
+        else:
+            for line in chain([head+f.readline()], f):
+                if line.strip():
+                    yield json.loads(line)
+
+
+def iterResultsUrl(url, params=None):
+    resp = session.get(url, params=params, stream=True)
+    resp.raise_for_status()
+    resp.encoding = 'utf-8'
+    with resp:
+        yield from iterJsonArray(resp.iter_content(STREAM_CHUNK_SIZE,
+                                                   decode_unicode=True))
+
+
+def trackResult(state, result):
+    timestamp = result.get('timestamp', 0)
+    stored = result.get('stored_timestamp', timestamp)
+    state['last_timestamp'] = max(state.get('last_timestamp', 0), timestamp)
+    state['last_stored_timestamp'] = max(
+            state.get('last_stored_timestamp', 0), stored)
+
+
+def deltaWindowStart(state):
+    return max(state['last_timestamp'] - LATE_RESULT_SLACK, 0)
+
+
+def newerResults(results, state):
+    for result in results:
+        stored = result.get('stored_timestamp', result.get('timestamp', 0))
+        if stored > state['last_stored_timestamp']:
+            yield result
+
+
+def msmFinished(metadata):
+    if metadata is None:
+        return False
+    status = metadata.get('status') or {}
+    return status.get('id') in FINISHED_STATUS
+
+
+class ResultsStore:
+
+    def __init__(self, cache_dir=RESULTS_CACHE_DIR, max_age=ONGOING_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+
+    def msmDir(self, msm_id):
+        return os.path.join(self.cache_dir, str(msm_id))
+
+    def resultsPath(self, msm_id, start=None, stop=None):
+        window = "%s-%s" % (start if start is not None else 'first',
+                            stop if stop is not None else 'last')
+        return os.path.join(self.msmDir(msm_id),
+                            'results-'+window+'.jsonl.gz')
+
+    def metadataPath(self, msm_id):
+        return os.path.join(self.msmDir(msm_id), 'metadata.json')
+
+    def loadMetadata(self, msm_id):
+        path = self.metadataPath(msm_id)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def saveMetadata(self, msm_id, metadata):
+        os.makedirs(self.msmDir(msm_id), exist_ok=True)
+        path = self.metadataPath(msm_id)
+        tmp = path+'.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    # The state of a measurement records the newest timestamp and
+    # stored_timestamp in its stored full history, so that later refreshes
+    # only need to ask Atlas for results after them.
+
+    def statePath(self, msm_id):
+        return os.path.join(self.msmDir(msm_id), 'state.json')
+
+    def loadState(self, msm_id):
+        path = self.statePath(msm_id)
+        if not os.path.isfile(path):
+            return None
+        if not os.path.isfile(self.resultsPath(msm_id)):
+            return None
+        with open(path, 'r') as f:
+            state = json.load(f)
+        if 'last_timestamp' not in state:
+            return None
+        return state
+
+    def saveState(self, msm_id, state):
+        path = self.statePath(msm_id)
+        tmp = path+'.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def isFresh(self, msm_id, start=None, stop=None):
+        path = self.resultsPath(msm_id, start, stop)
+        if not os.path.isfile(path):
+            return False
+
+        stored_at = os.path.getmtime(path)
+        if stop is not None and stop < stored_at:
+            return True
+
+        if msmFinished(self.loadMetadata(msm_id)):
+            return True
+
+        return (time.time() - stored_at) < self.max_age
+
+    def iterRead(self, msm_id, start=None, stop=None):
+        return iterResultsFile(self.resultsPath(msm_id, start, stop))
+
+    def read(self, msm_id, start=None, stop=None):
+        return list(self.iterRead(msm_id, start, stop))
+
+    def writeThrough(self, msm_id, results, start=None, stop=None):
+        # Yield results while storing them. The stored file is only
+        # replaced once every result has gone through.
+        os.makedirs(self.msmDir(msm_id), exist_ok=True)
+        path = self.resultsPath(msm_id, start, stop)
+        tmp = path+'.'+str(os.getpid())+'.tmp'
+        state = {}
+        complete = False
+        try:
+            with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+                for result in results:
+                    f.write(json.dumps(result, ensure_ascii=False))
+                    f.write('\n')
+                    trackResult(state, result)
+                    yield result
+            complete = True
+        finally:
+            if complete:
+                os.replace(tmp, path)
+                if start is None and stop is None and state:
+                    self.saveState(msm_id, state)
+            elif os.path.exists(tmp):
+                os.remove(tmp)
+
+    def appendThrough(self, msm_id, results):
+        # Yield newer results of a measurement while appending them to its
+        # stored full history. They are collected in a gzip member of their
+        # own which is added to the end of the stored file once every
+        # result has gone through.
+        path = self.resultsPath(msm_id)
+        delta = path+'.'+str(os.getpid())+'.delta'
+        state = self.loadState(msm_id)
+        complete = False
+        try:
+            with gzip.open(delta, 'wt', encoding='utf-8') as f:
+                for result in results:
+                    f.write(json.dumps(result, ensure_ascii=False))
+                    f.write('\n')
+                    trackResult(state, result)
+                    yield result
+            complete = True
+        finally:
+            if complete:
+                with open(path, 'ab') as out, open(delta, 'rb') as new:
+                    shutil.copyfileobj(new, out)
+                self.saveState(msm_id, state)
+            if os.path.exists(delta):
+                os.remove(delta)
+
+    def append(self, msm_id, results):
+        for result in self.appendThrough(msm_id, results):
+            pass
+
+    def write(self, msm_id, results, start=None, stop=None):
+        for result in self.writeThrough(msm_id, results, start, stop):
+            pass
+
+
+_default_store = None
+
+
+def defaultStore():
+    global _default_store
+    if _default_store is None:
+        _default_store = ResultsStore()
+    return _default_store
+
+
+def getMsmMetadata(measurement_id):
+    url = ATLAS_MSM_URL+str(measurement_id)+"/"
+    resp = session.get(url, params=MSM_METADATA_PARAMS)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def windowParams(start=None, stop=None):
+    params = {}
+    if start is not None:
+        params['start'] = int(start)
+    if stop is not None:
+        params['stop'] = int(stop)
+    return params
+
+
+class Measurement:
+
+    # The measurement document is fetched at most once per process and is
+    # kept in the results store, so the target, type, interval and probes
+    # of a measurement cost no request once its results have been fetched.
+
+    def __init__(self, msm_id, store=None, metadata=None):
+        self.msm_id = msm_id
+        self.store = store if store is not None else defaultStore()
+        self._metadata = metadata
+        self._fetched = metadata is not None
+
+    def fetchMetadata(self):
+        self._metadata = getMsmMetadata(self.msm_id)
+        self._fetched = True
+        self.store.saveMetadata(self.msm_id, self._metadata)
+        return self._metadata
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = self.store.loadMetadata(self.msm_id)
+        if self._metadata is None:
+            self.fetchMetadata()
+        return self._metadata
+
+    @property
+    def target(self):
+        return self.metadata['target_ip']
+
+    @property
+    def type(self):
+        return self.metadata['type']
+
+    @property
+    def interval(self):
+        return self.metadata.get('interval')
+
+    @property
+    def probes(self):
+        return [probe['id'] for probe in self.metadata.get('probes') or []]
+
+    def results(self, start=None, stop=None, refresh=False):
+        if not refresh and self.store.isFresh(self.msm_id, start, stop):
+            return self.store.iterRead(self.msm_id, start, stop)
+
+        # The status of an ongoing measurement read back from the store may
+        # be out of date, refresh it along with the results.
+        if not self._fetched and not msmFinished(self.metadata):
+            self.fetchMetadata()
+
+        # With part of the full history already stored, only results after
+        # it are fetched and appended.
+        if not refresh and start is None and stop is None:
+            state = self.store.loadState(self.msm_id)
+            if state is not None:
+                params = windowParams(deltaWindowStart(state))
+                new = newerResults(iterResultsUrl(self.metadata['result'],
+                                                  params), state)
+                return chain(self.store.iterRead(self.msm_id),
+                             self.store.appendThrough(self.msm_id, new))
+
+        results = iterResultsUrl(self.metadata['result'],
+                                 windowParams(start, stop))
+        return self.store.writeThrough(self.msm_id, results, start, stop)
+
+    def getResults(self, start=None, stop=None, refresh=False):
+        return list(self.results(start, stop, refresh))
+
+
+_measurements = {}
+
+
+def getMeasurement(measurement_id, store=None):
+    if store is not None:
+        return Measurement(measurement_id, store)
+    key = str(measurement_id)
+    if key not in _measurements:
+        _measurements[key] = Measurement(measurement_id)
+    return _measurements[key]
+
+
+def getResults(measurement_id, start=None, stop=None, store=None,
+               refresh=False):
+    return getMeasurement(measurement_id, store).getResults(start, stop,
+                                                            refresh)
+
+
+def getMsmTarget(measurement_id):
+    return getMeasurement(measurement_id).target
+
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser(
+            description='Fill the local store of Atlas measurement results',
+            usage='%(prog)s [-m msmfile -d cache_dir -f]')
+
+    argParser.add_argument('-m', dest='msmfile',
+                           help='JSON file of measurement ids to fetch',
+                           type=str, default=None)
+
+    argParser.add_argument('-d', dest='cache_dir',
+                           help='Directory of the local results store',
+                           type=str, default=RESULTS_CACHE_DIR)
+
+    argParser.add_argument('-f', dest='refresh',
+                           help='Refetch results even if they are fresh',
+                           action='store_true', default=False)
+
+    args = argParser.parse_args()
+
+    if args.msmfile is None:
+        print("File of measurement ids not passed!!!")
+        sys.exit(-1)
+
+    with open(args.msmfile, 'r') as msmfile:
+        msms = json.load(msmfile)
+
+    store = ResultsStore(args.cache_dir)
+    for msm in msms:
+        results = getResults(msm, store=store, refresh=args.refresh)
+        print("Stored %s results for msm: %s" % (len(results), msm))
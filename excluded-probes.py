@@ -29,17 +29,7 @@ import argparse
 import json
 from pprint import pprint
 from pathlib import Path
-
-
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    return results
+from atlas_results import getResults
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Registry of the destinations the measurements target. A target has a
+# name, the addresses measured towards it, the ASNs of its network (paths
+# are cut or skipped at those) and optionally the only protocol whose
+# traceroutes are used for it. Results are bucketed by destination with one
+# dict lookup each, so any number of targets is handled in one run.
+#
+# The game servers are built in; other targets can be listed in a JSON file
+# of {"name": ..., "ips": [...], "asns": [...], "proto": ...} objects.
+
+import json
+from collections import OrderedDict
+
+
+class Target:
+
+    def __init__(self, name, ips, asns=(), proto=None):
+        self.name = name
+        self.ips = frozenset(ips)
+        self.asns = frozenset(int(asn) for asn in asns)
+        self.proto = proto
+
+    def accepts(self, result):
+        return self.proto is None or result.get('proto') == self.proto
+
+    def isTargetAsn(self, asn):
+        try:
+            return int(asn) in self.asns
+        except (TypeError, ValueError):
+            return False
+
+    def __repr__(self):
+        return 'Target(%r, %r, %r, %r)' % (self.name, sorted(self.ips),
+                                           sorted(self.asns), self.proto)
+
+
+GAME_TARGETS = [Target('Valve', ['162.254.197.36'], [32590]),
+                Target('Blizzard', ['185.60.112.157'], [57976], proto='ICMP'),
+                Target('Ubisoft', ['5.200.20.245'], [49544])]
+
+
+class TargetRegistry:
+
+    def __init__(self, targets=GAME_TARGETS):
+        self.targets = OrderedDict((target.name, target)
+                                   for target in targets)
+        self.by_ip = {}
+        for target in self.targets.values():
+            for ip in target.ips:
+                self.by_ip[ip] = target
+        self.ips = frozenset(self.by_ip)
+        self.asns = frozenset(asn for target in self.targets.values()
+                              for asn in target.asns)
+
+    def __iter__(self):
+        return iter(self.targets.values())
+
+    def __getitem__(self, name):
+        return self.targets[name]
+
+    def __len__(self):
+        return len(self.targets)
+
+    def names(self):
+        return list(self.targets)
+
+    def targetOf(self, addr):
+        # Target an address belongs to, None for any other address.
+        return self.by_ip.get(addr)
+
+    def isTargetAsn(self, asn):
+        try:
+            return int(asn) in self.asns
+        except (TypeError, ValueError):
+            return False
+
+    def select(self, names):
+        # Registry of only the named targets, names being a list or a comma
+        # separated string.
+        if isinstance(names, str):
+            names = [name.strip() for name in names.split(',')
+                     if name.strip()]
+        return TargetRegistry([self.targets[name] for name in names])
+
+    def groupResults(self, results, key='dst_addr'):
+        # {target name: {prb_id: [results]}} of the results towards any of
+        # the targets, in the order results come in.
+        grouped = OrderedDict((name, OrderedDict()) for name in self.targets)
+        for result in results:
+            target = self.by_ip.get(result.get(key))
+            if target is None or not target.accepts(result):
+                continue
+            grouped[target.name].setdefault(result['prb_id'],
+                                            []).append(result)
+        return grouped
+
+
+def groupByProbe(results):
+    grouped = OrderedDict()
+    for result in results:
+        grouped.setdefault(result['prb_id'], []).append(result)
+    return grouped
+
+
+def loadTargets(targets_file):
+    with open(targets_file, 'r') as f:
+        return TargetRegistry([Target(target['name'], target['ips'],
+                                      target.get('asns', ()),
+                                      target.get('proto'))
+                               for target in json.load(f)])
+
+
+def defaultTargets(targets_file=None):
+    if targets_file is None:
+        return TargetRegistry()
+    return loadTargets(targets_file)
@@ -25,13 +25,7 @@
 
 import json
 from pprint import pprint
-import requests
-
-def getProbeInfo(probe_id):
-    url = "https://atlas.ripe.net/api/v2/probes/"+str(probe_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    return data
+from atlas_probes import getProbeAsn
 
 
 if __name__ == "__main__":
@@ -66,15 +60,18 @@ if __name__ == "__main__":
     print("Total number of probes used for measurements to the three servers: %s" % len(probes))
     prb_to_asn = {}
     for prb_id in probes:
-        prb_info = getProbeInfo(prb_id)
-        prb_asn = prb_info["asn_v4"]
+        prb_asn = getProbeAsn(prb_id)
+        if prb_asn is None:
+            print("Probe %s is not known to Atlas" % prb_id)
+            continue
         prb_to_asn[prb_id] = prb_asn
 
    
     blizzard_origin_asns = set()
     for prb in blizzard_probe_list:
         (prb_id, msms), = prb.items()
-        blizzard_origin_asns.add(prb_to_asn[prb_id])
+        if prb_id in prb_to_asn:
+            blizzard_origin_asns.add(prb_to_asn[prb_id])
 
     print("Probes in measurement to blizzard are distributed across: %s ASNs" % len(blizzard_origin_asns))
 
@@ -82,14 +79,16 @@ if __name__ == "__main__":
     ubisoft_origin_asns = set()
     for prb in ubisoft_probe_list:
         (prb_id, msms), = prb.items()
-        ubisoft_origin_asns.add(prb_to_asn[prb_id])
+        if prb_id in prb_to_asn:
+            ubisoft_origin_asns.add(prb_to_asn[prb_id])
 
     print("Probes in measurement to ubisoft are distributed across: %s ASNs" % len(ubisoft_origin_asns))
     
     valve_origin_asns = set()
     for prb in valve_probe_list:
         (prb_id, msms), = prb.items()
-        valve_origin_asns.add(prb_to_asn[prb_id])
+        if prb_id in prb_to_asn:
+            valve_origin_asns.add(prb_to_asn[prb_id])
 
     print("Probes in measurement to valve are distributed across: %s ASNs" % len(valve_origin_asns))
    
@@ -30,7 +30,6 @@ import requests
 import argparse
 import ipaddress
 import _pyipmeta
-import pytricia
 from pprint import pprint
 from pathlib import Path
 from collections import OrderedDict, Counter
@@ -41,28 +40,13 @@ import matplotlib.mlab as mlab
 from networkx import path_graph, random_layout
 from pyvis.network import Network
 import numpy as np
+from atlas_results import getResults, getMsmTarget
+from atlas_probes import getProbeInfo
+from pfx2as_index import loadPfx2asIndex
 
 caida_prefix2as = "https://publicdata.caida.org/datasets/routing/routeviews-prefix2as/2022/09/routeviews-rv2-20220920-1200.pfx2as.gz"
 
 
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    return results
-
-
-def getProbeInfo(probe_id):
-    url = "https://atlas.ripe.net/api/v2/probes/"+str(probe_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    return data
-
-
 def validaspathsprobe(aspathsprb):
     aspath2prb_valid = {}
     for server, prbs in aspathsprb.items():
@@ -294,14 +278,6 @@ def pyvisualise(graph, name):
     #net.show('/scratch/measurements/analysis/path-latency-visualisation/'+(name)+'.html')
 
 
-def getMsmTarget(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    target = data["target_ip"]
-    return target
-
 def rtt_to_aspath(res, aspaths, valve,
                   ubisoft, blizzard, ip2asn, pyt):
     valve_path_rtt = {}
@@ -378,7 +354,6 @@ def rtt_to_aspath(res, aspaths, valve,
             hop_dict_med['median rtt'] = np.median(rtts)
 
 
-
 if __name__ == "__main__":
 
     msm_list = []
@@ -391,11 +366,7 @@ if __name__ == "__main__":
     with open('/scratch/measurements/aspath/probes-asn-paths-to-server/list-of-asns-and-probes-common-to-msms-to-the-three-game-servers-and-their-paths.json', 'r') as validlist:
         commonASNsandProbes = json.load(validlist)
 
-    pyt = pytricia.PyTricia(128)
-    with open('/scratch/ip2as.pfx2as', 'r') as f:
-        prefix2as_file = csv.reader(f, delimiter=' ')
-        for prefix2as in prefix2as_file:
-            pyt.insert(prefix2as[0], prefix2as[1])
+    pyt = loadPfx2asIndex('/scratch/ip2as.pfx2as')
 
     ipm = _pyipmeta.IpMeta()
     ipm_prov = ipm.get_provider_by_name("pfx2as")
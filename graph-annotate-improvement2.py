@@ -26,14 +26,13 @@
 import csv
 import sys
 import json
-import requests
 import argparse
 import ipaddress
 import _pyipmeta
-import pytricia
 from pprint import pprint
 from pathlib import Path
 from collections import OrderedDict, Counter
+from itertools import chain
 from pprint import pprint
 import networkx as nx
 import matplotlib.pyplot as plt
@@ -42,29 +41,15 @@ from networkx import path_graph, random_layout
 from pyvis.network import Network
 import numpy as np
 from glob import glob
+from atlas_results import iterResultsFile
+from pfx2as_index import loadPfx2asIndex
+from ip2asn import IpToAsnResolver, MapSource, IndexSource
+from hop_table import hopTable, annotateHops, rttPerAsn
+from probe_index import asnProbes
 
 caida_prefix2as = "https://publicdata.caida.org/datasets/routing/routeviews-prefix2as/2022/09/routeviews-rv2-20220920-1200.pfx2as.gz"
 
 
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    print("Fetched results for msm: %s" % measurement_id)
-    return results
-
-
-def getProbeInfo(probe_id):
-    url = "https://atlas.ripe.net/api/v2/probes/"+str(probe_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    return data
-
-
 def validaspathsprobe(aspathsprb):
     aspath2prb_valid = {}
     for server, prbs in aspathsprb.items():
@@ -192,44 +177,8 @@ def GetASNFromProbes(common_probes_to_all_servers,
                      valve_aspaths_from_prb,
                      ubisoft_aspaths_from_prb,
                      blizzard_aspaths_from_prb):
-    asn_of_common_valid_probes = {}
-    for prb_id in common_probes_to_all_servers:
-        for prb in valve_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-
-        for prb in ubisoft_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-
-        for prb in blizzard_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-    return asn_of_common_valid_probes
+    return asnProbes(common_probes_to_all_servers, valve_aspaths_from_prb,
+                     ubisoft_aspaths_from_prb, blizzard_aspaths_from_prb)
 
 
 def createGraph(asnFromProbeLst, valve_aspaths_from_prb,
@@ -329,15 +278,6 @@ def pyvisualise(graph, name):
     #net.show('/scratch/measurements/analysis/path-latency-visualisation/'+(name)+'.html')
 
 
-def getMsmTarget(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    target = data["target_ip"]
-    return target
-
-
 def rtt_to_aspath(res, aspath, ip2asn, pyt):
     trace1 = res[0]
     msm_id = trace1['msm_id']
@@ -408,68 +348,25 @@ def rtt_to_aspath(res, aspath, ip2asn, pyt):
         print("Median RTT to last hop in ASN %s is %s"
               %(asn,asn_to_hops[asn][max(hops_list)]['median rtt']))
         
-def rtt_to_aspath2(res, ip2asn, pyt):
-    trace1 = res
-    msm_id = trace1['msm_id']
-    prb_id = trace1['prb_id']
-    hops = trace1['result']
-    asn_to_hops = {}
-    for hop in hops:
-        hop_nop = hop['hop']
-        try:
-            hop_results = hop['result']
-        except KeyError:
-            continue
-
-        rtts = []
-        hop_ip_addrs = set()
-        hop_asn = set()
-        for rtt_to_hop in hop_results:
-            try:
-                hop_ip_addrs.add(rtt_to_hop['from'])
-            except KeyError:
-                continue
-
-            try:
-                rtts.append(rtt_to_hop['rtt'])
-            except KeyError:
-                continue
-
-        if len(rtts) > 0:
-            median = np.median(rtts)
-        else:
-            median = 0
-
-        for hop_ip in hop_ip_addrs:
-            try:
-                hopAddr = ipaddress.ip_address(hop_ip)
-            except ValueError:
-                continue
-
-            if hopAddr.is_global:
-                asn = None 
-                if hop_ip in ip2asn:
-                    asn = ip2asn[hop_ip]
-                else:
-                    asn = pyt.get(hop_ip)
-                if asn is not None:
-
-                    if not isinstance(asn, int):
-                        asn = int(asn)
-
-                    if asn not in asn_to_hops:
-                        asn_to_hops[asn] = { hop_nop: { 'rtt': rtts,
-                                                        'median rtt': median,
-                                                        'hop ip': [hop_ip]}}
-                    else:
-                        if hop_nop not in asn_to_hops[asn]:
-                            asn_to_hops[asn][hop_nop] = { 'rtt': rtts,
-                                                          'median rtt': median,
-                                                          'hop ip': [hop_ip]}
-                        else:
-                            asn_to_hops[asn][hop_nop]['hop ip'].append(hop_ip)
-
-    return  asn_to_hops
+def asnHopsByTrace(per_asn):
+    # {asn: {hop: {'rtt', 'median rtt', 'hop ip'}}} of every traceroute,
+    # keyed by (msm_id, prb_id, timestamp), from hop_table.rttPerAsn().
+    traces = {}
+    for row in per_asn.itertuples(index=False):
+        key = (int(row.msm_id), int(row.prb_id), int(row.timestamp))
+        asn_to_hops = traces.setdefault(key, {})
+        asn_to_hops.setdefault(int(row.asn), {})[int(row.hop_no)] = {
+                'rtt': row.rtts,
+                'median rtt': row.median_rtt,
+                'hop ip': list(row.hop_ips)}
+    return traces
+
+
+def rtt_to_aspath2(res, trace_asn_hops):
+    # The ASes a traceroute crosses with their hops, looked up in the table
+    # asnHopsByTrace() built for all traceroutes at once.
+    return trace_asn_hops.get((res['msm_id'], res['prb_id'],
+                               res.get('timestamp', 0)), {})
     #print("ASN to hops for PROBE %s in MSM%s: %s" %(prb_id, msm_id, asn_to_hops))
     #last_hop_asn = {}
     #for asn, hops in asn_to_hops.items():
@@ -482,20 +379,12 @@ def rtt_to_aspath2(res, ip2asn, pyt):
 
 if __name__ == "__main__":
 
-    msm_list = []
-    for raw_msm in glob('/scratch/measurements/traceroute/raw-measurements-results/*.json'):
-        with open(raw_msm, 'r') as f:
-            msm_raw = json.load(f)
-            msm_list.append(msm_raw)
+    msm_files = glob('/scratch/measurements/traceroute/raw-measurements-results/*.json')
 
     with open('/scratch/measurements/aspath/probes-asn-paths-to-server/list-of-asns-and-probes-common-to-msms-to-the-three-game-servers-and-their-paths.json', 'r') as validlist:
         commonASNsandProbes = json.load(validlist)
 
-    pyt = pytricia.PyTricia(128)
-    with open('/scratch/ip2as.pfx2as', 'r') as f:
-        prefix2as_file = csv.reader(f, delimiter=' ')
-        for prefix2as in prefix2as_file:
-            pyt.insert(prefix2as[0], prefix2as[1])
+    pyt = loadPfx2asIndex('/scratch/ip2as.pfx2as')
 
     ipm = _pyipmeta.IpMeta()
     ipm_prov = ipm.get_provider_by_name("pfx2as")
@@ -503,6 +392,8 @@ if __name__ == "__main__":
     with open('/scratch/measurements/ip2asn/traceip2asn.json', 'r') as ip2asnjson:
         ip2asn = json.load(ip2asnjson)
 
+    resolver = IpToAsnResolver([MapSource(ip2asn), IndexSource(pyt)])
+
     with open('/scratch/measurements/aspath/aspath-for-trace-msms-to-ubisoft-and-valve-servers.json', 'r') as f:
         aspathsprb_v_and_u = json.load(f)
 
@@ -538,7 +429,7 @@ if __name__ == "__main__":
     TraceMSMToUbisoft = {}
 
 
-    for msm in msm_list:
+    for msm in map(iterResultsFile, msm_files):
         for result in msm:
             if result["dst_name"] == "162.254.197.36":
                 if result["prb_id"] in TraceMSMToValve:
@@ -564,6 +455,14 @@ if __name__ == "__main__":
                 else:
                     TraceMSMToUbisoft[result["prb_id"]] = [result]
 
+    # The hops of every traceroute to the servers are put in one table,
+    # annotated and grouped by AS once, rather than walked per trace.
+    traces = chain.from_iterable(chain(TraceMSMToValve.values(),
+                                       TraceMSMToBlizzard.values(),
+                                       TraceMSMToUbisoft.values()))
+    TraceAsnHops = asnHopsByTrace(rttPerAsn(annotateHops(hopTable(traces),
+                                                         resolver)))
+
 
     for asn, vals in commonASNsandProbes.items():
         if int(asn) not in ASNsWithDisjointPaths:
@@ -660,7 +559,7 @@ if __name__ == "__main__":
 
             for msm in valve:
                 #print("For probe %s in MSM %s to Valve:" %(msm['prb_id'], msm['msm_id']))
-                aspath_rtt = rtt_to_aspath2(msm, ip2asn, pyt)
+                aspath_rtt = rtt_to_aspath2(msm, TraceAsnHops)
                 asns = aspath_rtt.keys()
                 intersect = providers.intersection(set(asns))
                 if len(intersect) != 0:
@@ -693,7 +592,7 @@ if __name__ == "__main__":
 
             for msm in blizzard:
                 #print("For probe %s in MSM %s to Blizzard:" %(msm['prb_id'], msm['msm_id']))
-                aspath_rtt = rtt_to_aspath2(msm, ip2asn, pyt)
+                aspath_rtt = rtt_to_aspath2(msm, TraceAsnHops)
                 asns = aspath_rtt.keys()
                 intersect = providers.intersection(set(asns))
                 if len(intersect) != 0:
@@ -726,7 +625,7 @@ if __name__ == "__main__":
 
             for msm in ubisoft:
                 #print("For probe %s in MSM %s to Ubisoft:" %(msm['prb_id'], msm['msm_id']))
-                aspath_rtt = rtt_to_aspath2(msm, ip2asn, pyt)
+                aspath_rtt = rtt_to_aspath2(msm, TraceAsnHops)
                 asns = aspath_rtt.keys()
                 intersect = providers.intersection(set(asns))
                 if len(intersect) != 0:
@@ -789,7 +688,7 @@ if __name__ == "__main__":
                     if path[-2] in providers:
                         msms = TraceMSMToValve[prb_id]
                         for msm in msms:
-                            aspath_rtt = rtt_to_aspath2(msm, ip2asn, pyt)
+                            aspath_rtt = rtt_to_aspath2(msm, TraceAsnHops)
                             asns = list(aspath_rtt.keys())
                             intersect = providers.intersection(set(asns))
                             if len(intersect) != 0:
@@ -816,7 +715,7 @@ if __name__ == "__main__":
                     if path[-2] in providers:
                         msms = TraceMSMToBlizzard[prb_id]
                         for msm in msms:
-                            aspath_rtt = rtt_to_aspath2(msm, ip2asn, pyt)
+                            aspath_rtt = rtt_to_aspath2(msm, TraceAsnHops)
                             asns = list(aspath_rtt.keys())
                             #print("asns: %s" % asns)
                             #print("Providers: %s" % providers)
@@ -845,7 +744,7 @@ if __name__ == "__main__":
                     if path[-2] in providers:
                         msms = TraceMSMToUbisoft[prb_id]
                         for msm in msms:
-                            aspath_rtt = rtt_to_aspath2(msm, ip2asn, pyt)
+                            aspath_rtt = rtt_to_aspath2(msm, TraceAsnHops)
                             asns = list(aspath_rtt.keys())
                             intersect = providers.intersection(set(asns))
                             if len(intersect) != 0:
@@ -26,14 +26,13 @@
 import csv
 import sys
 import json
-import requests
 import argparse
 import ipaddress
 import _pyipmeta
-import pytricia
 from pprint import pprint
 from pathlib import Path
 from collections import OrderedDict, Counter
+from itertools import compress, chain
 from pprint import pprint
 import networkx as nx
 import matplotlib.pyplot as plt
@@ -44,29 +43,16 @@ import numpy as np
 from glob import glob
 import gravis as gv
 from datetime import datetime
+from atlas_results import iterResultsFile
+from pfx2as_index import loadPfx2asIndex
+from ip2asn import IpToAsnResolver, MapSource, IndexSource
+from ip_class import classifyAddresses
+from game_targets import defaultTargets
+from probe_index import asnProbes, ProbeIndex
 
 caida_prefix2as = "https://publicdata.caida.org/datasets/routing/routeviews-prefix2as/2022/09/routeviews-rv2-20220920-1200.pfx2as.gz"
 
 
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    print("Fetched results for msm: %s" % measurement_id)
-    return results
-
-
-def getProbeInfo(probe_id):
-    url = "https://atlas.ripe.net/api/v2/probes/"+str(probe_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    return data
-
-
 def validaspathsprobe(aspathsprb):
     aspath2prb_valid = {}
     for server, prbs in aspathsprb.items():
@@ -195,44 +181,8 @@ def GetASNFromProbes(common_probes_to_all_servers,
                      valve_aspaths_from_prb,
                      ubisoft_aspaths_from_prb,
                      blizzard_aspaths_from_prb):
-    asn_of_common_valid_probes = {}
-    for prb_id in common_probes_to_all_servers:
-        for prb in valve_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-
-        for prb in ubisoft_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-
-        for prb in blizzard_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-    return asn_of_common_valid_probes
+    return asnProbes(common_probes_to_all_servers, valve_aspaths_from_prb,
+                     ubisoft_aspaths_from_prb, blizzard_aspaths_from_prb)
 
 
 def createGraph(asnFromProbeLst, valve_aspaths_from_prb,
@@ -385,15 +335,6 @@ def drawTopoGraph(graph, mgraph):
     plt.show()
 
 
-def getMsmTarget(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    target = data["target_ip"]
-    return target
-
-
 def rtt_to_aspath(res, aspath, ip2asn, pyt):
     trace1 = res[0]
     msm_id = trace1['msm_id']
@@ -465,8 +406,9 @@ def rtt_to_aspath(res, aspath, ip2asn, pyt):
               % (asn, asn_to_hops[asn][max(hops_list)]['median rtt']))
 
 
-def rtt_to_aspath2(hops, ip2asn, pyt):
+def rtt_to_aspath2(hops, resolver):
     asn_to_hops = {}
+    trace_hops = []
     for hop in hops:
         hop_nop = hop['hop']
         try:
@@ -476,7 +418,6 @@ def rtt_to_aspath2(hops, ip2asn, pyt):
 
         rtts = []
         hop_ip_addrs = set()
-        hop_asn = set()
         for rtt_to_hop in hop_results:
             try:
                 hop_ip_addrs.add(rtt_to_hop['from'])
@@ -493,58 +434,61 @@ def rtt_to_aspath2(hops, ip2asn, pyt):
         else:
             median = 0
 
-        for hop_ip in hop_ip_addrs:
-            try:
-                hopAddr = ipaddress.ip_address(hop_ip)
-            except ValueError:
+        trace_hops.append((hop_nop, rtts, median, list(hop_ip_addrs)))
+
+    # The hop addresses of the whole trace are classified in one call and
+    # the global ones resolved in another.
+    trace_ips = [hop_ip for *_, hop_ips in trace_hops for hop_ip in hop_ips]
+    is_global, _, _ = classifyAddresses(trace_ips)
+    global_ips = list(compress(trace_ips, is_global))
+    all_ips.update(global_ips)
+    hop_asns = iter(resolver.resolveMany(global_ips).tolist())
+    hop_global = iter(is_global.tolist())
+    for hop_nop, rtts, median, hop_ips in trace_hops:
+        for hop_ip in hop_ips:
+            if not next(hop_global):
+                continue
+            asn = next(hop_asns)
+            if not asn:
                 continue
 
-            if hopAddr.is_global:
-                all_ips.add(hop_ip)
-                asn = None
-                if hop_ip in ip2asn:
-                    asn = ip2asn[hop_ip]
+            if asn not in asn_to_hops:
+                asn_to_hops[asn] = {hop_nop: {'rtt': rtts,
+                                              'median rtt': median,
+                                              'hop ip': [hop_ip]}}
+            else:
+                if hop_nop not in asn_to_hops[asn]:
+                    asn_to_hops[asn][hop_nop] = {'rtt': rtts,
+                                                 'median rtt': median,
+                                                 'hop ip': [hop_ip]}
                 else:
-                    asn = pyt.get(hop_ip)
-                if asn is not None:
-                    
-                    if not isinstance(asn, int):
-                        asn = int(asn)
-                        if float(asn) < 0:
-                            continue
-
-                    if asn not in asn_to_hops:
-                        asn_to_hops[asn] = {hop_nop: {'rtt': rtts,
-                                                      'median rtt': median,
-                                                      'hop ip': [hop_ip]}}
-                    else:
-                        if hop_nop not in asn_to_hops[asn]:
-                            asn_to_hops[asn][hop_nop] = {'rtt': rtts,
-                                                         'median rtt': median,
-                                                         'hop ip': [hop_ip]}
-                        else:
-                            asn_to_hops[asn][hop_nop]['hop ip'].append(hop_ip)
+                    asn_to_hops[asn][hop_nop]['hop ip'].append(hop_ip)
 
     return asn_to_hops
 
 
 if __name__ == "__main__":
 
+    argParser = argparse.ArgumentParser(
+            description='''Graph the IP level paths of probes to the game
+                        servers through Arelion''',
+            usage='%(prog)s [-g targetsfile]')
+
+    argParser.add_argument('-g', dest='targets',
+                           help='''JSON file of measurement targets, the game
+                                servers by default''',
+                           type=str, default=None)
+
+    args = argParser.parse_args()
+    targets = defaultTargets(args.targets)
+
     all_ips = set()
-    msm_list = []
-    for raw_msm in glob('/scratch/measurements/traceroute/raw-measurements-results/*.json'):
-        with open(raw_msm, 'r') as f:
-            msm_raw = json.load(f)
-            msm_list.append(msm_raw)
+    msm_files = glob('/scratch/measurements/traceroute/raw-measurements-results/*.json')
 
     with open('/scratch/measurements/aspath/probes-asn-paths-to-server/list-of-asns-and-probes-common-to-msms-to-the-three-game-servers-and-their-paths.json', 'r') as validlist:
         commonASNsandProbes = json.load(validlist)
 
-    pyt = pytricia.PyTricia(128)
-    with open('/scratch/ip2as.pfx2as', 'r') as f:
-        prefix2as_file = csv.reader(f, delimiter=' ')
-        for prefix2as in prefix2as_file:
-            pyt.insert(prefix2as[0], prefix2as[1])
+    pyt = loadPfx2asIndex('/scratch/ip2as.pfx2as')
 
     ipm = _pyipmeta.IpMeta()
     ipm_prov = ipm.get_provider_by_name("pfx2as")
@@ -552,6 +496,8 @@ if __name__ == "__main__":
     with open('/scratch/measurements/ip2asn/traceip2asn.json', 'r') as ip2asnjson:
         ip2asn = json.load(ip2asnjson)
 
+    resolver = IpToAsnResolver([MapSource(ip2asn), IndexSource(pyt)])
+
     with open('/scratch/measurements/aspath/aspath-for-trace-msms-to-ubisoft-and-valve-servers.json', 'r') as f:
         aspathsprb_v_and_u = json.load(f)
 
@@ -576,6 +522,7 @@ if __name__ == "__main__":
     ASNofAllProbes = GetASNFromProbes(AllValid, valve_aspaths_from_prb,
                                       ubisoft_aspaths_from_prb,
                                       blizzard_aspaths_from_prb)
+    probeIndex = ProbeIndex(ASNofAllProbes)
 
     g1 = createGraph(ASNofAllProbes, valve_aspaths_from_prb,
                     ubisoft_aspaths_from_prb, blizzard_aspaths_from_prb)
@@ -610,15 +557,14 @@ if __name__ == "__main__":
 
     IPGraphs = nx.MultiDiGraph()
     mismatched = set()
-    for msm in msm_list:
+    for msm in map(iterResultsFile, msm_files):
         for result in msm:
             if str(result["prb_id"]) not in AllValid:
                 continue
 
-            if result["dst_name"] == "185.60.112.157":
-                
-                if result["proto"] != "ICMP":
-                    continue
+            target = targets.targetOf(result["dst_name"])
+            if target is not None and not target.accepts(result):
+                continue
             msm_id = result["msm_id"]
             prb_id = result["prb_id"]
             prb_src_addr = result["from"]
@@ -630,19 +576,12 @@ if __name__ == "__main__":
                                 result["stored_timestamp"]).strftime(
                                                     '%Y-%m-%d %H:%M:%S')
             hops = result['result']
-            asn_to_hops = rtt_to_aspath2(hops, ip2asn, pyt)
-            for asn, prb_ids in ASNofAllProbes.items():
-                if str(prb_id) in prb_ids:
-                    prb_asn = asn
-                    break
-
-            prb_src_ip_asn = None
-            if prb_src_addr in ip2asn:
-                prb_src_ip_asn =  ip2asn[prb_src_addr]
-            else:
-                prb_src_ip_asn = pyt.get(prb_src_addr)
+            asn_to_hops = rtt_to_aspath2(hops, resolver)
+            prb_asn = probeIndex.asnOf(prb_id)
 
-            if prb_src_ip_asn != str(prb_asn):
+            prb_src_ip_asn = resolver.resolve(prb_src_addr)
+
+            if str(prb_src_ip_asn) != str(prb_asn):
                 prb_src_ip_asn = prb_asn
 
             if not IPGraphs.has_node(prb_src_addr): 
@@ -735,39 +674,12 @@ if __name__ == "__main__":
     probe_with_alt_paths_to_ubisoft = set()
 
     validPrbMsms = {}
-    for msm in msm_list:
-        for result in msm:
-            if result["dst_name"] == "162.254.197.36":
-                if str(result["prb_id"]) in AllValidClean:
-                    if str(result["prb_id"]) in validPrbMsms:
-                        validPrbMsms[str(result["prb_id"])].append(result)
-                    else:
-                        validPrbMsms[str(result["prb_id"])] = [result]
-            
-
-
-            if result["dst_name"] == "185.60.112.157":
-
-                if result["proto"] != "ICMP":
-                    continue
-                
-
-                if str(result["prb_id"]) in AllValidClean:
-                    if str(result["prb_id"]) in validPrbMsms:
-                        validPrbMsms[str(result["prb_id"])].append(result)
-                    else:
-                        validPrbMsms[str(result["prb_id"])] = [result]
-
-
-
-            if result["dst_name"] == "5.200.20.245":
-                if str(result["prb_id"]) in AllValidClean:
-                    if str(result["prb_id"]) in validPrbMsms:
-                        validPrbMsms[str(result["prb_id"])].append(result)
-                    else:
-                        validPrbMsms[str(result["prb_id"])] = [result]
-
-            
+    for result in chain.from_iterable(map(iterResultsFile, msm_files)):
+        target = targets.targetOf(result["dst_name"])
+        if target is None or not target.accepts(result):
+            continue
+        if str(result["prb_id"]) in AllValidClean:
+            validPrbMsms.setdefault(str(result["prb_id"]), []).append(result)
 
 
     all_prbs = set()
@@ -788,18 +700,11 @@ if __name__ == "__main__":
         all_prbs.add(prb_id)
         prbSubGraph = nx.DiGraph()
 
-        for asn, prb_ids in ASNofAllProbes.items():
-            if prb in prb_ids:
-                prb_asn = asn
-                break
+        prb_asn = probeIndex.asnOf(prb)
 
-        prb_src_ip_asn = None
-        if prb_src_addr in ip2asn:
-            prb_src_ip_asn =  ip2asn[prb_src_addr]
-        else:
-            prb_src_ip_asn = pyt.get(prb_src_addr)
+        prb_src_ip_asn = resolver.resolve(prb_src_addr)
 
-        if prb_src_ip_asn != str(prb_asn):
+        if str(prb_src_ip_asn) != str(prb_asn):
             prb_src_ip_asn = prb_asn
 
         if not prbSubGraph.has_node(prb_src_addr):
@@ -819,9 +724,7 @@ if __name__ == "__main__":
         LEVEL3IP = '213.19.200.78'
         HURRICANEIP = '184.104.193.150'
 
-        ValveIP = '162.254.197.36'
         UbisoftIP = '5.200.20.245'
-        BlizzardIP = '185.60.112.157'
 
         path = nx.shortest_path(IPGraphs, ArelionIP, UbisoftIP)
         for addr in path:
@@ -929,37 +832,16 @@ if __name__ == "__main__":
                 if nx.has_path(IPGraphs, ipHop, ArelionIP):
                     alt_paths = nx.all_shortest_paths(IPGraphs, ipHop, ArelionIP)
                     for altpath in alt_paths:
-                        if BlizzardIP in altpath:
-                            continue
-
-                        if UbisoftIP in altpath:
+                        # Paths through any of the targets, by address or
+                        # by ASN, are no alternative to reach Arelion.
+                        if targets.ips.intersection(altpath):
                             continue
 
-                        if ValveIP in altpath:
+                        if any(targets.isTargetAsn(
+                                   IPGraphs.nodes[pathAddr]['asn'])
+                               for pathAddr in altpath):
                             continue
 
-                        for pathAddr in altpath:
-                            pathAddrAsn = IPGraphs.nodes[pathAddr]['asn']
-                            if isinstance(pathAddrAsn, str):
-                                if int(pathAddrAsn) == 57976:
-                                    continue
-
-                                if int(pathAddrAsn) == 49544:
-                                    continue
-
-                                if int(pathAddrAsn) == 32590:
-                                    continue
-                            
-                            else:
-                                if pathAddrAsn == 57976:
-                                    continue
-
-                                if pathAddrAsn == 49544:
-                                    continue
-
-                                if pathAddrAsn == 32590:
-                                    continue
-
                         if all(addr in altpath for addr in penultimateIPset):
                         #if altpath[-2] in penultimateIPset:
                             continue
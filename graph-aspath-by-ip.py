@@ -26,14 +26,13 @@
 import csv
 import sys
 import json
-import requests
 import argparse
 import ipaddress
 import _pyipmeta
-import pytricia
 from pprint import pprint
 from pathlib import Path
 from collections import OrderedDict, Counter
+from itertools import compress, chain
 from pprint import pprint
 import networkx as nx
 import matplotlib.pyplot as plt
@@ -44,27 +43,16 @@ import numpy as np
 from glob import glob
 import gravis as gv
 from datetime import datetime
+from atlas_results import iterResultsFile
+from pfx2as_index import loadPfx2asIndex
+from ip2asn import IpToAsnResolver, MapSource, IndexSource
+from ip_class import classifyAddresses
+from game_targets import defaultTargets
+from probe_index import asnProbes, ProbeIndex
 
-caida_prefix2as = "https://publicdata.caida.org/datasets/routing/routeviews-prefix2as/2022/09/routeviews-rv2-20220920-1200.pfx2as.gz"
-
-
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    print("Fetched results for msm: %s" % measurement_id)
-    return results
+DIVERSE_PATHS_DIR = '/scratch/measurements/analysis/probes-to-%s-latency-visualisation/diverse-paths/'
 
-
-def getProbeInfo(probe_id):
-    url = "https://atlas.ripe.net/api/v2/probes/"+str(probe_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    return data
+caida_prefix2as = "https://publicdata.caida.org/datasets/routing/routeviews-prefix2as/2022/09/routeviews-rv2-20220920-1200.pfx2as.gz"
 
 
 def validaspathsprobe(aspathsprb):
@@ -164,150 +152,62 @@ def fetchOriginASN(validset):
 
 
 def GetProbes(aspath2prb_valid):
-    valve_valid_prb = set()
-    ubi_valid_prb = set()
-    bliz_valid_prb = set()
+    # Probes with a valid AS path towards every target, and towards any.
+    valid_prbs = []
     for server, prbs in aspath2prb_valid.items():
-        if server == 'Valve':
-
-            for prb in prbs:
-                (prb_id, aspaths), = prb.items()
-                valve_valid_prb.add(prb_id)
-
-        if server == 'Ubisoft':
-
-            for prb in prbs:
-                (prb_id, aspaths), = prb.items()
-                ubi_valid_prb.add(prb_id)
-
-        if server == 'Blizzard':
-
-            for prb in prbs:
-                (prb_id, aspaths), = prb.items()
-                bliz_valid_prb.add(prb_id)
+        server_valid_prb = set()
+        for prb in prbs:
+            (prb_id, aspaths), = prb.items()
+            server_valid_prb.add(prb_id)
+        valid_prbs.append(server_valid_prb)
 
-    all_valid_probes_set = valve_valid_prb.union(ubi_valid_prb, bliz_valid_prb)
-    common_probes_to_all_servers = set.intersection(valve_valid_prb, bliz_valid_prb, ubi_valid_prb)
+    if not valid_prbs:
+        return set(), set()
+    all_valid_probes_set = set.union(*valid_prbs)
+    common_probes_to_all_servers = set.intersection(*valid_prbs)
     return common_probes_to_all_servers, all_valid_probes_set
 
 
-def GetASNFromProbes(common_probes_to_all_servers,
-                     valve_aspaths_from_prb,
-                     ubisoft_aspaths_from_prb,
-                     blizzard_aspaths_from_prb):
-    asn_of_common_valid_probes = {}
-    for prb_id in common_probes_to_all_servers:
-        for prb in valve_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
+def GetASNFromProbes(common_probes_to_all_servers, *aspaths_from_prb):
+    return asnProbes(common_probes_to_all_servers, *aspaths_from_prb)
 
-        for prb in ubisoft_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
 
-        for prb in blizzard_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-    return asn_of_common_valid_probes
+# Edge colours of the built-in targets in the AS graphs, edges of any other
+# target are black.
+EDGE_COLOURS = {'Valve': 'red', 'Blizzard': 'blue', 'Ubisoft': 'green'}
 
 
-def createGraph(asnFromProbeLst, valve_aspaths_from_prb,
-                ubisoft_aspaths_from_prb,
-                blizzard_aspaths_from_prb):
+def createGraph(asnFromProbeLst, *coloured_aspaths):
+    # coloured_aspaths are (edge colour, AS paths from probes) pairs, one
+    # per target.
     pathasn = set()
     graph = nx.DiGraph()
     penultimate_asn = set()
     for asn, probes in asnFromProbeLst.items():
         for probe in probes:
-            for prb in blizzard_aspaths_from_prb:
-                (prb_id, aspaths), = prb.items()
-                if prb_id != probe:
-                    continue
-                for aspath in aspaths:
-                    str_elem = []
-                    for elem in aspath:
-                        if isinstance(elem, str):
-                            str_elem.append(elem)
-
-                    for str_e in str_elem:
-                        aspath.remove(str_e)
-                    graph.add_nodes_from(aspath)
-                    for asn in aspath:
-                        pathasn.add(asn)
-                        index = aspath.index(asn)
-                        if index == (len(aspath) - 2):
-                            penultimate_asn.add(asn)
-                        next_id = index + 1
-                        if next_id != len(aspath):
-                            graph.add_edge(asn, aspath[next_id], color='blue')
-
-            for prb in valve_aspaths_from_prb:
-                (prb_id, aspaths), = prb.items()
-                if prb_id != probe:
-                    continue
-                for aspath in aspaths:
-                    str_elem = []
-                    for elem in aspath:
-                        if isinstance(elem, str):
-                            str_elem.append(elem)
-
-                    for str_e in str_elem:
-                        aspath.remove(str_e)
-                    graph.add_nodes_from(aspath)
-                    for asn in aspath:
-                        pathasn.add(asn)
-                        index = aspath.index(asn)
-                        if index == (len(aspath) - 2):
-                            penultimate_asn.add(asn)
-                        next_id = index + 1
-                        if next_id != len(aspath):
-                            graph.add_edge(asn, aspath[next_id], color='red')
-
-            for prb in ubisoft_aspaths_from_prb:
-                (prb_id, aspaths), = prb.items()
-                if prb_id != probe:
-                    continue
-                for aspath in aspaths:
-                    str_elem = []
-                    for elem in aspath:
-                        if isinstance(elem, str):
-                            str_elem.append(elem)
-
-                    for str_e in str_elem:
-                        aspath.remove(str_e)
-                    graph.add_nodes_from(aspath)
-                    for asn in aspath:
-                        pathasn.add(asn)
-                        index = aspath.index(asn)
-                        if index == (len(aspath) - 2):
-                            penultimate_asn.add(asn)
-                        next_id = index + 1
-                        if next_id != len(aspath):
-                            graph.add_edge(asn, aspath[next_id], color='green')
+            for colour, aspaths_from_prb in coloured_aspaths:
+                for prb in aspaths_from_prb:
+                    (prb_id, aspaths), = prb.items()
+                    if prb_id != probe:
+                        continue
+                    for aspath in aspaths:
+                        str_elem = []
+                        for elem in aspath:
+                            if isinstance(elem, str):
+                                str_elem.append(elem)
+
+                        for str_e in str_elem:
+                            aspath.remove(str_e)
+                        graph.add_nodes_from(aspath)
+                        for asn in aspath:
+                            pathasn.add(asn)
+                            index = aspath.index(asn)
+                            if index == (len(aspath) - 2):
+                                penultimate_asn.add(asn)
+                            next_id = index + 1
+                            if next_id != len(aspath):
+                                graph.add_edge(asn, aspath[next_id],
+                                               color=colour)
     return graph
 
 
@@ -385,15 +285,6 @@ def drawTopoGraph(graph, mgraph):
     plt.show()
 
 
-def getMsmTarget(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    target = data["target_ip"]
-    return target
-
-
 def rtt_to_aspath(res, aspath, ip2asn, pyt):
     trace1 = res[0]
     msm_id = trace1['msm_id']
@@ -465,8 +356,9 @@ def rtt_to_aspath(res, aspath, ip2asn, pyt):
               % (asn, asn_to_hops[asn][max(hops_list)]['median rtt']))
 
 
-def rtt_to_aspath2(hops, ip2asn, pyt):
+def rtt_to_aspath2(hops, resolver):
     asn_to_hops = {}
+    trace_hops = []
     for hop in hops:
         hop_nop = hop['hop']
         try:
@@ -476,7 +368,6 @@ def rtt_to_aspath2(hops, ip2asn, pyt):
 
         rtts = []
         hop_ip_addrs = set()
-        hop_asn = set()
         for rtt_to_hop in hop_results:
             try:
                 hop_ip_addrs.add(rtt_to_hop['from'])
@@ -493,58 +384,67 @@ def rtt_to_aspath2(hops, ip2asn, pyt):
         else:
             median = 0
 
-        for hop_ip in hop_ip_addrs:
-            try:
-                hopAddr = ipaddress.ip_address(hop_ip)
-            except ValueError:
+        trace_hops.append((hop_nop, rtts, median, list(hop_ip_addrs)))
+
+    # The hop addresses of the whole trace are classified in one call and
+    # the global ones resolved in another.
+    trace_ips = [hop_ip for *_, hop_ips in trace_hops for hop_ip in hop_ips]
+    is_global, _, _ = classifyAddresses(trace_ips)
+    global_ips = list(compress(trace_ips, is_global))
+    all_ips.update(global_ips)
+    hop_asns = iter(resolver.resolveMany(global_ips).tolist())
+    hop_global = iter(is_global.tolist())
+    for hop_nop, rtts, median, hop_ips in trace_hops:
+        for hop_ip in hop_ips:
+            if not next(hop_global):
+                continue
+            asn = next(hop_asns)
+            if not asn:
                 continue
 
-            if hopAddr.is_global:
-                all_ips.add(hop_ip)
-                asn = None
-                if hop_ip in ip2asn:
-                    asn = ip2asn[hop_ip]
+            if asn not in asn_to_hops:
+                asn_to_hops[asn] = {hop_nop: {'rtt': rtts,
+                                              'median rtt': median,
+                                              'hop ip': [hop_ip]}}
+            else:
+                if hop_nop not in asn_to_hops[asn]:
+                    asn_to_hops[asn][hop_nop] = {'rtt': rtts,
+                                                 'median rtt': median,
+                                                 'hop ip': [hop_ip]}
                 else:
-                    asn = pyt.get(hop_ip)
-                if asn is not None:
-                    
-                    if not isinstance(asn, int):
-                        asn = int(asn)
-                        if float(asn) < 0:
-                            continue
-
-                    if asn not in asn_to_hops:
-                        asn_to_hops[asn] = {hop_nop: {'rtt': rtts,
-                                                      'median rtt': median,
-                                                      'hop ip': [hop_ip]}}
-                    else:
-                        if hop_nop not in asn_to_hops[asn]:
-                            asn_to_hops[asn][hop_nop] = {'rtt': rtts,
-                                                         'median rtt': median,
-                                                         'hop ip': [hop_ip]}
-                        else:
-                            asn_to_hops[asn][hop_nop]['hop ip'].append(hop_ip)
+                    asn_to_hops[asn][hop_nop]['hop ip'].append(hop_ip)
 
     return asn_to_hops
 
 
 if __name__ == "__main__":
 
+    argParser = argparse.ArgumentParser(
+            description='''Graph the IP level paths of probes to measurement
+                        targets and look for alternate paths''',
+            usage='%(prog)s [-t targets -g targetsfile]')
+
+    argParser.add_argument('-t', dest='names',
+                           help='''Comma separated names of the targets to
+                                analyse''',
+                           type=str, default='Valve')
+
+    argParser.add_argument('-g', dest='targets',
+                           help='''JSON file of measurement targets, the game
+                                servers by default''',
+                           type=str, default=None)
+
+    args = argParser.parse_args()
+    targets = defaultTargets(args.targets)
+    registry = targets.select(args.names)
+
     all_ips = set()
-    msm_list = []
-    for raw_msm in glob('/scratch/measurements/traceroute/raw-measurements-results/*.json'):
-        with open(raw_msm, 'r') as f:
-            msm_raw = json.load(f)
-            msm_list.append(msm_raw)
+    msm_files = glob('/scratch/measurements/traceroute/raw-measurements-results/*.json')
 
     with open('/scratch/measurements/aspath/probes-asn-paths-to-server/list-of-asns-and-probes-common-to-msms-to-the-three-game-servers-and-their-paths.json', 'r') as validlist:
         commonASNsandProbes = json.load(validlist)
 
-    pyt = pytricia.PyTricia(128)
-    with open('/scratch/ip2as.pfx2as', 'r') as f:
-        prefix2as_file = csv.reader(f, delimiter=' ')
-        for prefix2as in prefix2as_file:
-            pyt.insert(prefix2as[0], prefix2as[1])
+    pyt = loadPfx2asIndex('/scratch/ip2as.pfx2as')
 
     ipm = _pyipmeta.IpMeta()
     ipm_prov = ipm.get_provider_by_name("pfx2as")
@@ -552,6 +452,8 @@ if __name__ == "__main__":
     with open('/scratch/measurements/ip2asn/traceip2asn.json', 'r') as ip2asnjson:
         ip2asn = json.load(ip2asnjson)
 
+    resolver = IpToAsnResolver([MapSource(ip2asn), IndexSource(pyt)])
+
     with open('/scratch/measurements/aspath/aspath-for-trace-msms-to-ubisoft-and-valve-servers.json', 'r') as f:
         aspathsprb_v_and_u = json.load(f)
 
@@ -565,35 +467,38 @@ if __name__ == "__main__":
     aspathsprb = {**aspathsprb_blizzard, **aspathsprb_v_and_u}
     aspath2prb_valid = validaspathsprobe(aspathsprb)
 
-    valve_aspaths_from_prb = aspath2prb_valid['Valve']
-    ubisoft_aspaths_from_prb = aspath2prb_valid['Ubisoft']
-    blizzard_aspaths_from_prb = aspath2prb_valid['Blizzard']
+    # Only targets with AS paths in the files above take part, any other
+    # is reported and left out.
+    path_targets = []
+    for target in targets:
+        if target.name not in aspath2prb_valid:
+            print("No AS paths for target %s, skipping it" % target.name)
+            continue
+        path_targets.append(target)
+    aspath2prb_valid = OrderedDict((target.name,
+                                    aspath2prb_valid[target.name])
+                                   for target in path_targets)
 
-    prb_asns_valve = fetchOriginASN(valve_aspaths_from_prb)
-    prb_asns_ubisoft = fetchOriginASN(ubisoft_aspaths_from_prb)
-    prb_asns_blizzard = fetchOriginASN(blizzard_aspaths_from_prb)
+    prb_asns = {name: fetchOriginASN(aspaths)
+                for name, aspaths in aspath2prb_valid.items()}
     CommonProbes, AllValid = GetProbes(aspath2prb_valid)
-    ASNofAllProbes = GetASNFromProbes(AllValid, valve_aspaths_from_prb,
-                                      ubisoft_aspaths_from_prb,
-                                      blizzard_aspaths_from_prb)
+    ASNofAllProbes = GetASNFromProbes(AllValid, *aspath2prb_valid.values())
+    probeIndex = ProbeIndex(ASNofAllProbes)
 
-    g1 = createGraph(ASNofAllProbes, valve_aspaths_from_prb,
-                    ubisoft_aspaths_from_prb, blizzard_aspaths_from_prb)
+    g1 = createGraph(ASNofAllProbes,
+                     *[(EDGE_COLOURS.get(name, 'black'), aspaths)
+                       for name, aspaths in aspath2prb_valid.items()])
 
     aspathprbclean = aspathcleanup(aspath2prb_valid)
-    valve_aspaths_clean = aspathprbclean['Valve']
-    ubisoft_aspaths_clean = aspathprbclean['Ubisoft']
-    blizzard_aspaths_clean = aspathprbclean['Blizzard']
-    prb_asns_valve_clean = fetchOriginASN(valve_aspaths_clean)
-    prb_asns_ubisoft_clean = fetchOriginASN(ubisoft_aspaths_clean)
-    prb_asns_blizzard_clean = fetchOriginASN(blizzard_aspaths_clean)
+    prb_asns_clean = {name: fetchOriginASN(aspaths)
+                      for name, aspaths in aspathprbclean.items()}
     CommonProbesClean, AllValidClean  = GetProbes(aspathprbclean)
-    ASNofAllProbesClean = GetASNFromProbes(AllValidClean, valve_aspaths_clean,
-                                           ubisoft_aspaths_clean,
-                                           blizzard_aspaths_clean)
+    ASNofAllProbesClean = GetASNFromProbes(AllValidClean,
+                                           *aspathprbclean.values())
 
-    g2 = createGraph(ASNofAllProbesClean, valve_aspaths_clean,
-                    ubisoft_aspaths_clean, blizzard_aspaths_clean)
+    g2 = createGraph(ASNofAllProbesClean,
+                     *[(EDGE_COLOURS.get(name, 'black'), aspaths)
+                       for name, aspaths in aspathprbclean.items()])
 
     if nx.utils.graphs_equal(g1, g2):
         print("Yes, they are equal")
@@ -610,15 +515,14 @@ if __name__ == "__main__":
 
     IPGraphs = nx.MultiDiGraph()
     mismatched = set()
-    for msm in msm_list:
+    for msm in map(iterResultsFile, msm_files):
         for result in msm:
             if str(result["prb_id"]) not in AllValid:
                 continue
 
-            if result["dst_name"] == "185.60.112.157":
-                
-                if result["proto"] != "ICMP":
-                    continue
+            target = targets.targetOf(result["dst_name"])
+            if target is not None and not target.accepts(result):
+                continue
             msm_id = result["msm_id"]
             prb_id = result["prb_id"]
             prb_src_addr = result["from"]
@@ -630,19 +534,12 @@ if __name__ == "__main__":
                                 result["stored_timestamp"]).strftime(
                                                     '%Y-%m-%d %H:%M:%S')
             hops = result['result']
-            asn_to_hops = rtt_to_aspath2(hops, ip2asn, pyt)
-            for asn, prb_ids in ASNofAllProbes.items():
-                if str(prb_id) in prb_ids:
-                    prb_asn = asn
-                    break
-
-            prb_src_ip_asn = None
-            if prb_src_addr in ip2asn:
-                prb_src_ip_asn =  ip2asn[prb_src_addr]
-            else:
-                prb_src_ip_asn = pyt.get(prb_src_addr)
+            asn_to_hops = rtt_to_aspath2(hops, resolver)
+            prb_asn = probeIndex.asnOf(prb_id)
+
+            prb_src_ip_asn = resolver.resolve(prb_src_addr)
 
-            if prb_src_ip_asn != str(prb_asn):
+            if str(prb_src_ip_asn) != str(prb_asn):
                 prb_src_ip_asn = prb_asn
 
             if not IPGraphs.has_node(prb_src_addr): 
@@ -729,43 +626,125 @@ if __name__ == "__main__":
                 i += 1
 
 
-    TraceMSMToValve = {}
-    TraceMSMToBlizzard = {}
-    TraceMSMToUbisoft = {}
-
+    # Traceroutes of every selected target by probe, bucketed by
+    # destination in a single pass over the results.
+    TraceMSM = registry.groupResults(
+            chain.from_iterable(map(iterResultsFile, msm_files)),
+            key='dst_name')
 
-    for msm in msm_list:
-        for result in msm:
-            if result["dst_name"] == "162.254.197.36":
-                if result["prb_id"] in TraceMSMToValve:
-                    TraceMSMToValve[result["prb_id"]].append(result)
+    for target in registry:
+        if target.name not in aspathprbclean:
+            print("No AS paths for target %s, skipping it" % target.name)
+            continue
+        probe_with_alt_paths = set()
+        for prb in aspathprbclean[target.name]:
+            (probe_id, aspaths), = prb.items()
+            prb_msms = TraceMSM[target.name].get(int(probe_id), [])
+            prbDiGraph = nx.MultiDiGraph()
+            for result in prb_msms:
+                msm_id = result["msm_id"]
+                prb_id = result["prb_id"]
+                prb_src_addr = result["from"]
+                prb_act_src = result["src_addr"]
+                dst = result["dst_name"]
+                timestamp = datetime.utcfromtimestamp(
+                                    result["stored_timestamp"]).strftime(
+                                                        '%Y-%m-%d %H:%M:%S')
+                hops = result['result']
+                asn_to_hops = rtt_to_aspath2(hops, resolver)
+                prb_asn = probeIndex.asnOf(prb_id)
+
+                prb_src_ip_asn = resolver.resolve(prb_src_addr)
+
+                if str(prb_src_ip_asn) != str(prb_asn):
+                    prb_src_ip_asn = prb_asn
+
+                if not prbDiGraph.has_node(prb_src_addr): 
+                    prbDiGraph.add_node(prb_src_addr,
+                                        asn=prb_asn,
+                                        probe=prb_id,
+                                        destination=[dst],
+                                        time=[timestamp],
+                                        msm_id=[msm_id])
                 else:
-                    TraceMSMToValve[result["prb_id"]] = [result]
-
-
-            if result["dst_name"] == "185.60.112.157":
+                    prbDiGraph.nodes[prb_src_addr]['destination'].append(dst)
+                    prbDiGraph.nodes[prb_src_addr]['time'].append(timestamp)
+                    prbDiGraph.nodes[prb_src_addr]['msm_id'].append(msm_id)
 
-                if result["proto"] != "ICMP":
-                    continue
-                
-                if result["prb_id"] in TraceMSMToBlizzard:
-                    TraceMSMToBlizzard[result["prb_id"]].append(result)
-                else:
-                    TraceMSMToBlizzard[result["prb_id"]] = [result]
+                i = 0
+                for hop_asn, hops in asn_to_hops.items():
+                    if i == 0:
+                        k = 0
+                        for hop_no, hop_vals in hops.items():
+                            median_rtt = hop_vals['median rtt']
+                            hop_ips = hop_vals['hop ip']
+                            for addr in hop_ips:
+                                if not prbDiGraph.has_node(addr):
+                                        prbDiGraph.add_node(addr,
+                                                            asn=hop_asn,
+                                                            probe=[prb_id],
+                                                            destination=[dst],
+                                                            time=[timestamp],
+                                                            msm_id=[msm_id])
+                                else:
+                                    prbDiGraph.nodes[addr]['probe'].append(prb_id)
+                                    prbDiGraph.nodes[addr]['destination'].append(dst)
+                                    prbDiGraph.nodes[addr]['time'].append(timestamp)
+                                    prbDiGraph.nodes[addr]['msm_id'].append(msm_id)
+                                
+                                if k == 0:
+                                    prbDiGraph.add_edge(prb_src_addr, addr,
+                                                        rtt=median_rtt,
+                                                        probe=prb_id,
+                                                        destination=dst,
+                                                        timestamp=timestamp,
+                                                        msm_id=msm_id)
+                            
+                                else:
+                                    prv_hop, prv_hop_asn, prv_hop_ips, prv_med_rtt = previous
+                                    hop_rtt = median_rtt - prv_med_rtt
+                                    for prv_ip in prv_hop_ips:
+                                        prbDiGraph.add_edge(prv_ip, addr,
+                                                            rtt=abs(hop_rtt),
+                                                            probe=prb_id,
+                                                            destination=dst,
+                                                            timestamp=timestamp,
+                                                            msm_id=msm_id)
+                            previous = (hop_no, hop_asn, hop_ips, median_rtt)
+                            k += 1
+                    else:
+                        for hop_no, hop_vals in hops.items():
+                            median_rtt = hop_vals['median rtt']
+                            hop_ips = hop_vals['hop ip']
+                            for addr in hop_ips:
+                                if not prbDiGraph.has_node(addr):
+                                    prbDiGraph.add_node(addr,
+                                                        asn=hop_asn,
+                                                        probe=[prb_id],
+                                                        destination=[dst],
+                                                        time=[timestamp],
+                                                        msm_id=[msm_id])
+                                else:
+                                    prbDiGraph.nodes[addr]['probe'].append(prb_id)
+                                    prbDiGraph.nodes[addr]['destination'].append(dst)
+                                    prbDiGraph.nodes[addr]['time'].append(timestamp)
+                                    prbDiGraph.nodes[addr]['msm_id'].append(msm_id)
 
+                                prv_hop, prv_hop_asn, prv_hop_ips, prv_med_rtt = previous
+                                hop_rtt = median_rtt - prv_med_rtt
+                                for prv_ip in prv_hop_ips:
+                                    prbDiGraph.add_edge(prv_ip, addr,
+                                                        rtt=abs(hop_rtt),
+                                                        probe=prb_id,
+                                                        destination=dst,
+                                                        timestamp=timestamp,
+                                                        msm_id=msm_id)
+                            previous = (hop_no, hop_asn, hop_ips, median_rtt)
+                    i += 1
 
-            if result["dst_name"] == "5.200.20.245":
-                if result["prb_id"] in TraceMSMToUbisoft:
-                    TraceMSMToUbisoft[result["prb_id"]].append(result)
-                else:
-                    TraceMSMToUbisoft[result["prb_id"]] = [result]
-
-    probe_with_alt_paths = set()
-    for prb in valve_aspaths_clean:       
-        (probe_id, aspaths), = prb.items()
-        prb_msms = TraceMSMToValve[int(probe_id)]
-        prbDiGraph = nx.MultiDiGraph()
-        for result in prb_msms:
+        
+            result = prb_msms[0]
+            prbSubGraph =  nx.DiGraph()
             msm_id = result["msm_id"]
             prb_id = result["prb_id"]
             prb_src_addr = result["from"]
@@ -775,175 +754,95 @@ if __name__ == "__main__":
                                 result["stored_timestamp"]).strftime(
                                                     '%Y-%m-%d %H:%M:%S')
             hops = result['result']
-            asn_to_hops = rtt_to_aspath2(hops, ip2asn, pyt)
-            for asn, prb_ids in ASNofAllProbes.items():
-                if str(prb_id) in prb_ids:
-                    prb_asn = asn
-                    break
-
-            prb_src_ip_asn = None
-            if prb_src_addr in ip2asn:
-                prb_src_ip_asn =  ip2asn[prb_src_addr]
-            else:
-                prb_src_ip_asn = pyt.get(prb_src_addr)
+            asn_to_hops = rtt_to_aspath2(hops, resolver)
+            prb_asn = probeIndex.asnOf(prb_id)
 
-            if prb_src_ip_asn != str(prb_asn):
+            prb_src_ip_asn = resolver.resolve(prb_src_addr)
+
+            if str(prb_src_ip_asn) != str(prb_asn):
                 prb_src_ip_asn = prb_asn
 
-            if not prbDiGraph.has_node(prb_src_addr): 
-                prbDiGraph.add_node(prb_src_addr,
-                                    asn=prb_asn,
-                                    probe=prb_id,
-                                    destination=[dst],
-                                    time=[timestamp],
-                                    msm_id=[msm_id])
+            if not prbSubGraph.has_node(prb_src_addr): 
+                prbSubGraph.add_node(prb_src_addr,
+                                     asn=prb_asn,
+                                     probe=prb_id,
+                                     destination=[dst],
+                                     time=[timestamp],
+                                     msm_id=[msm_id])
             else:
-                prbDiGraph.nodes[prb_src_addr]['destination'].append(dst)
-                prbDiGraph.nodes[prb_src_addr]['time'].append(timestamp)
-                prbDiGraph.nodes[prb_src_addr]['msm_id'].append(msm_id)
-
+                prbSubGraph.nodes[prb_src_addr]['destination'].append(dst)
+                prbSubGraph.nodes[prb_src_addr]['time'].append(timestamp)
+                prbSubGraph.nodes[prb_src_addr]['msm_id'].append(msm_id)
             i = 0
+
             for hop_asn, hops in asn_to_hops.items():
+
                 if i == 0:
                     k = 0
                     for hop_no, hop_vals in hops.items():
                         median_rtt = hop_vals['median rtt']
                         hop_ips = hop_vals['hop ip']
                         for addr in hop_ips:
-                            if not prbDiGraph.has_node(addr):
-                                    prbDiGraph.add_node(addr,
-                                                        asn=hop_asn,
-                                                        probe=[prb_id],
-                                                        destination=[dst],
-                                                        time=[timestamp],
-                                                        msm_id=[msm_id])
+                            if not prbSubGraph.has_node(addr):
+                                prbSubGraph.add_node(addr,
+                                                     asn=hop_asn,
+                                                     probe=[prb_id],
+                                                     hop=hop_no,
+                                                     destination=[dst],
+                                                     time=[timestamp],
+                                                     msm_id=[msm_id])
                             else:
-                                prbDiGraph.nodes[addr]['probe'].append(prb_id)
-                                prbDiGraph.nodes[addr]['destination'].append(dst)
-                                prbDiGraph.nodes[addr]['time'].append(timestamp)
-                                prbDiGraph.nodes[addr]['msm_id'].append(msm_id)
-                                
-                            if k == 0:
-                                prbDiGraph.add_edge(prb_src_addr, addr,
-                                                    rtt=median_rtt,
-                                                    probe=prb_id,
-                                                    destination=dst,
-                                                    timestamp=timestamp,
-                                                    msm_id=msm_id)
+                                prbSubGraph.nodes[addr]['probe'] = [prb_id]
+                                prbSubGraph.nodes[addr]['destination'] = [dst]
+                                prbSubGraph.nodes[addr]['time'] = [timestamp]
+                                prbSubGraph.nodes[addr]['msm_id'] = [msm_id]
                             
+                            if k == 0:
+                                prbSubGraph.add_edge(prb_src_addr, addr,
+                                                     rtt=median_rtt,
+                                                     probe=prb_id,
+                                                     destination=dst,
+                                                     timestamp=timestamp,
+                                                     msm_id=msm_id)
+                        
                             else:
                                 prv_hop, prv_hop_asn, prv_hop_ips, prv_med_rtt = previous
                                 hop_rtt = median_rtt - prv_med_rtt
                                 for prv_ip in prv_hop_ips:
-                                    prbDiGraph.add_edge(prv_ip, addr,
-                                                        rtt=abs(hop_rtt),
-                                                        probe=prb_id,
-                                                        destination=dst,
-                                                        timestamp=timestamp,
-                                                        msm_id=msm_id)
-                        previous = (hop_no, hop_asn, hop_ips, median_rtt)
+                                    prbSubGraph.add_edge(prv_ip, addr,
+                                                         rtt=abs(hop_rtt),
+                                                         probe=prb_id,
+                                                         destination=dst,
+                                                         timestamp=timestamp,
+                                                         msm_id=msm_id)
+                        if not target.ips.intersection(hop_ips):
+                            previous = (hop_no, hop_asn, hop_ips, median_rtt)
                         k += 1
+
                 else:
+                    prv_hop, prv_hop_asn, prv_hop_ips, prv_med_rtt = previous
+                    if (target.isTargetAsn(hop_asn)
+                        and not target.isTargetAsn(prv_hop_asn)):
+                        gsProviderLastHop = (prv_hop_ips[0], prv_hop_asn)
+
                     for hop_no, hop_vals in hops.items():
                         median_rtt = hop_vals['median rtt']
                         hop_ips = hop_vals['hop ip']
                         for addr in hop_ips:
-                            if not prbDiGraph.has_node(addr):
-                                prbDiGraph.add_node(addr,
-                                                    asn=hop_asn,
-                                                    probe=[prb_id],
-                                                    destination=[dst],
-                                                    time=[timestamp],
-                                                    msm_id=[msm_id])
+                            if not prbSubGraph.has_node(addr):
+                                prbSubGraph.add_node(addr,
+                                                     asn=hop_asn,
+                                                     probe=[prb_id],
+                                                     hop=hop_no,
+                                                     destination=[dst],
+                                                     time=[timestamp],
+                                                     msm_id=[msm_id])
                             else:
-                                prbDiGraph.nodes[addr]['probe'].append(prb_id)
-                                prbDiGraph.nodes[addr]['destination'].append(dst)
-                                prbDiGraph.nodes[addr]['time'].append(timestamp)
-                                prbDiGraph.nodes[addr]['msm_id'].append(msm_id)
-
-                            prv_hop, prv_hop_asn, prv_hop_ips, prv_med_rtt = previous
-                            hop_rtt = median_rtt - prv_med_rtt
-                            for prv_ip in prv_hop_ips:
-                                prbDiGraph.add_edge(prv_ip, addr,
-                                                    rtt=abs(hop_rtt),
-                                                    probe=prb_id,
-                                                    destination=dst,
-                                                    timestamp=timestamp,
-                                                    msm_id=msm_id)
-                        previous = (hop_no, hop_asn, hop_ips, median_rtt)
-                i += 1
+                                prbSubGraph.nodes[addr]['probe'] = [prb_id]
+                                prbSubGraph.nodes[addr]['destination'] = [dst]
+                                prbSubGraph.nodes[addr]['time'] = [timestamp]
+                                prbSubGraph.nodes[addr]['msm_id'] = [msm_id]
 
-        
-        result = prb_msms[0]
-        prbSubGraph =  nx.DiGraph()
-        msm_id = result["msm_id"]
-        prb_id = result["prb_id"]
-        prb_src_addr = result["from"]
-        prb_act_src = result["src_addr"]
-        dst = result["dst_name"]
-        timestamp = datetime.utcfromtimestamp(
-                            result["stored_timestamp"]).strftime(
-                                                '%Y-%m-%d %H:%M:%S')
-        hops = result['result']
-        asn_to_hops = rtt_to_aspath2(hops, ip2asn, pyt)
-        for asn, prb_ids in ASNofAllProbes.items():
-            if str(prb_id) in prb_ids:
-                prb_asn = asn
-                break
-
-        prb_src_ip_asn = None
-        if prb_src_addr in ip2asn:
-            prb_src_ip_asn =  ip2asn[prb_src_addr]
-        else:
-            prb_src_ip_asn = pyt.get(prb_src_addr)
-
-        if prb_src_ip_asn != str(prb_asn):
-            prb_src_ip_asn = prb_asn
-
-        if not prbSubGraph.has_node(prb_src_addr): 
-            prbSubGraph.add_node(prb_src_addr,
-                                 asn=prb_asn,
-                                 probe=prb_id,
-                                 destination=[dst],
-                                 time=[timestamp],
-                                 msm_id=[msm_id])
-        else:
-            prbSubGraph.nodes[prb_src_addr]['destination'].append(dst)
-            prbSubGraph.nodes[prb_src_addr]['time'].append(timestamp)
-            prbSubGraph.nodes[prb_src_addr]['msm_id'].append(msm_id)
-        i = 0
-
-        for hop_asn, hops in asn_to_hops.items():
-
-            if i == 0:
-                k = 0
-                for hop_no, hop_vals in hops.items():
-                    median_rtt = hop_vals['median rtt']
-                    hop_ips = hop_vals['hop ip']
-                    for addr in hop_ips:
-                        if not prbSubGraph.has_node(addr):
-                            prbSubGraph.add_node(addr,
-                                                 asn=hop_asn,
-                                                 probe=[prb_id],
-                                                 hop=hop_no,
-                                                 destination=[dst],
-                                                 time=[timestamp],
-                                                 msm_id=[msm_id])
-                        else:
-                            prbSubGraph.nodes[addr]['probe'] = [prb_id]
-                            prbSubGraph.nodes[addr]['destination'] = [dst]
-                            prbSubGraph.nodes[addr]['time'] = [timestamp]
-                            prbSubGraph.nodes[addr]['msm_id'] = [msm_id]
-                            
-                        if k == 0:
-                            prbSubGraph.add_edge(prb_src_addr, addr,
-                                                 rtt=median_rtt,
-                                                 probe=prb_id,
-                                                 destination=dst,
-                                                 timestamp=timestamp,
-                                                 msm_id=msm_id)
-                        
-                        else:
                             prv_hop, prv_hop_asn, prv_hop_ips, prv_med_rtt = previous
                             hop_rtt = median_rtt - prv_med_rtt
                             for prv_ip in prv_hop_ips:
@@ -953,202 +852,145 @@ if __name__ == "__main__":
                                                      destination=dst,
                                                      timestamp=timestamp,
                                                      msm_id=msm_id)
-                    if '162.254.197.36' not in hop_ips: 
-                        previous = (hop_no, hop_asn, hop_ips, median_rtt)
-                    k += 1
-
-            else:
-                prv_hop, prv_hop_asn, prv_hop_ips, prv_med_rtt = previous
-                if (hop_asn == 32590) and (prv_hop_asn != 32590):
-                    gsProviderLastHop = (prv_hop_ips[0], prv_hop_asn)
-
-                for hop_no, hop_vals in hops.items():
-                    median_rtt = hop_vals['median rtt']
-                    hop_ips = hop_vals['hop ip']
-                    for addr in hop_ips:
-                        if not prbSubGraph.has_node(addr):
-                            prbSubGraph.add_node(addr,
-                                                 asn=hop_asn,
-                                                 probe=[prb_id],
-                                                 hop=hop_no,
-                                                 destination=[dst],
-                                                 time=[timestamp],
-                                                 msm_id=[msm_id])
-                        else:
-                            prbSubGraph.nodes[addr]['probe'] = [prb_id]
-                            prbSubGraph.nodes[addr]['destination'] = [dst]
-                            prbSubGraph.nodes[addr]['time'] = [timestamp]
-                            prbSubGraph.nodes[addr]['msm_id'] = [msm_id]
-
-                        prv_hop, prv_hop_asn, prv_hop_ips, prv_med_rtt = previous
-                        hop_rtt = median_rtt - prv_med_rtt
-                        for prv_ip in prv_hop_ips:
-                            prbSubGraph.add_edge(prv_ip, addr,
-                                                 rtt=abs(hop_rtt),
-                                                 probe=prb_id,
-                                                 destination=dst,
-                                                 timestamp=timestamp,
-                                                 msm_id=msm_id)
-                    if '162.254.197.36' not in hop_ips:
-                        previous = (hop_no, hop_asn, hop_ips, median_rtt)
-            i += 1
-        print("For probe %s in ASN %s with IP address %s, the lasthop before Valve network is: %s" %(prb_id,prb_asn, prb_src_addr, (gsProviderLastHop,)))
-        gsProviderLHip, gsProviderAsn = gsProviderLastHop
-        try:
-            path = nx.shortest_path(prbSubGraph, prb_src_addr, gsProviderLHip)
-            #path = nx.shortest_path(prbDiGraph, prb_src_addr, gsProviderLHip)
-        except nx.exception.NodeNotFound:
-            print("Funky path between Probe %s with IP %s and provider hop %s in ASN %s"
-                  %(prb_id, prb_src_addr, gsProviderLHip, gsProviderAsn))
-            continue
-        if path:
-            n = 3
-            penultimateIPset = set()
-            penultimateIPset.add(path[-2])
-            print("Primary  path: %s" %path)
-            while (len(path) - n) > 1:
-                ipHop = path[-n] 
-                if nx.has_path(IPGraphs, ipHop, gsProviderLHip):
-                    alt_paths = nx.all_shortest_paths(IPGraphs, ipHop, gsProviderLHip)
-                    prbDiverseProviderPathGraph = prbSubGraph
-                    for altpath in alt_paths:
-
-                        if '185.60.112.157' in altpath:
-                            continue
-
-                        if '5.200.20.245' in altpath:
-                            continue
-
-                        if '162.254.197.36' in altpath:
-                            continue
-                        
-                        for pathAddr in altpath:
-                            pathAddrAsn = IPGraphs.nodes[pathAddr]['asn']
-                            if isinstance(pathAddrAsn, str):
-                                if int(pathAddrAsn) == 57976:
-                                    continue
-
-                                if int(pathAddrAsn) == 49544:
-                                    continue
-
-                                if int(pathAddrAsn) == 32590:
-                                    continue
-                            else:
-                                if pathAddrAsn == 57976:
-                                    continue
-
-                                if pathAddrAsn == 49544:
-                                    continue
-
-                                if pathAddrAsn == 32590:
-                                    continue
-
-
-                        #if altpath[-2] in penultimateIPset:
-                        if all(addr in altpath for addr in penultimateIPset):
-                            continue
+                        if not target.ips.intersection(hop_ips):
+                            previous = (hop_no, hop_asn, hop_ips, median_rtt)
+                i += 1
+            print("For probe %s in ASN %s with IP address %s, the lasthop before %s network is: %s" %(prb_id,prb_asn, prb_src_addr, target.name, (gsProviderLastHop,)))
+            gsProviderLHip, gsProviderAsn = gsProviderLastHop
+            try:
+                path = nx.shortest_path(prbSubGraph, prb_src_addr, gsProviderLHip)
+                #path = nx.shortest_path(prbDiGraph, prb_src_addr, gsProviderLHip)
+            except nx.exception.NodeNotFound:
+                print("Funky path between Probe %s with IP %s and provider hop %s in ASN %s"
+                      %(prb_id, prb_src_addr, gsProviderLHip, gsProviderAsn))
+                continue
+            if path:
+                n = 3
+                penultimateIPset = set()
+                penultimateIPset.add(path[-2])
+                print("Primary  path: %s" %path)
+                while (len(path) - n) > 1:
+                    ipHop = path[-n] 
+                    if nx.has_path(IPGraphs, ipHop, gsProviderLHip):
+                        alt_paths = nx.all_shortest_paths(IPGraphs, ipHop, gsProviderLHip)
+                        prbDiverseProviderPathGraph = prbSubGraph
+                        for altpath in alt_paths:
+
+                            # Paths through any of the targets, by address
+                            # or by ASN, are no alternative to reach this one.
+                            if targets.ips.intersection(altpath):
+                                continue
+
+                            if any(targets.isTargetAsn(
+                                       IPGraphs.nodes[pathAddr]['asn'])
+                                   for pathAddr in altpath):
+                                continue
+
+                            #if altpath[-2] in penultimateIPset:
+                            if all(addr in altpath for addr in penultimateIPset):
+                                continue
                         
-                        print("       Alternate path from %s to %s: %s" %(ipHop, gsProviderLHip, altpath))
-                        altpath_edges = list(nx.utils.pairwise(altpath))
-                        print("       Edges of alternate from %s to %s: %s" %(ipHop, gsProviderLHip,altpath_edges))
-                        for edge in altpath_edges:
-                            data = IPGraphs.get_edge_data(*edge)
-                            addrA, addrB = edge
-
-                            if not prbDiverseProviderPathGraph.has_node(addrA):
-                                prbDiverseProviderPathGraph.add_node(addrA,
-                                                                     asn=IPGraphs.nodes[addrA]['asn'],
-                                                                     probe=IPGraphs.nodes[addrA]['probe'],
-                                                                     destination=IPGraphs.nodes[addrA]['destination'],
-                                                                     time=IPGraphs.nodes[addrA]['time'],
-                                                                     msm_id=IPGraphs.nodes[addrA]['msm_id'])
-
-                            if not prbDiverseProviderPathGraph.has_node(addrB):
-                                prbDiverseProviderPathGraph.add_node(addrB,
-                                                                     asn=IPGraphs.nodes[addrB]['asn'],
-                                                                     probe=IPGraphs.nodes[addrB]['probe'],
-                                                                     destination=IPGraphs.nodes[addrB]['destination'],
-                                                                     time=IPGraphs.nodes[addrB]['time'],
-                                                                     msm_id=IPGraphs.nodes[addrB]['msm_id'])
-
-                            if len(data) == 1:
-                                (num, attrs), = data.items()
-                                best_attr = attrs
-                            else: 
-                                best_attr = data[0]
-                                for num_attr, attrs in data.items():
-                                    rtt = attrs['rtt'] 
-                                    if rtt < best_attr['rtt']:
-                                        best_attr = attrs
-                            if not prbDiverseProviderPathGraph.has_edge(*edge):
-                                prbDiverseProviderPathGraph.add_edge(addrA, addrB, 
-                                                                     rtt=best_attr['rtt'],
-                                                                     probe=best_attr['probe'],
-                                                                     destination=best_attr['destination'],
-                                                                     timestamp=best_attr['timestamp'],
-                                                                     msm_id=best_attr['msm_id'])
-
-
-                        #penultimateIPset.add(altpath[-2])
-                        for ipaddr in altpath:
-                            penultimateIPset.add(ipaddr)
-                        probe_with_alt_paths.add(prb_id)
-                n += 1
-        if prb_id in  probe_with_alt_paths:     
-            net = Network(height="1000px", width="100%", notebook=True, directed=True)
-            net.toggle_physics(True)
-            net.show_buttons(filter_=True)
-            net.from_nx(prbDiverseProviderPathGraph)
-            neigh_map = net.get_adj_list()
-            new_map = {}
+                            print("       Alternate path from %s to %s: %s" %(ipHop, gsProviderLHip, altpath))
+                            altpath_edges = list(nx.utils.pairwise(altpath))
+                            print("       Edges of alternate from %s to %s: %s" %(ipHop, gsProviderLHip,altpath_edges))
+                            for edge in altpath_edges:
+                                data = IPGraphs.get_edge_data(*edge)
+                                addrA, addrB = edge
+
+                                if not prbDiverseProviderPathGraph.has_node(addrA):
+                                    prbDiverseProviderPathGraph.add_node(addrA,
+                                                                         asn=IPGraphs.nodes[addrA]['asn'],
+                                                                         probe=IPGraphs.nodes[addrA]['probe'],
+                                                                         destination=IPGraphs.nodes[addrA]['destination'],
+                                                                         time=IPGraphs.nodes[addrA]['time'],
+                                                                         msm_id=IPGraphs.nodes[addrA]['msm_id'])
+
+                                if not prbDiverseProviderPathGraph.has_node(addrB):
+                                    prbDiverseProviderPathGraph.add_node(addrB,
+                                                                         asn=IPGraphs.nodes[addrB]['asn'],
+                                                                         probe=IPGraphs.nodes[addrB]['probe'],
+                                                                         destination=IPGraphs.nodes[addrB]['destination'],
+                                                                         time=IPGraphs.nodes[addrB]['time'],
+                                                                         msm_id=IPGraphs.nodes[addrB]['msm_id'])
+
+                                if len(data) == 1:
+                                    (num, attrs), = data.items()
+                                    best_attr = attrs
+                                else: 
+                                    best_attr = data[0]
+                                    for num_attr, attrs in data.items():
+                                        rtt = attrs['rtt'] 
+                                        if rtt < best_attr['rtt']:
+                                            best_attr = attrs
+                                if not prbDiverseProviderPathGraph.has_edge(*edge):
+                                    prbDiverseProviderPathGraph.add_edge(addrA, addrB, 
+                                                                         rtt=best_attr['rtt'],
+                                                                         probe=best_attr['probe'],
+                                                                         destination=best_attr['destination'],
+                                                                         timestamp=best_attr['timestamp'],
+                                                                         msm_id=best_attr['msm_id'])
+
+
+                            #penultimateIPset.add(altpath[-2])
+                            for ipaddr in altpath:
+                                penultimateIPset.add(ipaddr)
+                            probe_with_alt_paths.add(prb_id)
+                    n += 1
+            if prb_id in  probe_with_alt_paths:     
+                net = Network(height="1000px", width="100%", notebook=True, directed=True)
+                net.toggle_physics(True)
+                net.show_buttons(filter_=True)
+                net.from_nx(prbDiverseProviderPathGraph)
+                neigh_map = net.get_adj_list()
+                new_map = {}
     
-            for node, neigh in neigh_map.items():
-                new_set = set()
-                for n in neigh:
-                    new_set.add(str(n))
-                new_map[node] = new_set
-
-            for node in net.nodes:
-                #print(node)
-                dest = set(node['destination'])
-                msm_id = [str(x) for x in node['msm_id']]
-                if isinstance(node['probe'], list):
-                    prbs = set(node['probe'])
-                    prb_id = [str(x) for x in prbs]
-                else:
-                    prb_id = [str(node['probe'])]
+                for node, neigh in neigh_map.items():
+                    new_set = set()
+                    for n in neigh:
+                        new_set.add(str(n))
+                    new_map[node] = new_set
+
+                for node in net.nodes:
+                    #print(node)
+                    dest = set(node['destination'])
+                    msm_id = [str(x) for x in node['msm_id']]
+                    if isinstance(node['probe'], list):
+                        prbs = set(node['probe'])
+                        prb_id = [str(x) for x in prbs]
+                    else:
+                        prb_id = [str(node['probe'])]
 
 
-                node["title"] = "ASN"+str(node['asn']) + "\nIP: "+ node['id'] + "\n Destination: "+" ".join(dest) + "\n time:" + "\n".join(node['time']) + "\n MSM ID:" + "\n".join(msm_id)+ "\nProbe:" +"\n".join(prb_id)+"\n Neighbors:\n\n"+"\n".join(new_map[node["id"]])
+                    node["title"] = "ASN"+str(node['asn']) + "\nIP: "+ node['id'] + "\n Destination: "+" ".join(dest) + "\n time:" + "\n".join(node['time']) + "\n MSM ID:" + "\n".join(msm_id)+ "\nProbe:" +"\n".join(prb_id)+"\n Neighbors:\n\n"+"\n".join(new_map[node["id"]])
 
-                node["label"] = "ASN"+str(node['asn'])
-                #+"\nIP: "+node['id']
-                #print(node)
-            for edge in net.get_edges():
-                #edge["label"] = str(edge['rtt'])+' ms'
+                    node["label"] = "ASN"+str(node['asn'])
+                    #+"\nIP: "+node['id']
+                    #print(node)
+                for edge in net.get_edges():
+                    #edge["label"] = str(edge['rtt'])+' ms'
 
-                try:
-                    pred = edge['from']
-                except KeyError:
-                    pred = ''
+                    try:
+                        pred = edge['from']
+                    except KeyError:
+                        pred = ''
 
     
-                try:
-                    succ = edge['to']
-                except KeyError:
-                    succ = ''
-                prb = str(edge['probe'])
-                msm_id = str(edge['msm_id'])
-
-                edge["title"] = "RTT: "+str(edge['rtt'])+"ms\n"+pred +" -> "+ succ +"\n Probe: "+prb+"\nMSM ID: "+msm_id+"\n Timestamp: "+edge['timestamp']+"\n Destination: "+edge['destination']
-                #print(edge)
-            print("Writing html for: %s" % probe_id)
-            name= 'probe'+str(prb_id)
-            net.set_edge_smooth('dynamic')
-            net.show('/scratch/measurements/analysis/probes-to-valve-latency-visualisation-diverse-paths/'+probe_id+'.html')
+                    try:
+                        succ = edge['to']
+                    except KeyError:
+                        succ = ''
+                    prb = str(edge['probe'])
+                    msm_id = str(edge['msm_id'])
+
+                    edge["title"] = "RTT: "+str(edge['rtt'])+"ms\n"+pred +" -> "+ succ +"\n Probe: "+prb+"\nMSM ID: "+msm_id+"\n Timestamp: "+edge['timestamp']+"\n Destination: "+edge['destination']
+                    #print(edge)
+                print("Writing html for: %s" % probe_id)
+                name= 'probe'+str(prb_id)
+                net.set_edge_smooth('dynamic')
+                net.show(DIVERSE_PATHS_DIR % target.name.lower()+probe_id+'.html')
             
-    print("Using shortest_path algo without weights, there are %s probes with alt paths" %len(probe_with_alt_paths))
-    #for msm in msm_list:
+        print("Using shortest_path algo without weights, there are %s probes with alt paths" %len(probe_with_alt_paths))
+    #for msm in map(iterResultsFile, msm_files):
     #    for result in msm:
     #        if str(result["prb_id"]) not in AllValid:
     #            continue
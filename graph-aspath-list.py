@@ -26,11 +26,9 @@
 import csv
 import sys
 import json
-import requests
 import argparse
 import ipaddress
 import _pyipmeta
-import pytricia
 from pprint import pprint
 from pathlib import Path
 from collections import OrderedDict, Counter
@@ -41,31 +39,13 @@ import matplotlib.mlab as mlab
 from networkx import path_graph, random_layout
 from pyvis.network import Network
 import numpy as np
-from glob import glob
 import gravis as gv
+from pfx2as_index import loadPfx2asIndex
+from probe_index import asnProbes
 
 caida_prefix2as = "https://publicdata.caida.org/datasets/routing/routeviews-prefix2as/2022/09/routeviews-rv2-20220920-1200.pfx2as.gz"
 
 
-def getResults(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    mresp = requests.get(url)
-    data = mresp.json()
-    res_url = data['result']
-    res_data = requests.get(res_url)
-    results = res_data.json()
-    print("Fetched results for msm: %s" % measurement_id)
-    return results
-
-
-def getProbeInfo(probe_id):
-    url = "https://atlas.ripe.net/api/v2/probes/"+str(probe_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    return data
-
-
 def validaspathsprobe(aspathsprb):
     aspath2prb_valid = {}
     for server, prbs in aspathsprb.items():
@@ -194,44 +174,8 @@ def GetASNFromProbes(common_probes_to_all_servers,
                      valve_aspaths_from_prb,
                      ubisoft_aspaths_from_prb,
                      blizzard_aspaths_from_prb):
-    asn_of_common_valid_probes = {}
-    for prb_id in common_probes_to_all_servers:
-        for prb in valve_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-
-        for prb in ubisoft_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-
-        for prb in blizzard_aspaths_from_prb:
-            (probe_id, aspaths), = prb.items()
-            if probe_id != prb_id:
-                continue
-            for aspath in aspaths:
-                origin_asn = aspath[0]
-                if origin_asn not in asn_of_common_valid_probes:
-                    asn_of_common_valid_probes[origin_asn] = [prb_id]
-                else:
-                    if prb_id not in asn_of_common_valid_probes[origin_asn]:
-                        asn_of_common_valid_probes[origin_asn].append(prb_id)
-    return asn_of_common_valid_probes
+    return asnProbes(common_probes_to_all_servers, valve_aspaths_from_prb,
+                     ubisoft_aspaths_from_prb, blizzard_aspaths_from_prb)
 
 
 def createGraph(asnFromProbeLst, valve_aspaths_from_prb,
@@ -384,15 +328,6 @@ def drawTopoGraph(graph, mgraph):
     plt.show()
 
 
-def getMsmTarget(measurement_id):
-    base_url = "https://atlas.ripe.net/api/v2/measurements/"
-    url = base_url+str(measurement_id)+"/"
-    resp = requests.get(url)
-    data = resp.json()
-    target = data["target_ip"]
-    return target
-
-
 def rtt_to_aspath(res, aspath, ip2asn, pyt):
     trace1 = res[0]
     msm_id = trace1['msm_id']
@@ -530,20 +465,10 @@ def rtt_to_aspath2(res, ip2asn, pyt):
 
 if __name__ == "__main__":
 
-    msm_list = []
-    for raw_msm in glob('/scratch/measurements/traceroute/raw-measurements-results/*.json'):
-        with open(raw_msm, 'r') as f:
-            msm_raw = json.load(f)
-            msm_list.append(msm_raw)
-
     with open('/scratch/measurements/aspath/probes-asn-paths-to-server/list-of-asns-and-probes-common-to-msms-to-the-three-game-servers-and-their-paths.json', 'r') as validlist:
         commonASNsandProbes = json.load(validlist)
 
-    pyt = pytricia.PyTricia(128)
-    with open('/scratch/ip2as.pfx2as', 'r') as f:
-        prefix2as_file = csv.reader(f, delimiter=' ')
-        for prefix2as in prefix2as_file:
-            pyt.insert(prefix2as[0], prefix2as[1])
+    pyt = loadPfx2asIndex('/scratch/ip2as.pfx2as')
 
     ipm = _pyipmeta.IpMeta()
     ipm_prov = ipm.get_provider_by_name("pfx2as")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Columnar table of traceroute hops. Atlas traceroute results are nested
+# result -> hop -> packet dicts; they are flattened once into one row per
+# reply packet (msm_id, prb_id, timestamp, dst, hop_no, the reply address
+# as integers, rtt, ttl and flags) and stored as Parquet. Hops that carry
+# no packets at all get a single row with FLAG_HOP_ERROR set so hop
+# numbering survives. Later stages read the columns they need and work on
+# whole arrays with group-bys instead of walking the dicts again.
+
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from glob import glob
+from itertools import chain
+from atlas_results import iterResultsFile
+from pfx2as_index import packAddresses, intToIp, FAMILY_INVALID
+from ip_class import classifyPacked, CLASS_GLOBAL
+
+HOP_TABLE = '/scratch/measurements/traceroute/hops.parquet'
+RESULTS_PER_BATCH = 10000
+
+# One traceroute is the results of a probe in a measurement at a time.
+TRACE_KEY = ['msm_id', 'prb_id', 'timestamp']
+
+FLAG_TIMEOUT = 1
+FLAG_HOP_ERROR = 2
+FLAG_ERR = 4
+FLAG_LATE = 8
+FLAG_DUP = 16
+FLAG_ICMPEXT = 32
+
+PACKET_FLAGS = [('x', FLAG_TIMEOUT), ('err', FLAG_ERR), ('late', FLAG_LATE),
+                ('dup', FLAG_DUP), ('icmpext', FLAG_ICMPEXT)]
+
+HOP_SCHEMA = pa.schema([('msm_id', pa.int64()),
+                        ('prb_id', pa.int64()),
+                        ('timestamp', pa.int64()),
+                        ('dst', pa.string()),
+                        ('hop_no', pa.int16()),
+                        ('reply_family', pa.uint8()),
+                        ('reply_hi', pa.uint64()),
+                        ('reply_lo', pa.uint64()),
+                        ('rtt', pa.float64()),
+                        ('ttl', pa.int16()),
+                        ('flags', pa.uint8())])
+
+
+def hopTable(results):
+    # Flattens an iterable of traceroute results into a DataFrame.
+    columns = {name: [] for name in HOP_SCHEMA.names}
+    replies = []
+
+    def addRow(result, hop_no, reply, rtt, ttl, flags):
+        columns['msm_id'].append(result['msm_id'])
+        columns['prb_id'].append(result['prb_id'])
+        columns['timestamp'].append(result.get('timestamp', 0))
+        columns['dst'].append(result.get('dst_addr')
+                              or result.get('dst_name'))
+        columns['hop_no'].append(hop_no)
+        replies.append(reply)
+        columns['rtt'].append(rtt)
+        columns['ttl'].append(ttl)
+        columns['flags'].append(flags)
+
+    for result in results:
+        if not isinstance(result.get('result'), list):
+            continue
+        for hop in result['result']:
+            hop_no = hop.get('hop', -1)
+            if 'result' not in hop:
+                addRow(result, hop_no, None, np.nan, -1, FLAG_HOP_ERROR)
+                continue
+            for pkt in hop['result']:
+                flags = 0
+                for key, flag in PACKET_FLAGS:
+                    if key in pkt:
+                        flags |= flag
+                addRow(result, hop_no, pkt.get('from'),
+                       pkt.get('rtt', np.nan), pkt.get('ttl', -1), flags)
+
+    # Router addresses repeat, each distinct one is only packed once.
+    distinct = {}
+    inverse = np.fromiter((distinct.setdefault(addr, len(distinct))
+                           for addr in replies),
+                          dtype=np.int64, count=len(replies))
+    family, hi, lo = packAddresses(list(distinct))
+    columns['reply_family'] = family[inverse]
+    columns['reply_hi'] = hi[inverse]
+    columns['reply_lo'] = lo[inverse]
+    return pa.Table.from_pydict(columns, schema=HOP_SCHEMA).to_pandas()
+
+
+def writeHopTable(results, path=HOP_TABLE, batch_size=RESULTS_PER_BATCH):
+    # Results are flattened batch_size at a time and each batch written as
+    # a row group, so memory stays bounded however many results there are.
+    results = iter(results)
+    rows = 0
+    with pq.ParquetWriter(path, HOP_SCHEMA) as writer:
+        while True:
+            batch = [result for _, result in zip(range(batch_size), results)]
+            if not batch:
+                break
+            table = pa.Table.from_pandas(hopTable(batch), schema=HOP_SCHEMA,
+                                         preserve_index=False)
+            writer.write_table(table)
+            rows += table.num_rows
+    return rows
+
+
+def readHopTable(path=HOP_TABLE, columns=None, filters=None):
+    # filters as taken by pyarrow, e.g. [('msm_id', 'in', msms)].
+    return pd.read_parquet(path, columns=columns, filters=filters)
+
+
+def iterHopTable(path=HOP_TABLE, columns=None):
+    # Yields the table a row group at a time. Row groups hold whole
+    # traceroutes, as results are never split across batches.
+    parquet = pq.ParquetFile(path)
+    for group in range(parquet.num_row_groups):
+        yield parquet.read_row_group(group, columns=columns).to_pandas()
+
+
+def replyAddresses(hops):
+    # Reply addresses of the rows as strings, None where there is none.
+    packed = hops[['reply_family', 'reply_hi', 'reply_lo']]
+    distinct, inverse = np.unique(packed.to_numpy(), axis=0,
+                                  return_inverse=True)
+    addrs = np.array([intToIp(*row) for row in distinct.tolist()],
+                     dtype=object)
+    return addrs[inverse.reshape(-1)]
+
+
+def replyClasses(hops):
+    return classifyPacked(hops['reply_family'].to_numpy(),
+                          hops['reply_hi'].to_numpy(),
+                          hops['reply_lo'].to_numpy())
+
+
+def annotateHops(hops, resolver):
+    # Adds the reply address, its class and its ASN to every row. Only the
+    # global replies are resolved, all of them in one call.
+    hops = hops.copy()
+    hops['reply_ip'] = replyAddresses(hops)
+    hops['reply_class'] = replyClasses(hops)
+    hops['asn'] = np.zeros(len(hops), dtype=np.uint32)
+    is_global = hops['reply_class'].to_numpy() == CLASS_GLOBAL
+    hops.loc[is_global, 'asn'] = resolver.resolveMany(
+            hops.loc[is_global, 'reply_ip'].tolist())
+    return hops
+
+
+def traceGroups(hops):
+    return hops.groupby(TRACE_KEY, sort=False)
+
+
+def hopRtts(hops):
+    # RTTs of the replies to every hop of every traceroute and their
+    # median, 0 for a hop without any.
+    replies = hops[hops['reply_family'] != FAMILY_INVALID]
+    rtts = replies.groupby(TRACE_KEY+['hop_no'], sort=False)['rtt']
+    return pd.DataFrame({'rtts': rtts.agg(lambda rtt: rtt.dropna().tolist()),
+                         'median_rtt': rtts.median().fillna(0)})
+
+
+def rttPerAsn(hops):
+    # The hops of every traceroute in every AS it crosses, from annotated
+    # hops, with the RTTs of the hop and their median as rtt_to_aspath2()
+    # in graph-annotate-improvement2.py takes them. Rows come in the order
+    # the traceroutes, ASes and hops first appear in.
+    rtts = hopRtts(hops)
+    hops = hops[hops['asn'] != 0]
+    per_asn = (hops.groupby(TRACE_KEY+['asn', 'hop_no'], sort=False)
+               ['reply_ip'].unique().rename('hop_ips').reset_index())
+    return per_asn.join(rtts, on=TRACE_KEY+['hop_no'])
+
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser(
+            description='Flatten traceroute results into a hop table',
+            usage='%(prog)s [-i results_glob -o hop_table]')
+
+    argParser.add_argument('-i', dest='results',
+                           help='Glob of traceroute result files to read',
+                           type=str,
+                           default='/scratch/measurements/traceroute/raw-measurements-results/*.json')
+
+    argParser.add_argument('-o', dest='hop_table',
+                           help='Parquet file to write the hop table to',
+                           type=str, default=HOP_TABLE)
+
+    args = argParser.parse_args()
+
+    msm_files = sorted(glob(args.results))
+    if not msm_files:
+        print("%s does not match any file!!!" % args.results)
+        sys.exit(-1)
+
+    rows = writeHopTable(chain.from_iterable(map(iterResultsFile, msm_files)),
+                         args.hop_table)
+    print("Wrote %s hop rows from %s files to %s"
+          % (rows, len(msm_files), args.hop_table))
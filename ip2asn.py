@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Layered IP to ASN resolution. The sources an address can be resolved
+# from (libipmeta's pfx2as provider, a compiled pfx2as index and a JSON map
+# of previously resolved addresses) are chained in a configurable order and
+# an address is only handed to the next source when the ones before it had
+# no answer. Addresses are resolved in batches, one call per source for the
+# whole batch, and every answer is remembered so an address is only
+# resolved once per run. ASNs are always returned as integers, 0 meaning
+# unresolved.
+#
+# Answers can also be kept across runs in an append-only memo file keyed by
+# address and a digest of the sources, their order and the path, size and
+# mtime of their files, so replacing any of the data starts a fresh set of
+# answers.
+# Unresolved addresses are recorded as well, so a re-run over the same
+# traceroutes only looks up router addresses it has not seen before. When
+# a source fails, the addresses it left unanswered are not recorded.
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import numpy as np
+from collections import Counter
+from pfx2as_index import (FAMILY_V4, FAMILY_INVALID, packAddresses, intToIp,
+                          loadPfx2asIndex, sourceSignature)
+
+PFX2AS_FILE = '/scratch/ip2as.pfx2as'
+IPMETA_PFX2AS = "https://publicdata.caida.org/datasets/routing/routeviews-prefix2as/2022/09/routeviews-rv2-20220920-1200.pfx2as.gz"
+IP2ASN_FILE = '/scratch/measurements/ip2asn/traceip2asn.json'
+MEMO_FILE = '/scratch/measurements/ip2asn/resolved.tsv'
+SOURCE_ORDER = 'ipmeta,pfx2as,map'
+UNRESOLVED = 0
+
+
+def asnToInt(asn):
+    # ASNs turn up as ints, digit strings, negative placeholders and
+    # multi-origin strings such as 123_456. Only a single positive ASN
+    # counts as resolved.
+    if asn is None or isinstance(asn, bool):
+        return UNRESOLVED
+    if isinstance(asn, (int, np.integer)):
+        return int(asn) if asn > 0 else UNRESOLVED
+    asn = str(asn)
+    if asn.isdigit():
+        return int(asn)
+    return UNRESOLVED
+
+
+class SourceError(Exception):
+    pass
+
+
+class IpMetaSource:
+
+    def __init__(self, pfx2as=IPMETA_PFX2AS, name='ipmeta'):
+        import _pyipmeta
+        self.name = name
+        self.pfx2as = pfx2as
+        self.ipm = _pyipmeta.IpMeta()
+        self.enabled = False
+
+    def load(self):
+        if not self.enabled:
+            # libipmeta reports failures as RuntimeError.
+            try:
+                provider = self.ipm.get_provider_by_name("pfx2as")
+                self.ipm.enable_provider(provider, "-f "+self.pfx2as)
+            except RuntimeError as err:
+                raise SourceError("ipmeta cannot load %s: %s"
+                                  % (self.pfx2as, err)) from err
+            self.enabled = True
+
+    def lookupMany(self, addrs, packed):
+        # Loading the prefixes is the slow part, it is put off until an
+        # address actually has to be looked up.
+        self.load()
+        asns = np.zeros(len(addrs), dtype=np.uint32)
+        for i, addr in enumerate(addrs):
+            if packed[0][i] == FAMILY_INVALID:
+                continue
+            try:
+                res = self.ipm.lookup(addr)
+            except RuntimeError as err:
+                raise SourceError("ipmeta lookup of %s failed: %s"
+                                  % (addr, err)) from err
+            if res:
+                (res,) = res
+                if res.get('asns'):
+                    asns[i] = asnToInt(res.get('asns')[-1])
+        return asns
+
+
+class IndexSource:
+
+    def __init__(self, index, name='pfx2as'):
+        self.name = name
+        self.index = index
+
+    def lookupMany(self, addrs, packed):
+        return self.index.lookupPacked(*packed)
+
+
+class MapSource:
+
+    def __init__(self, mapping, name='map'):
+        self.name = name
+        self.mapping = mapping
+
+    def lookupMany(self, addrs, packed):
+        return np.fromiter((asnToInt(self.mapping.get(addr))
+                            for addr in addrs),
+                           dtype=np.uint32, count=len(addrs))
+
+
+def sourceIdentity(source):
+    # The signature the pfx2as index records for its source file, a stat
+    # rather than a read of the file. A URL stands for itself, published
+    # datasets such as CAIDA's dated pfx2as snapshots do not change.
+    if os.path.isfile(source):
+        return json.dumps(sourceSignature(source), sort_keys=True)
+    return source
+
+
+def memoKey(names, pfx2as_file=PFX2AS_FILE, ipmeta_pfx2as=IPMETA_PFX2AS,
+            ip2asn_file=IP2ASN_FILE):
+    # Answers depend on every source and the order they are tried in.
+    files = {'ipmeta': ipmeta_pfx2as,
+             'pfx2as': pfx2as_file,
+             'map': ip2asn_file}
+    identity = ','.join('%s=%s' % (name, sourceIdentity(files[name]))
+                        for name in names)
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+
+class ResolutionMemo:
+
+    def __init__(self, key, path=MEMO_FILE, readonly=False):
+        self.key = key
+        self.path = path
+        self.readonly = readonly
+        self.known = None
+
+    def load(self):
+        # Lines are "key<TAB>address<TAB>asn", asn 0 for addresses no
+        # source resolved. A line cut short by an interrupted run is skipped.
+        self.known = {}
+        if os.path.isfile(self.path):
+            with open(self.path, 'r') as f:
+                for line in f:
+                    row = line.split('\t')
+                    if (len(row) == 3 and row[0] == self.key
+                            and row[2].strip().isdigit()):
+                        self.known[row[1]] = int(row[2])
+        return self
+
+    def __contains__(self, addr):
+        if self.known is None:
+            self.load()
+        return addr in self.known
+
+    def __getitem__(self, addr):
+        if self.known is None:
+            self.load()
+        return self.known[addr]
+
+    def add(self, resolved):
+        if self.known is None:
+            self.load()
+        new = [(addr, asn) for addr, asn in resolved
+               if addr not in self.known]
+        if not new:
+            return
+        if self.readonly:
+            self.known.update(new)
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'ab') as f:
+            lines = ''.join('%s\t%s\t%s\n' % (self.key, addr, asn)
+                            for addr, asn in new)
+            # Start on a fresh line after a line an earlier run left cut
+            # short.
+            if f.tell() > 0:
+                with open(self.path, 'rb') as tail:
+                    tail.seek(-1, os.SEEK_END)
+                    if tail.read(1) != b'\n':
+                        lines = '\n'+lines
+            f.write(lines.encode('utf-8'))
+        self.known.update(new)
+
+
+class IpToAsnResolver:
+
+    def __init__(self, sources, memo=None):
+        self.sources = list(sources)
+        self.memo = memo
+        self.resolved = {}
+        # Addresses whose answer may be wrong because a source failed, they
+        # are not handed to the memo.
+        self.transient = set()
+        self.errors = {}
+        self.stats = Counter()
+
+    @staticmethod
+    def _unpack(addrs):
+        # Integer arrays hold IPv4 addresses as unsigned 32-bit values.
+        if isinstance(addrs, np.ndarray) and addrs.dtype.kind in 'iu':
+            return [intToIp(FAMILY_V4, 0, ip) for ip in addrs.tolist()]
+        return list(addrs)
+
+    def resolveMany(self, addrs):
+        # ASN of every address in addrs in one call, 0 where no source
+        # resolves it.
+        addrs = self._unpack(addrs)
+        pending = [addr for addr in dict.fromkeys(addrs)
+                   if addr not in self.resolved]
+        if pending:
+            self._resolve(pending)
+        return np.fromiter((self.resolved[addr] for addr in addrs),
+                           dtype=np.uint32, count=len(addrs))
+
+    def _resolve(self, addrs):
+        if self.memo is not None:
+            remembered = {addr: self.memo[addr] for addr in addrs
+                          if addr in self.memo}
+            self.stats['memo'] += len(remembered)
+            self.resolved.update(remembered)
+            addrs = [addr for addr in addrs if addr not in remembered]
+            if not addrs:
+                return
+
+        packed = packAddresses(addrs)
+        asns = np.zeros(len(addrs), dtype=np.uint32)
+        todo = np.flatnonzero(packed[0] != FAMILY_INVALID)
+        self.stats['invalid'] += len(addrs) - len(todo)
+        transient = []
+        for source in self.sources:
+            if not len(todo):
+                break
+            try:
+                found = source.lookupMany([addrs[i] for i in todo],
+                                          tuple(a[todo] for a in packed))
+            except (OSError, SourceError) as err:
+                # The later sources still get a go, but none of what is
+                # left could be answered the way the failed source would.
+                self.errors[source.name] = err
+                self.stats['failed '+source.name] += len(todo)
+                transient.extend(addrs[i] for i in todo)
+                continue
+            hits = found != UNRESOLVED
+            asns[todo[hits]] = found[hits]
+            self.stats[source.name] += int(hits.sum())
+            todo = todo[~hits]
+        self.stats['unresolved'] += len(todo)
+        self.resolved.update(zip(addrs, asns.tolist()))
+        self.transient.update(transient)
+        if self.memo is not None:
+            self.memo.add((addr, asn) for addr, asn in zip(addrs, asns.tolist())
+                          if addr not in self.transient)
+
+    def learn(self, resolved):
+        # Takes (address, asn) pairs resolved elsewhere, e.g. by a worker
+        # process, into the resolver and its memo.
+        resolved = list(resolved)
+        self.resolved.update(resolved)
+        if self.memo is not None:
+            self.memo.add(resolved)
+
+    def load(self):
+        # Loads the memo and every source that loads lazily, so processes
+        # forked afterwards share them instead of each loading its own.
+        if self.memo is not None and self.memo.known is None:
+            self.memo.load()
+        for source in self.sources:
+            if hasattr(source, 'load'):
+                source.load()
+        return self
+
+    def resolve(self, addr):
+        # Single address, None when unresolved.
+        if addr not in self.resolved:
+            self._resolve([addr])
+        return self.resolved[addr] or None
+
+    def printStats(self):
+        if self.memo is not None:
+            print("IP addresses found in memo: %s" % self.stats['memo'])
+        for source in self.sources:
+            print("IP addresses resolved by %s: %s"
+                  % (source.name, self.stats[source.name]))
+            if self.stats['failed '+source.name]:
+                print("IP addresses left by failed %s: %s (%s)"
+                      % (source.name, self.stats['failed '+source.name],
+                         self.errors.get(source.name, 'in a worker')))
+        print("Unresolved IP addresses: %s" % self.stats['unresolved'])
+        print("Invalid IP addresses: %s" % self.stats['invalid'])
+
+
+def loadIp2asnMap(ip2asn_file=IP2ASN_FILE):
+    with open(ip2asn_file, 'r') as f:
+        return json.load(f)
+
+
+def makeSource(name, pfx2as_file=PFX2AS_FILE, ipmeta_pfx2as=IPMETA_PFX2AS,
+               ip2asn_file=IP2ASN_FILE):
+    if name == 'ipmeta':
+        return IpMetaSource(ipmeta_pfx2as)
+    if name == 'pfx2as':
+        return IndexSource(loadPfx2asIndex(pfx2as_file))
+    if name == 'map':
+        return MapSource(loadIp2asnMap(ip2asn_file))
+    raise ValueError("Unknown IP to ASN source: %s" % name)
+
+
+def makeResolver(order=SOURCE_ORDER, memo_file=None, **kwargs):
+    # order is a comma separated list of source names, tried left to right.
+    # With memo_file set, answers are kept in it against the sources.
+    names = [name.strip() for name in order.split(',') if name.strip()]
+    sources = [makeSource(name, **kwargs) for name in names]
+    memo = None
+    if memo_file is not None:
+        memo = ResolutionMemo(memoKey(names, **kwargs), memo_file)
+    return IpToAsnResolver(sources, memo)
+
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser(
+            description='Resolve a list of IP addresses to ASNs',
+            usage='%(prog)s [-i ipfile -s sources -o output]')
+
+    argParser.add_argument('-i', dest='ipfile',
+                           help='JSON list of IP addresses to resolve',
+                           type=str, default=None)
+
+    argParser.add_argument('-s', dest='sources',
+                           help='''Comma separated IP to ASN sources, in
+                                the order they are tried''',
+                           type=str, default=SOURCE_ORDER)
+
+    argParser.add_argument('-p', dest='pfx2as_file',
+                           help='Prefix to AS file for the pfx2as source',
+                           type=str, default=PFX2AS_FILE)
+
+    argParser.add_argument('-m', dest='ip2asn_file',
+                           help='IP to ASN mapping for the map source',
+                           type=str, default=IP2ASN_FILE)
+
+    argParser.add_argument('-c', dest='memo_file',
+                           help='Memo file to keep resolved addresses in',
+                           type=str, default=None)
+
+    argParser.add_argument('-o', dest='output',
+                           help='File to write the IP to ASN mapping to',
+                           type=str, default=None)
+
+    args = argParser.parse_args()
+
+    if args.ipfile is None:
+        print("File of IP addresses not passed!!!")
+        sys.exit(-1)
+
+    with open(args.ipfile, 'r') as f:
+        addrs = json.load(f)
+
+    resolver = makeResolver(args.sources, memo_file=args.memo_file,
+                            pfx2as_file=args.pfx2as_file,
+                            ip2asn_file=args.ip2asn_file)
+    asns = resolver.resolveMany(addrs)
+    resolver.printStats()
+    ip_to_asn = {addr: asn for addr, asn in zip(addrs, asns.tolist()) if asn}
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(ip_to_asn, f, ensure_ascii=False)
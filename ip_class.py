@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Bulk classification of hop addresses. Addresses are packed into integers
+# once and tested against tables of the special-purpose ranges with NumPy,
+# giving the same answers as ipaddress' is_global and is_private without
+# building an ip_address object per hop. Classes are remembered per
+# address, as the same router addresses turn up in trace after trace.
+#
+# The tables are those of the ipaddress module the pipeline was written
+# against: an IPv4 address is private in one of the ranges below and global
+# when it is neither private nor in the shared address space 100.64.0.0/10,
+# an IPv6 address is global when it is not private and an IPv4-mapped IPv6
+# address is private when the IPv4 address is.
+
+import ipaddress
+import numpy as np
+from pfx2as_index import FAMILY_V4, FAMILY_V6, packAddresses
+
+CLASS_INVALID = 0
+CLASS_GLOBAL = 1
+CLASS_PRIVATE = 2
+# Neither global nor private, i.e. the shared address space.
+CLASS_RESERVED = 3
+
+V4_PRIVATE = ['0.0.0.0/8', '10.0.0.0/8', '127.0.0.0/8', '169.254.0.0/16',
+              '172.16.0.0/12', '192.0.0.0/29', '192.0.0.170/31',
+              '192.0.2.0/24', '192.168.0.0/16', '198.18.0.0/15',
+              '198.51.100.0/24', '203.0.113.0/24', '240.0.0.0/4',
+              '255.255.255.255/32']
+V4_SHARED = ['100.64.0.0/10']
+V6_PRIVATE = ['::1/128', '::/128', '::ffff:0:0/96', '100::/64', '2001::/23',
+              '2001:2::/48', '2001:db8::/32', '2001:10::/28', 'fc00::/7',
+              'fe80::/10']
+
+U64_MAX = (1 << 64) - 1
+
+
+def rangeTable(networks):
+    # Masks and network addresses of each range split into upper and lower
+    # 64 bits, IPv4 ranges living in the lower 32 bits.
+    table = [[], [], [], []]
+    for network in networks:
+        net = ipaddress.ip_network(network)
+        value = int(net.network_address)
+        mask = int(net.netmask)
+        table[0].append(mask >> 64)
+        table[1].append(value >> 64)
+        table[2].append(mask & U64_MAX)
+        table[3].append(value & U64_MAX)
+    return tuple(np.array(column, dtype=np.uint64) for column in table)
+
+
+V4_PRIVATE_TABLE = rangeTable(V4_PRIVATE)
+V4_SHARED_TABLE = rangeTable(V4_SHARED)
+V6_PRIVATE_TABLE = rangeTable(V6_PRIVATE)
+
+
+def inRanges(table, hi, lo):
+    hi_masks, hi_nets, lo_masks, lo_nets = table
+    return (((hi[:, None] & hi_masks) == hi_nets)
+            & ((lo[:, None] & lo_masks) == lo_nets)).any(axis=1)
+
+
+def classifyPacked(family, hi, lo):
+    # Class of every packed address.
+    v4 = family == FAMILY_V4
+    v6 = family == FAMILY_V6
+    mapped = v6 & (hi == 0) & ((lo >> np.uint64(32)) == 0xffff)
+    v4_lo = np.where(mapped, lo & np.uint64(0xffffffff), lo)
+    v4_hi = np.zeros(len(lo), dtype=np.uint64)
+
+    private = np.zeros(len(family), dtype=bool)
+    as_v4 = v4 | mapped
+    private[as_v4] = inRanges(V4_PRIVATE_TABLE, v4_hi[as_v4], v4_lo[as_v4])
+    as_v6 = v6 & ~mapped
+    private[as_v6] = inRanges(V6_PRIVATE_TABLE, hi[as_v6], lo[as_v6])
+    shared = np.zeros(len(family), dtype=bool)
+    shared[v4] = inRanges(V4_SHARED_TABLE, v4_hi[v4], lo[v4])
+
+    classes = np.full(len(family), CLASS_INVALID, dtype=np.uint8)
+    classes[(v4 | v6) & ~private] = CLASS_GLOBAL
+    classes[shared & ~private] = CLASS_RESERVED
+    classes[private] = CLASS_PRIVATE
+    return classes
+
+
+class AddressClassifier:
+
+    def __init__(self):
+        self.classes = {}
+
+    def classify(self, addrs):
+        # Class of every address in addrs, only addresses not seen before
+        # are packed and tested.
+        addrs = list(addrs)
+        pending = [addr for addr in dict.fromkeys(addrs)
+                   if addr not in self.classes]
+        if pending:
+            classes = classifyPacked(*packAddresses(pending))
+            self.classes.update(zip(pending, classes.tolist()))
+        return np.fromiter((self.classes[addr] for addr in addrs),
+                           dtype=np.uint8, count=len(addrs))
+
+    def masks(self, addrs):
+        # (global, private, invalid) masks of addrs.
+        classes = self.classify(addrs)
+        return (classes == CLASS_GLOBAL, classes == CLASS_PRIVATE,
+                classes == CLASS_INVALID)
+
+    def addressClass(self, addr):
+        if addr not in self.classes:
+            self.classify([addr])
+        return self.classes[addr]
+
+
+_default_classifier = AddressClassifier()
+
+
+def classifyAddresses(addrs):
+    # (global, private, invalid) masks of a batch of addresses.
+    return _default_classifier.masks(addrs)
+
+
+def addressClass(addr):
+    return _default_classifier.addressClass(addr)
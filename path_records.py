@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Machine readable output of the path diversity analysis. Every shortest
+# valley-free path found from an upstream of the target AS to a probe ASN
+# becomes one record, written as JSON lines or, for a .parquet file, as
+# Parquet row groups. Records are buffered and written RECORDS_PER_BATCH at
+# a time. The counters of the run go to a JSON summary next to the records.
+
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RECORDS_PER_BATCH = 10000
+JSONL_BUFFER_SIZE = 1 << 20
+SUMMARY_SUFFIX = '.summary.json'
+
+RECORD_SCHEMA = pa.schema([('probe_asn', pa.string()),
+                           ('upstream', pa.string()),
+                           ('relation', pa.string()),
+                           ('intermediates', pa.int32()),
+                           ('path', pa.list_(pa.string()))])
+
+
+def pathRecords(probe_asn, upstream, relation, intermediates, short_paths):
+    return [{'probe_asn': probe_asn,
+             'upstream': upstream,
+             'relation': relation,
+             'intermediates': len(intermediates),
+             'path': path} for path in short_paths]
+
+
+def summaryPath(path):
+    return path+SUMMARY_SUFFIX
+
+
+class PathRecordWriter:
+
+    def __init__(self, path, batch_size=RECORDS_PER_BATCH):
+        self.path = path
+        self.batch_size = batch_size
+        self.parquet = path.endswith('.parquet')
+        self.buffer = []
+        self.rows = 0
+        if self.parquet:
+            self.writer = pq.ParquetWriter(path, RECORD_SCHEMA)
+        else:
+            self.writer = open(path, 'w', buffering=JSONL_BUFFER_SIZE)
+
+    def write(self, records):
+        self.buffer.extend(records)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.parquet:
+            self.writer.write_table(
+                    pa.Table.from_pylist(self.buffer, schema=RECORD_SCHEMA))
+        else:
+            self.writer.write(''.join(json.dumps(record,
+                                                 separators=(',', ':'))+'\n'
+                                      for record in self.buffer))
+        self.rows += len(self.buffer)
+        self.buffer = []
+
+    def writeSummary(self, summary):
+        with open(summaryPath(self.path), 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+# Compiled prefix to ASN index. A pfx2as file is flattened once into sorted,
+# non-overlapping address intervals, where a more specific prefix takes over
+# the part of the address space it covers, and written as NumPy arrays
+# next to the pfx2as file. Later runs memory-map the arrays, so startup does
+# not depend on the size of the file and every worker process shares one
+# page-cached copy. A longest prefix match is a binary search for the last
+# interval starting at or below the address.
+#
+# IPv4 intervals are keyed on the full 32-bit address. IPv6 intervals are
+# keyed on the full 128-bit address, held as 16 big-endian bytes so that
+# NumPy compares and searches them in address order.
+
+import os
+import sys
+import json
+import socket
+import argparse
+import numpy as np
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = '.idx'
+NO_MATCH = -1
+
+V4_MAX = (1 << 32) - 1
+V6_MAX = (1 << 128) - 1
+U64_MAX = (1 << 64) - 1
+
+FAMILY_INVALID = 0
+FAMILY_V4 = 4
+FAMILY_V6 = 6
+
+
+def ipToInt(addr):
+    # Returns (family, hi, lo) of an address, hi and lo being the upper and
+    # lower 64 bits. IPv4 addresses are held in lo.
+    try:
+        if ':' in addr:
+            packed = socket.inet_pton(socket.AF_INET6, addr)
+            return (FAMILY_V6, int.from_bytes(packed[:8], 'big'),
+                    int.from_bytes(packed[8:], 'big'))
+        packed = socket.inet_pton(socket.AF_INET, addr)
+        return (FAMILY_V4, 0, int.from_bytes(packed, 'big'))
+    except (OSError, TypeError, ValueError):
+        return (FAMILY_INVALID, 0, 0)
+
+
+def intToIp(family, hi, lo):
+    if family == FAMILY_V4:
+        return socket.inet_ntop(socket.AF_INET, int(lo).to_bytes(4, 'big'))
+    if family == FAMILY_V6:
+        return socket.inet_ntop(socket.AF_INET6, int(hi).to_bytes(8, 'big')
+                                + int(lo).to_bytes(8, 'big'))
+    return None
+
+
+def packAddresses(addrs):
+    # Converts a sequence of address strings to family, hi and lo arrays.
+    family = np.zeros(len(addrs), dtype=np.uint8)
+    hi = np.zeros(len(addrs), dtype=np.uint64)
+    lo = np.zeros(len(addrs), dtype=np.uint64)
+    for i, addr in enumerate(addrs):
+        family[i], hi[i], lo[i] = ipToInt(addr)
+    return family, hi, lo
+
+
+def v6Keys(hi, lo):
+    # 16 byte keys of IPv6 addresses given as arrays of their upper and
+    # lower 64 bits.
+    keys = np.empty((len(hi), 2), dtype='>u8')
+    keys[:, 0] = hi
+    keys[:, 1] = lo
+    return keys.view('S16').ravel()
+
+
+def parsePfx2asLine(row):
+    # Accepts "prefix/len asn" as well as CAIDA's "prefix<TAB>len<TAB>asn".
+    if len(row) >= 3:
+        prefix, length, asn = row[0], row[1], row[2]
+    elif len(row) == 2 and '/' in row[0]:
+        (prefix, length), asn = row[0].split('/', 1), row[1]
+    else:
+        return None
+
+    family, hi, lo = ipToInt(prefix)
+    try:
+        length = int(length)
+    except ValueError:
+        return None
+
+    if family == FAMILY_V4 and 0 <= length <= 32:
+        size = 1 << (32 - length)
+        start = lo & ~(size - 1) & V4_MAX
+        return (FAMILY_V4, start, start + size - 1, asn)
+
+    if family == FAMILY_V6 and 0 <= length <= 128:
+        size = 1 << (128 - length)
+        start = ((hi << 64) | lo) & ~(size - 1) & V6_MAX
+        return (FAMILY_V6, start, start + size - 1, asn)
+
+    return None
+
+
+def flattenIntervals(prefixes, max_addr):
+    # prefixes are (start, end, value). CIDR prefixes are either nested or
+    # disjoint, so sorting by start and then by size, largest first, and
+    # keeping a stack of the prefixes still open yields the value of every
+    # stretch of address space.
+    starts = []
+    values = []
+
+    def emit(pos, value):
+        if pos > max_addr:
+            return
+        if starts and starts[-1] == pos:
+            values[-1] = value
+        elif not values or values[-1] != value:
+            starts.append(pos)
+            values.append(value)
+
+    stack = []
+    for start, end, value in sorted(prefixes, key=lambda p: (p[0], -p[1])):
+        while stack and stack[-1][0] < start:
+            closed_end, closed_value = stack.pop()
+            emit(closed_end + 1, stack[-1][1] if stack else NO_MATCH)
+        stack.append((end, value))
+        emit(start, value)
+
+    while stack:
+        closed_end, closed_value = stack.pop()
+        emit(closed_end + 1, stack[-1][1] if stack else NO_MATCH)
+
+    return starts, values
+
+
+def indexDir(pfx2as_file):
+    return pfx2as_file+INDEX_SUFFIX
+
+
+def sourceSignature(pfx2as_file):
+    stat = os.stat(pfx2as_file)
+    return {'version': INDEX_VERSION,
+            'source': os.path.abspath(pfx2as_file),
+            'size': stat.st_size,
+            'mtime': int(stat.st_mtime)}
+
+
+def compilePfx2as(pfx2as_file, out_dir=None):
+    if out_dir is None:
+        out_dir = indexDir(pfx2as_file)
+
+    asn_ids = {}
+    prefixes = {FAMILY_V4: [], FAMILY_V6: []}
+    with open(pfx2as_file, 'r') as f:
+        for line in f:
+            parsed = parsePfx2asLine(line.split())
+            if parsed is None:
+                continue
+            family, start, end, asn = parsed
+            if asn not in asn_ids:
+                asn_ids[asn] = len(asn_ids)
+            prefixes[family].append((start, end, asn_ids[asn]))
+
+    v4_start, v4_value = flattenIntervals(prefixes[FAMILY_V4], V4_MAX)
+    v6_start, v6_value = flattenIntervals(prefixes[FAMILY_V6], V6_MAX)
+
+    asns = list(asn_ids)
+    # Multi-origin entries (e.g. 123_456) have no single ASN as an integer.
+    asn_int = [int(asn) if asn.isdigit() else 0 for asn in asns]
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, 'v4_start.npy'),
+            np.array(v4_start, dtype=np.uint32))
+    np.save(os.path.join(out_dir, 'v4_value.npy'),
+            np.array(v4_value, dtype=np.int32))
+    np.save(os.path.join(out_dir, 'v6_start.npy'),
+            v6Keys(np.array([start >> 64 for start in v6_start],
+                            dtype=np.uint64),
+                   np.array([start & U64_MAX for start in v6_start],
+                            dtype=np.uint64)))
+    np.save(os.path.join(out_dir, 'v6_value.npy'),
+            np.array(v6_value, dtype=np.int32))
+    np.save(os.path.join(out_dir, 'asns.npy'), np.array(asns, dtype=str))
+    np.save(os.path.join(out_dir, 'asn_int.npy'),
+            np.array(asn_int, dtype=np.uint32))
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(sourceSignature(pfx2as_file), f)
+    return out_dir
+
+
+def indexIsCurrent(pfx2as_file, out_dir=None):
+    if out_dir is None:
+        out_dir = indexDir(pfx2as_file)
+    meta_path = os.path.join(out_dir, 'meta.json')
+    if not os.path.isfile(meta_path):
+        return False
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    return meta == sourceSignature(pfx2as_file)
+
+
+class Pfx2asIndex:
+
+    def __init__(self, index_dir):
+        def load(name):
+            return np.load(os.path.join(index_dir, name+'.npy'),
+                           mmap_mode='r')
+        self.v4_start = load('v4_start')
+        self.v4_value = load('v4_value')
+        self.v6_start = load('v6_start')
+        self.v6_value = load('v6_value')
+        self.asns = load('asns')
+        self.asn_int = load('asn_int')
+
+    @staticmethod
+    def _match(starts, values, keys):
+        pos = np.searchsorted(starts, keys, side='right') - 1
+        found = pos >= 0
+        value = np.full(len(keys), NO_MATCH, dtype=np.int64)
+        value[found] = values[pos[found]]
+        return value
+
+    def lookupIds(self, family, hi, lo):
+        # Index into asns for every address, NO_MATCH where none covers it.
+        ids = np.full(len(family), NO_MATCH, dtype=np.int64)
+        v4 = family == FAMILY_V4
+        if v4.any() and len(self.v4_start):
+            ids[v4] = self._match(self.v4_start, self.v4_value,
+                                  lo[v4].astype(np.uint32))
+        v6 = family == FAMILY_V6
+        if v6.any() and len(self.v6_start):
+            ids[v6] = self._match(self.v6_start, self.v6_value,
+                                  v6Keys(hi[v6], lo[v6]))
+        return ids
+
+    def lookupPacked(self, family, hi, lo):
+        # Integer ASN of every packed address, 0 where there is none.
+        ids = self.lookupIds(family, hi, lo)
+        asns = np.zeros(len(ids), dtype=np.uint32)
+        found = ids != NO_MATCH
+        asns[found] = self.asn_int[ids[found]]
+        return asns
+
+    def lookupMany(self, addrs):
+        # Integer ASN of every address in one call, 0 where there is none.
+        return self.lookupPacked(*packAddresses(addrs))
+
+    def get(self, addr):
+        # Same contract as PyTricia.get(): the ASN as written in the pfx2as
+        # file, or None.
+        family, hi, lo = ipToInt(addr)
+        if family == FAMILY_V4:
+            starts, values, key = self.v4_start, self.v4_value, lo
+        elif family == FAMILY_V6:
+            starts, values = self.v6_start, self.v6_value
+            key = (hi.to_bytes(8, 'big') + lo.to_bytes(8, 'big'))
+        else:
+            return None
+        # The key must have the dtype of the array, a Python int would be
+        # compared as a float and lose the low bits of large keys.
+        key = starts.dtype.type(key)
+        pos = int(np.searchsorted(starts, key, side='right')) - 1
+        if pos < 0 or values[pos] == NO_MATCH:
+            return None
+        return str(self.asns[values[pos]])
+
+
+def loadPfx2asIndex(pfx2as_file):
+    # Compiles the index the first time a pfx2as file is used, or when the
+    # file has changed since, and memory-maps it.
+    index_dir = indexDir(pfx2as_file)
+    if not indexIsCurrent(pfx2as_file, index_dir):
+        compilePfx2as(pfx2as_file, index_dir)
+    return Pfx2asIndex(index_dir)
+
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser(
+            description='Compile a pfx2as file into a prefix to ASN index',
+            usage='%(prog)s [-i pfx2as_file -o index_dir]')
+
+    argParser.add_argument('-i', dest='pfx2as_file',
+                           help='Prefix to AS file to compile',
+                           type=str, default='/scratch/ip2as.pfx2as')
+
+    argParser.add_argument('-o', dest='index_dir',
+                           help='Directory to write the index to',
+                           type=str, default=None)
+
+    args = argParser.parse_args()
+
+    if not os.path.isfile(args.pfx2as_file):
+        print("%s does not exist!!!" % args.pfx2as_file)
+        sys.exit(-1)
+
+    out_dir = compilePfx2as(args.pfx2as_file, args.index_dir)
+    index = Pfx2asIndex(out_dir)
+    print("Compiled %s IPv4 and %s IPv6 intervals into %s"
+          % (len(index.v4_start), len(index.v6_start), out_dir))
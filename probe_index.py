@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Index of the probes of the analysis by ASN and the other way round. The
+# AS path files list {prb_id: [aspaths]} objects per target, where the
+# first ASN of each path is the ASN the probe sits in. The index is built
+# in one pass over those lists, so finding the ASN of the probe behind a
+# traceroute result is a dict lookup rather than a scan of every ASN's
+# probe list.
+
+from collections import OrderedDict
+
+
+def asnProbes(probes, *aspath_lists):
+    # {origin asn: [prb_id, ...]} of the given probes, from the AS paths
+    # they measured towards any of the targets. The entries of each probe
+    # are gathered in one pass over the lists and then taken probe by
+    # probe, in the order of probes and then of the lists, which gives the
+    # ASNs and probes the same order as the per-probe scans this replaces.
+    wanted = set(probes)
+    entries = {}
+    for i, aspaths_from_prb in enumerate(aspath_lists):
+        for prb in aspaths_from_prb:
+            (prb_id, aspaths), = prb.items()
+            if prb_id not in wanted:
+                continue
+            if prb_id not in entries:
+                entries[prb_id] = [[] for _ in aspath_lists]
+            entries[prb_id][i].append(aspaths)
+
+    asn_probes = OrderedDict()
+    seen = set()
+    for prb_id in probes:
+        for list_entries in entries.get(prb_id, []):
+            for aspaths in list_entries:
+                for aspath in aspaths:
+                    origin_asn = aspath[0]
+                    if (origin_asn, prb_id) in seen:
+                        continue
+                    seen.add((origin_asn, prb_id))
+                    asn_probes.setdefault(origin_asn, []).append(prb_id)
+    return asn_probes
+
+
+class ProbeIndex:
+
+    def __init__(self, asn_probes):
+        # A probe seen with more than one origin ASN belongs to the first
+        # ASN listing it, as it did with the scans this replaces.
+        self.asn_probes = asn_probes
+        self.prb_asn = {}
+        for asn, prb_ids in asn_probes.items():
+            for prb_id in prb_ids:
+                self.prb_asn.setdefault(str(prb_id), asn)
+
+    def asnOf(self, prb_id):
+        # Probe ids are strings in the AS path files and integers in
+        # traceroute results, either form is accepted.
+        return self.prb_asn.get(str(prb_id))
+
+    def probesOf(self, asn):
+        return self.asn_probes.get(asn, [])
+
+    def __contains__(self, prb_id):
+        return str(prb_id) in self.prb_asn
+
+    def __len__(self):
+        return len(self.prb_asn)
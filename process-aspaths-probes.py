@@ -33,7 +33,7 @@ import matplotlib.mlab as mlab
 from networkx import path_graph, random_layout
 from pyvis.network import Network
 import random
-import csv
+from asrel_graph import loadAsRelGraph
 
 
 def seperateEdgesASRelData(graph):
@@ -70,42 +70,7 @@ def pyvisualise(graph, asn):
 
 
 def readASRelData(ASRelDataFile):
-    with open(ASRelDataFile, 'r') as f:
-        try:
-            ASRelData = csv.reader(f, delimiter='\t')
-            graph = createGraph(ASRelData)
-        except IndexError:
-            ASRelData = csv.reader(f, delimiter='|')
-            graph = createGraph(ASRelData)
-        
-    return graph
-
-
-def createGraph(ASRelData):
-    internetGraph = nx.DiGraph()
-    for asRelLink in ASRelData:
-        if asRelLink[2] != 'unknown':
-            if (asRelLink[2] == 'p2c') or (asRelLink[2] == '-1'):
-                internetGraph.add_edge(int(asRelLink[0]), int(asRelLink[1]),
-                                       relationship='p2c')
-
-            if (asRelLink[2] == 'c2p'):
-                internetGraph.add_edge(int(asRelLink[1]), int(asRelLink[0]),
-                                       relationship='p2c')
-
-            if (asRelLink[2] == 'p2p') or (asRelLink[2] == '0'):
-                internetGraph.add_edge(int(asRelLink[0]), int(asRelLink[1]),
-                                       relationship='p2p')
-                internetGraph.add_edge(int(asRelLink[1]), int(asRelLink[0]),
-                                       relationship='p2p')
-        else:
-            internetGraph.add_edge(int(asRelLink[0]), int(asRelLink[1]),
-                                   relationship='p2p')
-            internetGraph.add_edge(int(asRelLink[1]), int(asRelLink[0]),
-                                   relationship='p2p')
-
-    #return internetGraph
-    return internetGraph.reverse()
+    return loadAsRelGraph(ASRelDataFile, unknown='p2p')
 
 
 def seperateEdges(graph):
@@ -671,23 +636,16 @@ if __name__ == "__main__":
     print("Number of penultimate ASNs that are neighbours of two or all of the game server: %s" %len(commonPenultimateAsn))
     ASRelGraph = readASRelData("/scratch/20220901.as-rel2-filtered.txt")
 
-    all_edges = []
-    for edge in list(ASRelGraph.edges):
-        all_edges.append(edge)
-
     for asn in commonPenultimateAsn:
         i = 0
 
-        blizzard = (57976, asn)
-        ubisoft =  (49544, asn)
-        valve =   (32590, asn)
-        if blizzard in all_edges:
+        if ASRelGraph.hasEdge(57976, asn):
             i += 1
 
-        if ubisoft in all_edges:
+        if ASRelGraph.hasEdge(49544, asn):
             i += 1
 
-        if valve in all_edges:
+        if ASRelGraph.hasEdge(32590, asn):
             i += 1
 
         if i == 3:
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Traceroute to AS path conversion in a single pass per result. The hop
+# addresses of a result are classified and resolved in one batch (both
+# remembered across results), the AS path is built with hop placeholders
+# for unresolved hops and duplicates removed in order of first appearance,
+# and the path is vetted, before the next result is looked at. Nothing but
+# the resolver memo outlives a result, so any number of traceroutes can be
+# streamed through.
+#
+# Results of different probes are independent, so TraceAsPathPool can
+# spread measurements over forked worker processes. Each worker loads the
+# results of its measurement itself, which is much cheaper than having
+# them pickled over from the parent. The workers share the resolver's
+# memory-mapped index and loaded sources with the parent. They send back
+# the AS path records and what they resolved, so the parent keeps a single
+# memo file, and records are handed out in the order of the measurements.
+#
+# Path rules: the probe's ASN starts the path; a first hop that is private
+# or unresolved stands for the probe's ASN; every other hop that cannot be
+# resolved to an ASN becomes 'hop-<n>'. A path is valid when it holds more
+# than MIN_VALID_ASNS ASNs.
+
+import multiprocessing
+from collections import OrderedDict, Counter
+from itertools import repeat, islice
+from ip_class import (AddressClassifier, CLASS_INVALID, CLASS_GLOBAL,
+                      CLASS_PRIVATE)
+
+MIN_VALID_ASNS = 3
+
+
+def hopPlaceholder(hop_no):
+    return 'hop-'+str(hop_no)
+
+
+def countAsns(aspath):
+    return sum(1 for asn in aspath if isinstance(asn, int))
+
+
+def isValidAsPath(aspath, min_asns=MIN_VALID_ASNS):
+    return countAsns(aspath) > min_asns
+
+
+def traceAsPath(result, prb_asn, resolver, classifier):
+    hops = []
+    for hop in result['result']:
+        try:
+            pkts_per_hop = hop['result']
+        except KeyError:
+            hops.append((hop['hop'], None))
+            continue
+        hops.append((hop['hop'],
+                     list(dict.fromkeys(pkt['from'] for pkt in pkts_per_hop
+                                        if 'from' in pkt))))
+
+    trace_ips = [ip for _, ips in hops if ips for ip in ips]
+    classes = dict(zip(trace_ips, classifier.classify(trace_ips).tolist()))
+    global_ips = [ip for ip in classes if classes[ip] == CLASS_GLOBAL]
+    asns = dict(zip(global_ips, resolver.resolveMany(global_ips).tolist()))
+
+    aspath = [prb_asn]
+    for hop_no, ips in hops:
+        if ips is None:
+            aspath.append(prb_asn if hop_no == 1 else hopPlaceholder(hop_no))
+            continue
+
+        for ip in ips:
+            ip_class = classes[ip]
+            if ip_class == CLASS_INVALID:
+                aspath.append(hopPlaceholder(hop_no))
+                continue
+
+            asn = asns.get(ip, 0)
+            if hop_no == 1:
+                if ip_class == CLASS_PRIVATE or not asn:
+                    aspath.append(prb_asn)
+                else:
+                    aspath.append(asn)
+
+            if ip_class == CLASS_GLOBAL and asn:
+                aspath.append(asn)
+            else:
+                aspath.append(hopPlaceholder(hop_no))
+
+    return list(OrderedDict(zip(aspath, repeat(None))))
+
+
+def iterTraceAsPaths(results, probeAsn, resolver, classifier=None):
+    # Yields a record per traceroute result. probeAsn maps a probe id to
+    # the ASN of the probe, None for an unknown probe, whose results are
+    # left out.
+    if classifier is None:
+        classifier = AddressClassifier()
+    for result in results:
+        prb_asn = probeAsn(result['prb_id'])
+        if prb_asn is None:
+            continue
+        aspath = traceAsPath(result, prb_asn, resolver, classifier)
+        yield {'msm_id': result['msm_id'],
+               'prb_id': result['prb_id'],
+               'prb_asn': prb_asn,
+               'timestamp': result.get('timestamp'),
+               'aspath': aspath,
+               'valid': isValidAsPath(aspath)}
+
+
+# What forked workers inherit from the pool that created them.
+_worker_state = None
+
+
+def traceTask(task):
+    probeAsn, resolver, classifier, loadResults = _worker_state
+    if resolver.memo is not None:
+        # Only the parent writes to the memo file.
+        resolver.memo.readonly = True
+    known = len(resolver.resolved)
+    resolver.stats = Counter()
+
+    extra, results = loadResults(task)
+    records = list(iterTraceAsPaths(results, probeAsn, resolver, classifier))
+
+    # resolved only ever grows, so what this task added is at its end.
+    # Answers left by a failed source are not handed to the memo.
+    resolved = [(addr, asn) for addr, asn
+                in islice(resolver.resolved.items(), known, None)
+                if addr not in resolver.transient]
+    return task, extra, records, resolved, resolver.stats
+
+
+class TraceAsPathPool:
+
+    def __init__(self, probeAsn, resolver, workers, loadResults):
+        # loadResults(task) returns (extra, results) in a worker, extra
+        # being handed back along with the records of results.
+        global _worker_state
+        resolver.load()
+        self.resolver = resolver
+        # The workers are forked now and inherit the state, so the pool has
+        # to be created before any other threads are started.
+        _worker_state = (probeAsn, resolver, AddressClassifier(), loadResults)
+        self.pool = multiprocessing.get_context('fork').Pool(workers)
+
+    def imap(self, tasks):
+        # Yields (task, extra, records) in the order of tasks.
+        for task, extra, records, resolved, stats in self.pool.imap(
+                traceTask, tasks):
+            self.resolver.learn(resolved)
+            self.resolver.stats.update(stats)
+            yield task, extra, records
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -38,6 +38,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 from tabulate import tabulate
 import ast
+from asrel_graph import loadAsRelGraph
+from as_cones import customerCones
 
 
 asnRankFile = '/scratch/asns.jsonl'
@@ -64,58 +66,15 @@ hypergiantasns = [15169, 36385, 16591, 43515, 36384, 396982, 19527, 139070, 1391
 
 
 def readASRelData(ASRelDataFile):
-    with open(ASRelDataFile, 'r') as f:
-        try:
-            ASRelData = csv.reader(f, delimiter='\t')
-            graph = createGraph(ASRelData)
-        except IndexError:
-            ASRelData = csv.reader(f, delimiter='|')
-            graph = createGraph(ASRelData)
-
-    return graph
-
-
-def createGraph(ASRelData):
-    internetGraph = nx.DiGraph()
-    for asRelLink in ASRelData:
-        if asRelLink[2] != 'unknown':
-            if (asRelLink[2] == 'p2c') or (asRelLink[2] == '-1'):
-                internetGraph.add_edge(asRelLink[0], asRelLink[1],
-                                       relationship='p2c')
-
-            if (asRelLink[2] == 'c2p'):
-                internetGraph.add_edge(asRelLink[1], asRelLink[0],
-                                       relationship='p2c')
-
-            if (asRelLink[2] == 'p2p') or (asRelLink[2] == '0'):
-                internetGraph.add_edge(asRelLink[0], asRelLink[1],
-                                       relationship='p2p')
-                internetGraph.add_edge(asRelLink[1], asRelLink[0],
-                                       relationship='p2p')
-
-    return internetGraph.reverse()
-
-
-def seperateEdges(graph):
-    p2c_edges = []
-    p2p_edges = []
-    for edge in list(graph.edges):
-        rel = graph.get_edge_data(edge[0], edge[1])
-        #print("Attribute rel is %s\n" %rel)
-        if rel['relationship'] == 'p2c':
-            p2c_edges.append(edge)
-
-        if rel['relationship'] == 'p2p':
-            p2p_edges.append(edge)
-    return p2c_edges, p2p_edges
+    return loadAsRelGraph(ASRelDataFile)
 
 
 def drawTopoGraph(graph):
     plt.subplot(111)
     pos = nx.spring_layout(graph)
     nodes = nx.draw_networkx_nodes(graph, pos)
-    p2c_edges,  p2p_edges = seperateEdges(graph)
-    edge_colors = ['r' if edge in p2c_edges else 'g' for edge in graph.edges]
+    edge_colors = ['r' if graph.edges[edge]['relationship'] == 'p2c' else 'g'
+                   for edge in graph.edges]
     nodes.set_edgecolor('r')
     nx.draw_networkx_edges(graph, pos)
     nx.draw_networkx_edges(graph, pos, edge_color=edge_colors, min_source_margin=3, min_target_margin=3 )
@@ -467,7 +426,6 @@ if __name__ == "__main__":
         sys.exit(-1)
 
     graphData = readASRelData(args.as_rel_data)
-    p2c_edges,  p2p_edges = seperateEdges(graphData)
 
     ReadIsoCountryCodes(isocountryFile)
     ASRank = ReadAsnRankFile(asnRankFile)
@@ -587,33 +545,29 @@ if __name__ == "__main__":
 
 
     topproviders = ShowTopProvidersByUpstreamConn(prov_asn_ex_hgs)
+    customerCone = customerCones(graphData)
     outlier_providers = []
     for asn in topproviders:
         customers = []
+        if asn["asn"] not in graphData:
+            print("AS%s is not in the AS relationship dataset" % asn["asn"])
+            continue
         #neigh = graphData[asn["asn"]]
-        upstreams = []
-        for edge in graphData.out_edges(asn["asn"]):
-            if edge not in p2p_edges:
-                upstreams.append(edge)
+        upstreams = graphData.providers(asn["asn"])
 
         if len(upstreams) != asn['asnDegree']['provider']:
             print("Providers in dataset does not match ASRank: %s vs %s" %(len(upstreams), asn['asnDegree']['provider']))
 
-        for edge in graphData.in_edges(asn["asn"]):
-            if edge not in p2p_edges:
-                cust, asno = edge
-                cust_pred = list(graphData.predecessors(cust))
-                customers.append(cust)
-                #print(cust_pred)
-                if len(cust_pred) != 0:
-                    downstream_cust_edges = graphData.in_edges(cust)
-                    for down_cust_edge in downstream_cust_edges:
-                        if down_cust_edge not in p2p_edges:
-                            down_cust, up_cust = down_cust_edge
-                            customers.append(down_cust)
-                            #    print("Yes!!!")
-                #customers.append(cust)
-        sGraph = createSubgraph(graphData, asn["asn"], customers)
+        coneSize = customerCone.size(asn["asn"])
+        cone = asn.get('cone') or {}
+        if coneSize != cone.get('numberAsns', coneSize):
+            print("Customer cone in dataset does not match ASRank: %s vs %s" %(coneSize, cone['numberAsns']))
+
+        for cust in graphData.customers(asn["asn"]):
+            customers.append(cust)
+            # Customers of the customer, one level further down.
+            customers.extend(graphData.customers(cust))
+        sGraph = graphData.toNetworkx(asns=customers+[asn["asn"]])
         print("Drawing graph for %s  %s   %s" %(asn["asn"], asn["asnName"], asn["organization"]["orgName"]))
         asdetails = {'ASN': asn["asn"], 'AS Name': asn["asnName"],
                 'Org Name': asn["organization"]["orgName"],
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+
+# Copyright (c) 2020, WAND Network Research Group
+#                     Department of Computer Science
+#                     University of Waikato
+#                     Hamilton
+#                     New Zealand
+#
+# Author Dimeji Fayomi (oof1@students.waikato.ac.nz)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330,
+# Boston,  MA 02111-1307  USA
+
+
+# Valley-free (Gao-Rexford) paths over an AsRelGraph. A path may climb
+# customer to provider links, cross at most one peering link and then only
+# descend provider to customer links. Searching runs a breadth-first
+# search over (AS, phase) states, phase UP while the path may still climb
+# or peer and DOWN once it has peered or descended, one whole frontier per
+# step on the CSR arrays. The shortest valley-free paths to a destination
+# are then walked back level by level, which gives the distinct first hops
+# and the number of paths without listing them; paths() lists them up to
+# a limit.
+
+import numpy as np
+
+PHASE_UP = 0
+PHASE_DOWN = 1
+
+MAX_DEPTH = 12
+MAX_PATHS = 100
+
+UNREACHED = -1
+
+
+def expand(ptr, idx, frontier):
+    # Neighbour ids of every AS in frontier, with the frontier position
+    # each of them was reached from.
+    starts = ptr[frontier]
+    counts = ptr[frontier + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=idx.dtype), np.empty(0, dtype=np.int64)
+    origin = np.repeat(np.arange(len(frontier)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return idx[starts[origin] + offsets], origin
+
+
+class ValleyFreeSearch:
+
+    def __init__(self, graph, source, phase=PHASE_UP, max_depth=MAX_DEPTH):
+        # phase is the phase the path is in on leaving source, DOWN when
+        # the traffic reached source over a peering or provider link.
+        self.graph = graph
+        self.source = graph.idOf(source)
+        self.up = graph.providerAdjacency()
+        self.down = graph.customerAdjacency()
+        self.peer = graph.peerAdjacency()
+        n = len(graph)
+        self.dist = np.full((2, n), UNREACHED, dtype=np.int16)
+        self.dist[phase, self.source] = 0
+
+        frontier = [np.empty(0, dtype=np.int64)] * 2
+        frontier[phase] = np.array([self.source], dtype=np.int64)
+        depth = 0
+        while (len(frontier[0]) or len(frontier[1])) and depth < max_depth:
+            depth += 1
+            climb = expand(*self.up, frontier[PHASE_UP])[0]
+            fall = np.concatenate([
+                    expand(*self.peer, frontier[PHASE_UP])[0],
+                    expand(*self.down, frontier[PHASE_UP])[0],
+                    expand(*self.down, frontier[PHASE_DOWN])[0]])
+            frontier = [self.visit(PHASE_UP, climb, depth),
+                        self.visit(PHASE_DOWN, fall, depth)]
+
+    def visit(self, phase, reached, depth):
+        reached = np.unique(reached)
+        reached = reached[self.dist[phase, reached] == UNREACHED]
+        self.dist[phase, reached] = depth
+        return reached.astype(np.int64)
+
+    def distance(self, dest):
+        # Length in links of the shortest valley-free path, None when there
+        # is none within the search depth.
+        if dest not in self.graph:
+            return None
+        d = self.dist[:, self.graph.idOf(dest)]
+        d = d[d != UNREACHED]
+        return int(d.min()) if len(d) else None
+
+    def shortestStates(self, dest):
+        # States on the shortest valley-free paths to dest, as one pair of
+        # (UP ids, DOWN ids) arrays per level, and the path count from
+        # each of them to dest. Walks back from dest one level at a time.
+        length = self.distance(dest)
+        if length is None:
+            return None
+        i = self.graph.idOf(dest)
+        level = []
+        counts = []
+        for phase in (PHASE_UP, PHASE_DOWN):
+            hit = self.dist[phase, i] == length
+            level.append(np.array([i] if hit else [], dtype=np.int64))
+            counts.append(np.ones(len(level[phase]), dtype=np.float64))
+        levels = [(level, counts)]
+
+        for d in range(length, 0, -1):
+            prev = [[], []]
+            prev_counts = [[], []]
+
+            def back(ptr_idx, states, state_counts, phase):
+                # States of phase at depth d - 1 with an edge of ptr_idx
+                # into states.
+                ids, origin = expand(*ptr_idx, states)
+                keep = self.dist[phase, ids] == d - 1
+                prev[phase].append(ids[keep])
+                prev_counts[phase].append(state_counts[origin[keep]])
+
+            # An UP state is entered from one of its customers climbing.
+            back(self.down, level[PHASE_UP], counts[PHASE_UP], PHASE_UP)
+            # A DOWN state is entered by peering or descending from an UP
+            # state, or descending from a DOWN one.
+            back(self.peer, level[PHASE_DOWN], counts[PHASE_DOWN], PHASE_UP)
+            back(self.up, level[PHASE_DOWN], counts[PHASE_DOWN], PHASE_UP)
+            back(self.up, level[PHASE_DOWN], counts[PHASE_DOWN], PHASE_DOWN)
+
+            level = []
+            counts = []
+            for phase in (PHASE_UP, PHASE_DOWN):
+                ids = np.concatenate(prev[phase])
+                state_counts = np.concatenate(prev_counts[phase])
+                ids, inverse = np.unique(ids, return_inverse=True)
+                summed = np.zeros(len(ids), dtype=np.float64)
+                np.add.at(summed, inverse, state_counts)
+                level.append(ids)
+                counts.append(summed)
+            levels.append((level, counts))
+
+        levels.reverse()
+        return levels
+
+    def firstHops(self, dest):
+        # ASes right after the source on the shortest valley-free paths.
+        levels = self.shortestStates(dest)
+        if levels is None or len(levels) < 2:
+            return set()
+        up, down = levels[1][0]
+        return set(self.graph.asns[np.union1d(up, down)].tolist())
+
+    def countPaths(self, dest):
+        levels = self.shortestStates(dest)
+        if levels is None:
+            return 0
+        return int(sum(counts.sum() for counts in levels[0][1]))
+
+    def paths(self, dest, limit=MAX_PATHS):
+        # Up to limit shortest valley-free paths from the source to dest,
+        # as lists of ASNs.
+        levels = self.shortestStates(dest)
+        if levels is None:
+            return []
+        on_path = [(set(up.tolist()), set(down.tolist()))
+                   for (up, down), counts in levels]
+        found = []
+        asns = self.graph.asns
+
+        def neighbours(ptr_idx, i):
+            ptr, idx = ptr_idx
+            return idx[ptr[i]:ptr[i + 1]].tolist()
+
+        def walk(i, phase, d, path):
+            if len(found) >= limit:
+                return
+            if d == len(levels) - 1:
+                found.append(asns[path].tolist())
+                return
+            nxt_up, nxt_down = on_path[d + 1]
+            steps = []
+            if phase == PHASE_UP:
+                steps += [(j, PHASE_UP) for j in neighbours(self.up, i)
+                          if j in nxt_up]
+                steps += [(j, PHASE_DOWN) for j in neighbours(self.peer, i)
+                          if j in nxt_down]
+            steps += [(j, PHASE_DOWN) for j in neighbours(self.down, i)
+                      if j in nxt_down]
+            for j, next_phase in steps:
+                walk(j, next_phase, d + 1, path + [j])
+
+        start_up, start_down = on_path[0]
+        for phase, states in ((PHASE_UP, start_up), (PHASE_DOWN, start_down)):
+            if self.source in states:
+                walk(self.source, phase, 0, [self.source])
+        return found
+
+
+class SearchCache:
+
+    # ValleyFreeSearch of every (source, phase) searched from so far. A
+    # sweep asking for paths from a few upstreams to many destinations
+    # then runs one search per upstream and answers every pair from its
+    # distance arrays.
+    def __init__(self, graph, max_depth=MAX_DEPTH):
+        self.graph = graph
+        self.max_depth = max_depth
+        self.searches = {}
+        # Built once here, so processes forked later share them.
+        graph.providerAdjacency()
+        graph.customerAdjacency()
+        graph.peerAdjacency()
+
+    def search(self, source, phase=PHASE_UP):
+        key = (self.graph.idOf(source), phase)
+        if key not in self.searches:
+            self.searches[key] = ValleyFreeSearch(self.graph, source, phase,
+                                                  self.max_depth)
+        return self.searches[key]
+
+    def __len__(self):
+        return len(self.searches)